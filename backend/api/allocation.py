@@ -0,0 +1,143 @@
+"""
+最近空位分配
+
+每個 (floor, section) 一個以 (distance_raw, id) 排序的 min-heap，只放 AVAILABLE 車位。
+車位狀態改變時不從 heap 中刪除（lazy deletion），取出時再以 _available 確認是否仍有效。
+真正的保留靠資料庫條件式更新 (status='AVAILABLE' 才更新)：
+多個閘門 / worker process 同時分配時，只有一個請求能更新成功，其餘改取下一個候選車位。
+"""
+import heapq
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from .changes import next_version
+from .db import retry_on_locked
+from .models import ParkingSpot
+from .occupancy import SpotIndex
+from .plate_search import normalize_plate
+
+# heap 長度超過 2 x 有效車位數 + COMPACT_SLACK 時重建，避免小 heap 頻繁重建
+COMPACT_SLACK = 16
+
+
+@retry_on_locked
+def reserve_spot(spot_id, plate_number, parked_time=None):
+    """
+    只有在車位仍為 AVAILABLE 時才改為 OCCUPIED；成功回傳 True
+    同一交易內蓋上新的版本號，變更串流與其他 process 的索引都能看到這次寫入
+    """
+    with transaction.atomic():
+        updated = ParkingSpot.objects.filter(pk=spot_id, status='AVAILABLE').update(
+            status='OCCUPIED',
+            plate_number=plate_number,
+            plate_normalized=normalize_plate(plate_number),
+            parked_time=parked_time or timezone.now(),
+            abnormal_reason=None,
+        )
+        if updated:
+            ParkingSpot.objects.filter(pk=spot_id).update(version=next_version())
+    return bool(updated)
+
+
+class SpotAllocator(SpotIndex):
+    fields = ('id', 'floor', 'section', 'status', 'distance_raw')
+
+    def __init__(self):
+        super().__init__()
+        self._heaps = {}      # (floor, section) -> [(distance_raw, id), ...]
+        self._available = {}  # id -> ((floor, section), distance_raw)
+        self._live = Counter()  # (floor, section) -> 目前有效（仍在 _available）的車位數
+
+    def allocate(self, plate_number, floor=None, section=None, strict=False):
+        """
+        保留最近的空位並回傳 ParkingSpot；沒有空位時回傳 None
+        floor / section 為偏好條件，strict=False 時偏好區域已滿會改分配其他區域
+        """
+        preferences = [(floor, section)]
+        if not strict and (floor is not None or section is not None):
+            preferences.append((None, None))
+
+        for pref_floor, pref_section in preferences:
+            while True:
+                with self._lock:
+                    self._sync()
+                    spot_id = self._pop_nearest(pref_floor, pref_section)
+                if spot_id is None:
+                    break
+                try:
+                    reserved = reserve_spot(spot_id, plate_number)
+                except Exception:
+                    # 不確定資料庫狀態，下次使用時重建
+                    self.invalidate()
+                    raise
+                if reserved:
+                    spot = ParkingSpot.objects.get(pk=spot_id)
+                    self.apply(spot)
+                    return spot
+                # 被其他 process 搶先：候選已移出 heap，繼續取下一個
+        return None
+
+    def available_count(self):
+        with self._lock:
+            self._sync()
+            return len(self._available)
+
+    # --- 內部方法（呼叫時已持有鎖） ---
+
+    def _pop_nearest(self, floor, section):
+        best_key = None
+        for key, heap in self._heaps.items():
+            if floor is not None and key[0] != floor:
+                continue
+            if section is not None and key[1] != section:
+                continue
+            # 丟掉堆頂已失效的項目（狀態或距離已改變）
+            while heap and self._available.get(heap[0][1]) != (key, heap[0][0]):
+                heapq.heappop(heap)
+            if heap and (best_key is None or heap[0] < self._heaps[best_key][0]):
+                best_key = key
+        if best_key is None:
+            return None
+        _, spot_id = heapq.heappop(self._heaps[best_key])
+        self._discard(spot_id)
+        return spot_id
+
+    def _discard(self, spot_id):
+        previous = self._available.pop(spot_id, None)
+        if previous is not None:
+            self._live[previous[0]] -= 1
+
+    def _compact(self, key):
+        """失效項目只在到達堆頂時才丟掉；頻繁切換狀態的車位會讓 heap 持續變大，超過有效數量 2 倍時重建"""
+        heap = self._heaps[key]
+        if len(heap) <= 2 * self._live[key] + COMPACT_SLACK:
+            return
+        heap[:] = [(distance, spot_id) for spot_id, (k, distance) in self._available.items() if k == key]
+        heapq.heapify(heap)
+
+    def _clear(self):
+        self._heaps.clear()
+        self._available.clear()
+        self._live.clear()
+
+    def _set(self, row):
+        spot_id = row['id']
+        if row['status'] != 'AVAILABLE':
+            self._discard(spot_id)
+            return
+        entry = ((row['floor'], row['section']), row['distance_raw'])
+        if self._available.get(spot_id) == entry:
+            return
+        self._discard(spot_id)
+        self._available[spot_id] = entry
+        self._live[entry[0]] += 1
+        heapq.heappush(self._heaps.setdefault(entry[0], []), (entry[1], spot_id))
+        self._compact(entry[0])
+
+    def _unset(self, spot_id):
+        self._discard(spot_id)
+
+
+spot_allocator = SpotAllocator()
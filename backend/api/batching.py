@@ -0,0 +1,79 @@
+"""
+車牌辨識的 micro-batching 分派器
+
+多個閘門/機台同時送來的單張辨識請求先進入佇列，分派執行緒在 max_wait_ms 內盡量湊滿
+max_batch_size 張後一次送給模型，結果再依序回填到各自的 Future。
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class RecognitionBatcher:
+    def __init__(self, send_batch, max_batch_size=8, max_wait_ms=20, max_concurrent_batches=2):
+        """
+        send_batch: callable(list[str]) -> list[str]，輸入 Base64 影像，回傳同樣順序的車牌號碼
+                    （單張失敗時該位置可以是 Exception，只有對應的 Future 收到例外）
+        """
+        self.send_batch = send_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_batches,
+                                            thread_name_prefix='recognize-batch')
+        self._thread = threading.Thread(target=self._run, name='recognize-batcher', daemon=True)
+        self._thread.start()
+        self.batches_sent = 0
+        self.items_sent = 0
+
+    def submit(self, image_base64):
+        future = Future()
+        self._queue.put((image_base64, future))
+        return future
+
+    def submit_many(self, images):
+        """一次放入多張，會被排進同一批（或相鄰的幾批）"""
+        futures = [Future() for _ in images]
+        for image, future in zip(images, futures):
+            self._queue.put((image, future))
+        return futures
+
+    def stats(self):
+        return {
+            'batches_sent': self.batches_sent,
+            'items_sent': self.items_sent,
+            'avg_batch_size': round(self.items_sent / self.batches_sent, 2) if self.batches_sent else 0.0,
+            'queued': self._queue.qsize(),
+        }
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.batches_sent += 1
+            self.items_sent += len(batch)
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        images = [image for image, _ in batch]
+        try:
+            results = list(self.send_batch(images))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for i, (_, future) in enumerate(batch):
+            result = results[i] if i < len(results) else 'UNKNOWN'
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,314 @@
+"""
+相機擷取服務
+
+每支相機（每個閘門一個 index）由一條專屬執行緒持續讀取畫面，放入有時間戳記的小型環狀緩衝區。
+快照請求直接取最新畫面，不必等待感光元件的下一幀，也不會有多個請求同時呼叫 cap.read()。
+- 讀取失敗時自動重新連線（退避重試）
+- 超過 idle_timeout 沒有人取用畫面時釋放相機並結束執行緒，下次取用時再自動啟動
+- OpenCV 在第一次開啟相機 / 編碼畫面時才載入，不使用相機的 worker 不必付出載入成本
+- 設定 CAMERA_SOURCE 時改為循環播放影像檔目錄或影片檔（沒有實體相機時的測試 / 效能測試用）
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque, namedtuple
+from pathlib import Path
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+CAMERA_EVENTS = metrics.counter('camera_events_total', 'Camera open / read failures and idle releases',
+                                ['camera', 'event'])
+
+Frame = namedtuple('Frame', ['seq', 'timestamp', 'image'])
+
+# 每次 process 啟動產生不同的前綴，避免重啟後序號重複造成 ETag 誤判
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+
+def resize_to_fit(image, max_width=None, max_height=None):
+    """等比例縮小到不超過 max_width x max_height（不放大）"""
+    import cv2
+    height, width = image.shape[:2]
+    scale = 1.0
+    if max_width and width > max_width:
+        scale = min(scale, max_width / width)
+    if max_height and height > max_height:
+        scale = min(scale, max_height / height)
+    if scale >= 1.0:
+        return image
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class PlaybackCapture:
+    """
+    與 cv2.VideoCapture 相同介面（isOpened / read / set / release）的假相機
+    source 為影像檔目錄時依檔名順序播放，為影片檔時逐幀播放；播完從頭循環，並以 fps 控制讀取速度
+    """
+
+    def __init__(self, source, fps=15.0):
+        import cv2
+        path = Path(source)
+        self._images = None
+        self._video = None
+        if path.is_dir():
+            files = sorted(p for p in path.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+            self._images = [image for image in (cv2.imread(str(p)) for p in files) if image is not None]
+        else:
+            self._video = cv2.VideoCapture(str(path))
+            if not fps and self._video.isOpened():
+                fps = self._video.get(cv2.CAP_PROP_FPS)
+        self._interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self._pos = 0
+        self._next_at = time.monotonic()
+
+    def isOpened(self):
+        if self._images is not None:
+            return bool(self._images)
+        return self._video is not None and self._video.isOpened()
+
+    def set(self, prop, value):
+        return False
+
+    def read(self):
+        # 模擬感光元件的幀率：不會比 fps 更快產生畫面
+        delay = self._next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_at = max(self._next_at + self._interval, time.monotonic())
+
+        if self._images is not None:
+            if not self._images:
+                return False, None
+            image = self._images[self._pos % len(self._images)]
+            self._pos += 1
+            return True, image
+        ret, image = self._video.read()
+        if not ret:
+            import cv2
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, image = self._video.read()
+        return ret, image
+
+    def release(self):
+        self._images = None if self._images is None else []
+        if self._video is not None:
+            self._video.release()
+
+
+def open_capture(index):
+    """開啟相機 index；有設定 CAMERA_SOURCE 時改為播放檔案（可用 {index} 區分各相機）"""
+    source = settings.CAMERA_SOURCE
+    if not source:
+        import cv2
+        return cv2.VideoCapture(index)
+    return PlaybackCapture(source.format(index=index), fps=settings.CAMERA_PLAYBACK_FPS)
+
+
+class CameraCaptureService:
+    def __init__(self, index=0, buffer_size=3, idle_timeout=60.0, reconnect_delay=0.5,
+                 max_reconnect_delay=5.0):
+        self.index = index
+        self.idle_timeout = idle_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.last_used = time.monotonic()
+        self.last_error = None
+
+        self._frames = deque(maxlen=buffer_size)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stop = threading.Event()
+        # 最近編碼過的 JPEG：同一幀被多個請求/串流取用時只編碼一次
+        self._jpeg_lock = threading.Lock()
+        self._jpeg_cache = OrderedDict()
+
+    # --- 對外介面 ---
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(self._stop,), name=f'camera-{self.index}', daemon=True)
+            self._thread.start()
+
+    def stop(self, wait=True):
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+            self._frames.clear()
+            self._cond.notify_all()
+        if wait and thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
+    def latest(self, max_age=None, timeout=3.0):
+        """
+        取得最新畫面 (Frame)；若緩衝區為空或畫面比 max_age 秒舊，最多等待 timeout 秒
+        拿不到畫面時回傳 None
+        """
+        self.touch()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._frames:
+                    frame = self._frames[-1]
+                    if max_age is None or time.monotonic() - frame.timestamp <= max_age:
+                        return frame
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def wait_for_frame(self, after_seq, timeout=3.0):
+        """等待序號大於 after_seq 的新畫面；逾時回傳 None"""
+        self.touch()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not (self._frames and self._frames[-1].seq > after_seq):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self._frames[-1]
+
+    def etag(self, frame, quality, max_width=None, max_height=None):
+        return f'"{_BOOT_ID}-{self.index}-{frame.seq}-q{quality}-{max_width or 0}x{max_height or 0}"'
+
+    def encode_jpeg(self, frame, quality=80, max_width=None, max_height=None):
+        """
+        將畫面編碼為 JPEG bytes（依序號與參數快取最近幾筆結果）
+        """
+        key = (frame.seq, quality, max_width, max_height)
+        with self._jpeg_lock:
+            data = self._jpeg_cache.get(key)
+        if data is not None:
+            return data
+
+        import cv2
+        image = resize_to_fit(frame.image, max_width, max_height)
+        ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            return None
+        data = buffer.tobytes()
+        with self._jpeg_lock:
+            self._jpeg_cache[key] = data
+            while len(self._jpeg_cache) > 8:
+                self._jpeg_cache.popitem(last=False)
+        return data
+
+    def touch(self):
+        """記錄使用時間；擷取執行緒未執行（例如閒置關閉後）時重新啟動"""
+        self.last_used = time.monotonic()
+        self.start()
+
+    # --- 擷取執行緒 ---
+
+    def _open(self):
+        with metrics.stage('camera_open'):
+            cap = open_capture(self.index)
+        if not cap.isOpened():
+            cap.release()
+            self.last_error = 'Cannot open camera'
+            CAMERA_EVENTS.inc(camera=self.index, event='open_failed')
+            logger.warning("無法開啟相機 %s", self.index)
+            return None
+        # 驅動程式內部緩衝越小，讀到的畫面越新（部分後端不支援，忽略即可）
+        import cv2
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        CAMERA_EVENTS.inc(camera=self.index, event='opened')
+        logger.info("相機 %s 初始化完成", self.index)
+        return cap
+
+    def _run(self, stop):
+        cap = None
+        delay = self.reconnect_delay
+        try:
+            while not stop.is_set():
+                with self._cond:
+                    # 在鎖內判斷閒置並清除 _thread，touch() 之後一定會看到需要重新啟動
+                    if time.monotonic() - self.last_used > self.idle_timeout:
+                        CAMERA_EVENTS.inc(camera=self.index, event='idle_stop')
+                        logger.info("相機 %s 閒置超過 %.0fs，停止擷取", self.index, self.idle_timeout)
+                        self._thread = None
+                        self._frames.clear()
+                        break
+
+                if cap is None:
+                    cap = self._open()
+                    if cap is None:
+                        stop.wait(delay)
+                        delay = min(delay * 2, self.max_reconnect_delay)
+                        continue
+                    delay = self.reconnect_delay
+
+                with metrics.stage('frame_read'):
+                    ret, image = cap.read()
+                if not ret:
+                    CAMERA_EVENTS.inc(camera=self.index, event='read_failed')
+                    logger.warning("相機 %s 讀取畫面失敗，重新連線", self.index)
+                    self.last_error = 'Failed to capture image'
+                    cap.release()
+                    cap = None
+                    continue
+
+                with self._cond:
+                    if stop.is_set():
+                        break
+                    self._seq += 1
+                    self._frames.append(Frame(self._seq, time.monotonic(), image))
+                    self.last_error = None
+                    self._cond.notify_all()
+        finally:
+            if cap is not None:
+                cap.release()
+                logger.info("相機 %s 已釋放", self.index)
+
+
+# 全局相機管理器：每個相機 index 一個擷取服務
+_camera_lock = threading.Lock()
+_camera_services = {}
+
+
+def get_camera(index=0):
+    """
+    取得（並啟動）指定 index 的相機擷取服務
+    """
+    with _camera_lock:
+        service = _camera_services.get(index)
+        if service is None:
+            service = CameraCaptureService(
+                index,
+                buffer_size=settings.CAMERA_BUFFER_SIZE,
+                idle_timeout=settings.CAMERA_IDLE_TIMEOUT,
+            )
+            _camera_services[index] = service
+    service.touch()
+    return service
+
+
+def release_camera(index=None):
+    """
+    釋放相機資源；index 為 None 時釋放全部
+    """
+    with _camera_lock:
+        if index is None:
+            services = list(_camera_services.values())
+        else:
+            services = [s for s in [_camera_services.get(index)] if s is not None]
+    for service in services:
+        service.stop()
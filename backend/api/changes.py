@@ -0,0 +1,133 @@
+"""
+變更版本號與變更推送
+
+車位 (ParkingSpot) 與紀錄 (LogEntry) 每次寫入都會帶上遞增的全域版本號，
+客戶端只需要抓取 version > since 的資料（/api/changes/?since=）或訂閱 SSE 串流。
+同一個 process 內的寫入透過 Condition 立即喚醒等待中的串流（async 的等待者以 event loop 的 Future 喚醒，
+等待時不佔用執行緒）；其他 worker process 的寫入則靠定期讀取版本號（單列查詢）發現。
+"""
+import asyncio
+import threading
+
+from asgiref.sync import sync_to_async
+
+from django.db import transaction
+from django.db.models import F, Max
+
+from .models import ChangeVersion, LogEntry, ParkingSpot
+
+_cond = threading.Condition()
+_local_version = 0
+_async_waiters = set()  # {(event loop, Future), ...}
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _notify(version):
+    global _local_version
+    with _cond:
+        if version > _local_version:
+            _local_version = version
+        _cond.notify_all()
+        waiters = list(_async_waiters)
+    for loop, future in waiters:
+        # 寫入可能發生在任何執行緒，交回 Future 所屬的 event loop 設定結果
+        try:
+            loop.call_soon_threadsafe(_wake, future)
+        except RuntimeError:
+            pass  # event loop 已關閉（等待者剛好結束）
+
+
+def _restore_version_row():
+    """
+    版本號那一列不見時（flush、從 migration 0004 之前的備份還原）重新建立：
+    從現有資料的最大版本號接續，並當成一次重置，所有客戶端重新抓取完整資料
+    """
+    latest = max(
+        ParkingSpot.objects.aggregate(v=Max('version'))['v'] or 0,
+        LogEntry.objects.aggregate(v=Max('version'))['v'] or 0,
+    )
+    ChangeVersion.objects.get_or_create(pk=1, defaults={'value': latest, 'reset_value': latest})
+
+
+def _increment(**changes):
+    with transaction.atomic():
+        if not ChangeVersion.objects.filter(pk=1).update(**changes):
+            _restore_version_row()
+            ChangeVersion.objects.filter(pk=1).update(**changes)
+        version = ChangeVersion.objects.values_list('value', flat=True).get(pk=1)
+    transaction.on_commit(lambda: _notify(version))
+    return version
+
+
+def next_version(count=1):
+    """
+    保留 count 個連續版本號，回傳最後一個（第一個為 回傳值 - count + 1）
+    交易提交後通知等待中的串流
+    """
+    return _increment(value=F('value') + count)
+
+
+def mark_reset():
+    """刪除或大量重置後呼叫：版本早於此的客戶端需要重新抓取完整資料"""
+    return _increment(value=F('value') + 1, reset_value=F('value') + 1)
+
+
+def current_version():
+    """回傳 (value, reset_value)"""
+    row = ChangeVersion.objects.values_list('value', 'reset_value').filter(pk=1).first()
+    if row is None:
+        _restore_version_row()
+        row = ChangeVersion.objects.values_list('value', 'reset_value').get(pk=1)
+    return row
+
+
+def wait_for_change(since, timeout):
+    """
+    等到本 process 有新的寫入或 timeout 秒後，回傳資料庫中目前的版本號 (value, reset_value)
+    """
+    with _cond:
+        if _local_version <= since:
+            _cond.wait(timeout)
+    return current_version()
+
+
+async def wait_for_change_async(since, timeout):
+    """wait_for_change 的 async 版本：等待期間不佔用執行緒，只有最後讀取版本號時使用 sync_to_async"""
+    loop = asyncio.get_running_loop()
+    waiter = (loop, loop.create_future())
+    with _cond:
+        pending = _local_version <= since
+        if pending:
+            _async_waiters.add(waiter)
+    if pending:
+        try:
+            await asyncio.wait({waiter[1]}, timeout=timeout)
+        finally:
+            with _cond:
+                _async_waiters.discard(waiter)
+    return await sync_to_async(current_version)()
+
+
+def changes_since(since):
+    """
+    回傳 since 之後的差異：
+    { "version": 目前版本, "reset": 是否需要重新抓取完整資料, "spots": [...], "logs": [...] }
+    """
+    from .serializers import LogEntrySerializer, ParkingSpotSerializer
+
+    version, reset_value = current_version()
+    # since 比目前版本還新代表資料庫被換掉/重建，同樣需要重新抓取
+    if since < reset_value or since > version:
+        return {'version': version, 'reset': True, 'spots': [], 'logs': []}
+    spots = ParkingSpot.objects.filter(version__gt=since).order_by('id')
+    logs = LogEntry.objects.filter(version__gt=since).order_by('version')
+    return {
+        'version': version,
+        'reset': False,
+        'spots': ParkingSpotSerializer(spots, many=True).data,
+        'logs': LogEntrySerializer(logs, many=True).data,
+    }
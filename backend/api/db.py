@@ -0,0 +1,54 @@
+"""
+資料庫寫入的共用工具
+
+SQLite 同一時間只允許一個寫入者；busy timeout 用完仍拿不到鎖、或讀鎖升級失敗時會拋出
+OperationalError("database is locked")。所有寫入路徑都以 retry_on_locked 包裝，
+在這裡統一以指數退避重試，而不是讓每個 view 各自處理。
+"""
+import functools
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+from . import metrics
+
+LOCK_RETRIES = metrics.counter('db_lock_retries_total', 'Writes retried after a "database is locked" error')
+
+
+def is_lock_error(exc):
+    return isinstance(exc, OperationalError) and 'locked' in str(exc).lower()
+
+
+def retry_on_locked(func=None, *, attempts=None, delay=None):
+    """
+    遇到資料庫鎖定時重試整個函式（函式本身應自成一個交易）
+    在外層 atomic 區塊內時不重試，交給最外層的寫入路徑處理：交易已經失效，只能整個重來
+
+    用法：
+        @retry_on_locked
+        def write(): ...
+
+        @retry_on_locked(attempts=3)
+        def write(): ...
+    """
+    if func is None:
+        return functools.partial(retry_on_locked, attempts=attempts, delay=delay)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        max_attempts = attempts or settings.DB_LOCK_RETRIES
+        backoff = delay if delay is not None else settings.DB_LOCK_RETRY_DELAY
+        for attempt in range(max_attempts):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if (not is_lock_error(e) or attempt == max_attempts - 1
+                        or transaction.get_connection().in_atomic_block):
+                    raise
+                LOCK_RETRIES.inc()
+                # 加上隨機抖動，避免多個寫入者同時醒來再次撞在一起
+                time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    return wrapper
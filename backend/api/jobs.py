@@ -0,0 +1,258 @@
+"""
+非同步車牌辨識工作佇列
+
+POST /api/recognize/jobs/ 只把影像寫入 RecognitionJob 資料表就立刻回傳 job id，
+由 worker 執行緒依 (priority, id) 順序取出並執行辨識（快取 -> 前處理 -> LLM），
+客戶端以 GET /api/recognize/jobs/<id>/?wait= 輪詢或 long-poll 取得結果。
+- LLM 變慢時 HTTP 執行緒不會跟著堆積，只有佇列變長
+- 佇列存在資料庫：process 重啟後 QUEUED 的工作繼續執行；執行到一半中斷 (RUNNING) 的工作
+  超過 RECOGNITION_JOB_STALE_SECONDS 後重新排入佇列
+- 取工作使用條件式更新 (status='QUEUED')，多個 process 同時跑 worker 也不會重複執行
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import metrics
+from .db import retry_on_locked
+from .models import RecognitionJob
+from .recognition import recognize_frame
+from .recognition_cache import decode_image
+
+logger = logging.getLogger(__name__)
+
+# 本 process 內的新工作 / 工作完成通知；其他 process 的變化靠 poll_interval 定期檢查
+_cond = threading.Condition()
+_generation = 0
+
+
+def _notify():
+    global _generation
+    with _cond:
+        _generation += 1
+        _cond.notify_all()
+
+
+def _wait(since_generation, timeout):
+    """等到有新通知（或 timeout 秒），回傳目前的通知序號"""
+    with _cond:
+        if _generation == since_generation:
+            _cond.wait(timeout)
+        return _generation
+
+
+def _job_counts():
+    rows = RecognitionJob.objects.values_list('status').annotate(n=Count('id')).order_by()
+    return {(status,): n for status, n in rows}
+
+
+metrics.gauge('recognition_jobs', 'Recognition jobs in the table by status', ['status'], fn=_job_counts)
+
+
+def parse_priority(value):
+    """'gate' / 'default' / 'recheck' 或整數；無法解析時拋出 ValueError"""
+    if value is None or value == '':
+        return RecognitionJob.PRIORITY_DEFAULT
+    if isinstance(value, str) and value.lower() in RecognitionJob.PRIORITY_NAMES:
+        return RecognitionJob.PRIORITY_NAMES[value.lower()]
+    return int(value)
+
+
+@retry_on_locked
+def submit_job(image_base64, priority=RecognitionJob.PRIORITY_DEFAULT, source=''):
+    job = RecognitionJob.objects.create(image_base64=image_base64, priority=priority, source=source)
+    _notify()
+    return job
+
+
+@retry_on_locked
+def claim_next_job():
+    """
+    取出優先順序最高的 QUEUED 工作並標記為 RUNNING；佇列為空時回傳 None
+    查詢不開交易（concurrent 設定下交易一開始就取得寫入鎖，空佇列的輪詢不應該佔用）；
+    條件式 UPDATE 本身是原子的，只有一個 worker 會把同一個工作從 QUEUED 改為 RUNNING
+    """
+    while True:
+        job = (RecognitionJob.objects.filter(status=RecognitionJob.QUEUED)
+               .order_by('priority', 'id').first())
+        if job is None:
+            return None
+        now = timezone.now()
+        claimed = RecognitionJob.objects.filter(pk=job.pk, status=RecognitionJob.QUEUED).update(
+            status=RecognitionJob.RUNNING, started_at=now, attempts=F('attempts') + 1)
+        if claimed:
+            job.status, job.started_at, job.attempts = RecognitionJob.RUNNING, now, job.attempts + 1
+            return job
+        # 被其他 process 搶先，取下一個
+
+
+@retry_on_locked
+def finish_job(job, plate_number=None, cached=False, error=None):
+    status = RecognitionJob.FAILED if error else RecognitionJob.DONE
+    RecognitionJob.objects.filter(pk=job.pk).update(
+        status=status, plate_number=plate_number, cached=cached, error=error,
+        image_base64='', finished_at=timezone.now())
+    _notify()
+
+
+@retry_on_locked
+def requeue_job(job, error=None):
+    RecognitionJob.objects.filter(pk=job.pk).update(status=RecognitionJob.QUEUED, error=error)
+    _notify()
+
+
+@retry_on_locked
+def requeue_stale_jobs(stale_seconds):
+    """RUNNING 超過 stale_seconds 的工作（執行中的 process 已結束）重新排入佇列"""
+    cutoff = timezone.now() - timedelta(seconds=stale_seconds)
+    count = RecognitionJob.objects.filter(status=RecognitionJob.RUNNING, started_at__lt=cutoff).update(
+        status=RecognitionJob.QUEUED)
+    if count:
+        _notify()
+    return count
+
+
+@retry_on_locked
+def purge_finished_jobs(keep_hours):
+    cutoff = timezone.now() - timedelta(hours=keep_hours)
+    deleted, _ = RecognitionJob.objects.filter(
+        status__in=[RecognitionJob.DONE, RecognitionJob.FAILED], finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def queue_position(job):
+    """排在此工作之前的 QUEUED 工作數（走 job_queue_idx 索引）"""
+    if job.status != RecognitionJob.QUEUED:
+        return None
+    return RecognitionJob.objects.filter(status=RecognitionJob.QUEUED).filter(
+        Q(priority__lt=job.priority) | Q(priority=job.priority, id__lt=job.id)).count()
+
+
+def wait_for_job(job_id, timeout):
+    """
+    等到工作完成 (DONE / FAILED) 或 timeout 秒後回傳 RecognitionJob；不存在時回傳 None
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        generation = _generation
+        job = RecognitionJob.objects.filter(pk=job_id).first()
+        if job is None or job.status in (RecognitionJob.DONE, RecognitionJob.FAILED):
+            return job
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return job
+        _wait(generation, min(remaining, settings.RECOGNITION_JOB_POLL_INTERVAL))
+
+
+class RecognitionWorkerPool:
+    def __init__(self, workers=2, poll_interval=1.0, stale_seconds=120, max_attempts=3,
+                 keep_hours=24, maintenance_interval=60.0, retry_delay=5.0):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.keep_hours = keep_hours
+        self.maintenance_interval = maintenance_interval
+        self._stop = threading.Event()
+        self._threads = []
+        self._last_maintenance = 0.0
+        self._maintenance_lock = threading.Lock()
+
+    def start(self):
+        self._maintenance()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'recognition-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, wait=True):
+        self._stop.set()
+        _notify()
+        if wait:
+            for thread in self._threads:
+                thread.join(timeout=5)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() - self._last_maintenance > self.maintenance_interval:
+                    self._maintenance()
+                generation = _generation
+                try:
+                    job = claim_next_job()
+                except Exception as e:
+                    logger.exception("取出辨識工作失敗: %s", e)
+                    job = None
+                if job is None:
+                    _wait(generation, self.poll_interval)
+                    continue
+                self._execute(job)
+        finally:
+            connection.close()
+
+    def _execute(self, job):
+        try:
+            frame = decode_image(job.image_base64)
+            # LLM 服務失敗（含斷路器開啟）拋出例外而不是回傳 UNKNOWN，才會重試
+            plate_number, cached = recognize_frame(frame, job.image_base64, raise_errors=True)
+        except Exception as e:
+            if job.attempts < self.max_attempts:
+                requeue_job(job, error=str(e))
+            else:
+                finish_job(job, error=str(e))
+            logger.warning("辨識工作 #%s 失敗（第 %s 次）: %s", job.pk, job.attempts, e)
+            # LLM 多半還沒恢復：暫停再取下一個工作，避免重新排入的工作立刻用完重試次數
+            self._stop.wait(self.retry_delay)
+            return
+        finish_job(job, plate_number=plate_number, cached=cached)
+
+    def _maintenance(self):
+        if not self._maintenance_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_maintenance = time.monotonic()
+            requeued = requeue_stale_jobs(self.stale_seconds)
+            if requeued:
+                logger.info("重新排入 %s 個中斷的辨識工作", requeued)
+            purge_finished_jobs(self.keep_hours)
+        except Exception as e:
+            logger.exception("辨識工作佇列維護失敗: %s", e)
+        finally:
+            self._maintenance_lock.release()
+
+
+_pool_lock = threading.Lock()
+_pool = None
+
+
+def start_recognition_workers(workers=None):
+    """
+    啟動本 process 的辨識 worker（RECOGNITION_JOB_WORKERS > 0 時，由 wsgi/asgi 進入點呼叫）
+    """
+    global _pool
+    workers = settings.RECOGNITION_JOB_WORKERS if workers is None else workers
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = RecognitionWorkerPool(
+                workers=workers,
+                poll_interval=settings.RECOGNITION_JOB_POLL_INTERVAL,
+                stale_seconds=settings.RECOGNITION_JOB_STALE_SECONDS,
+                max_attempts=settings.RECOGNITION_JOB_MAX_ATTEMPTS,
+                keep_hours=settings.RECOGNITION_JOB_KEEP_HOURS,
+                retry_delay=settings.RECOGNITION_JOB_RETRY_DELAY,
+            ).start()
+    return _pool
@@ -0,0 +1,267 @@
+"""
+LLM 車牌辨識服務的連線客戶端
+
+- 使用 requests.Session + HTTPAdapter 保持 keep-alive 連線池，避免每次請求重新建立 TCP 連線
+- 以 Semaphore 限制同時進行中的請求數，超過上限時等待一小段時間後直接放棄
+- 連線逾時與讀取逾時分開設定
+- 斷路器 (circuit breaker)：連續失敗達門檻後在冷卻時間內直接失敗，不再卡住 worker
+- AsyncLLMClient：ASGI 的 async view 使用的 httpx 版本，等待回應時不佔用執行緒，與同步版共用斷路器
+  只在 ASGI 伺服器（asgi.py 呼叫 enable_async_llm_client()）下使用；WSGI / runserver 下 async view
+  每個請求各自一個 event loop，改用共用的同步 LLMClient，連線池與 LLM_MAX_IN_FLIGHT 上限才有效
+- requests / httpx 在建立第一個客戶端時才載入，不做辨識的 worker 不必載入
+"""
+import asyncio
+import threading
+import time
+import weakref
+
+from django.conf import settings
+
+from . import metrics
+
+
+class LLMClientError(Exception):
+    """LLM 服務呼叫失敗（連線錯誤、逾時、非 2xx 回應等）"""
+
+
+class CircuitOpenError(LLMClientError):
+    """斷路器開啟中，請求未送出即失敗"""
+
+
+class ConcurrencyLimitError(LLMClientError):
+    """同時進行中的請求已達上限，等待逾時"""
+
+
+class CircuitBreaker:
+    """
+    簡單的三態斷路器：CLOSED -> OPEN -> HALF_OPEN -> CLOSED
+    OPEN 期間所有請求直接失敗；冷卻時間過後只放行一個試探請求。
+    """
+    CLOSED = 'CLOSED'
+    OPEN = 'OPEN'
+    HALF_OPEN = 'HALF_OPEN'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def is_open(self):
+        """OPEN 且仍在冷卻時間內（不改變狀態）"""
+        with self._lock:
+            return (self._state == self.OPEN
+                    and time.monotonic() - self._opened_at < self.reset_timeout)
+
+    def allow_request(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # HALF_OPEN：同一時間只放行一個試探請求
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class LLMClient:
+    """
+    可重複使用的 LLM 服務客戶端（執行緒安全，整個 process 共用一個實例）
+    """
+    def __init__(self, url, connect_timeout=3.0, read_timeout=20.0, max_in_flight=4,
+                 acquire_timeout=5.0, pool_size=None, breaker=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.acquire_timeout = acquire_timeout
+        self.max_in_flight = max_in_flight
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+
+        pool_size = pool_size or max_in_flight
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def post_json(self, payload, url=None):
+        """
+        送出 JSON 請求並回傳解析後的 JSON 回應
+        失敗時拋出 LLMClientError（或其子類別）
+        """
+        # 斷路器開啟中就不必排隊等名額，直接失敗
+        if self.breaker.is_open():
+            raise CircuitOpenError(f'circuit open for {self.url}')
+
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            # 不計入斷路器：這是本地壅塞，不代表後端故障
+            raise ConcurrencyLimitError(f'{self.max_in_flight} requests already in flight')
+        # 取得名額後才向斷路器要求放行，確保試探請求一定會回報結果
+        if not self.breaker.allow_request():
+            self._slots.release()
+            raise CircuitOpenError(f'circuit open for {self.url}')
+        import requests
+        try:
+            resp = self.session.post(url or self.url, json=payload, timeout=self.timeout)
+            resp.raise_for_status()
+            data = resp.json()
+        except (requests.RequestException, ValueError) as e:
+            self.breaker.record_failure()
+            raise LLMClientError(str(e)) from e
+        finally:
+            self._slots.release()
+
+        self.breaker.record_success()
+        return data
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncLLMClient:
+    """
+    httpx.AsyncClient 版本：同一個 process 可以同時保持數百個等待中的辨識請求
+    httpx 的連線池綁定 event loop，請用 await get_async_llm_client() 取得目前 loop 的實例
+    """
+    def __init__(self, url, connect_timeout=3.0, read_timeout=20.0, max_in_flight=256,
+                 acquire_timeout=5.0, breaker=None):
+        import httpx
+        self.url = url
+        self.acquire_timeout = acquire_timeout
+        self.max_in_flight = max_in_flight
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight),
+        )
+
+    async def post_json(self, payload, url=None):
+        """與 LLMClient.post_json 相同，失敗時拋出 LLMClientError（或其子類別）"""
+        if self.breaker.is_open():
+            raise CircuitOpenError(f'circuit open for {self.url}')
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise ConcurrencyLimitError(f'{self.max_in_flight} requests already in flight') from None
+        if not self.breaker.allow_request():
+            self._slots.release()
+            raise CircuitOpenError(f'circuit open for {self.url}')
+        import httpx
+        try:
+            resp = await self.client.post(url or self.url, json=payload)
+            resp.raise_for_status()
+            data = resp.json()
+        except (httpx.HTTPError, ValueError) as e:
+            self.breaker.record_failure()
+            # 部分 httpx 例外沒有訊息，附上類別名稱方便判斷
+            raise LLMClientError(f'{type(e).__name__}: {e}') from e
+        finally:
+            self._slots.release()
+
+        self.breaker.record_success()
+        return data
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_client_lock = threading.Lock()
+_client = None
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> (AsyncLLMClient, 關閉用的 async generator)
+_async_client_enabled = False
+
+
+def get_llm_client():
+    """
+    取得共用的 LLMClient（單例模式），設定來自 settings.LLM_*
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient(
+                    url=settings.LLM_SERVICE_URL,
+                    connect_timeout=settings.LLM_CONNECT_TIMEOUT,
+                    read_timeout=settings.LLM_READ_TIMEOUT,
+                    max_in_flight=settings.LLM_MAX_IN_FLIGHT,
+                    acquire_timeout=settings.LLM_ACQUIRE_TIMEOUT,
+                    breaker=CircuitBreaker(
+                        failure_threshold=settings.LLM_BREAKER_FAILURES,
+                        reset_timeout=settings.LLM_BREAKER_RESET_TIMEOUT,
+                    ),
+                )
+    return _client
+
+
+metrics.gauge('llm_circuit_open', '1 while the LLM circuit breaker is rejecting requests',
+              fn=lambda: int(_client is not None and _client.breaker.is_open()))
+
+
+def enable_async_llm_client():
+    """由 asgi.py 呼叫：ASGI 伺服器有長期存在的 event loop，async view 才值得保持 httpx 連線池"""
+    global _async_client_enabled
+    _async_client_enabled = True
+
+
+async def _close_with_loop(loop, client):
+    # event loop 關閉前 (asyncio.run / asgiref 都會呼叫 shutdown_asyncgens) 執行 finally，
+    # 在 loop 還能用時關閉綁定該 loop 的連線池
+    try:
+        yield
+    finally:
+        _async_clients.pop(loop, None)
+        await client.aclose()
+
+
+async def get_async_llm_client():
+    """
+    取得目前 event loop 共用的 AsyncLLMClient（ASGI 伺服器只有一個 loop，等同單例）
+    斷路器與同步版 LLMClient 共用，兩邊看到的服務狀態一致
+    沒有呼叫過 enable_async_llm_client()（WSGI / runserver）時回傳 None，呼叫端改用 get_llm_client()
+    """
+    if not _async_client_enabled:
+        return None
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        client = AsyncLLMClient(
+            url=settings.LLM_SERVICE_URL,
+            connect_timeout=settings.LLM_CONNECT_TIMEOUT,
+            read_timeout=settings.LLM_READ_TIMEOUT,
+            max_in_flight=settings.LLM_ASYNC_MAX_IN_FLIGHT,
+            acquire_timeout=settings.LLM_ACQUIRE_TIMEOUT,
+            breaker=get_llm_client().breaker,
+        )
+        entry = _async_clients[loop] = (client, _close_with_loop(loop, client))
+        await entry[1].__anext__()
+    return entry[0]
@@ -0,0 +1,117 @@
+"""
+LogEntry 批次寫入
+
+- bulk_insert_logs：一次交易內以 bulk_create 寫入多筆紀錄（並配發連續的變更版本號）
+- LogWriteBuffer：伺服器端事件的 write-behind 緩衝，累積到 max_size 筆或每 flush_interval 秒寫入一次，
+  process 結束時 (atexit) 保證寫出剩餘的紀錄。
+  SQLite 只有一個寫入鎖，把多筆 INSERT 合併成一個交易可以大幅減少鎖競爭。
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .changes import next_version
+from .db import retry_on_locked
+from .models import LogEntry
+
+logger = logging.getLogger(__name__)
+
+
+@retry_on_locked
+def bulk_insert_logs(entries):
+    """
+    entries: LogEntry 欄位的 dict 清單（timestamp, type, message, spot 或 spot_id）
+    回傳建立的 LogEntry 物件
+    """
+    objs = [LogEntry(**entry) for entry in entries]
+    if not objs:
+        return objs
+    with transaction.atomic():
+        last = next_version(len(objs))
+        for offset, obj in enumerate(objs):
+            obj.version = last - len(objs) + 1 + offset
+        LogEntry.objects.bulk_create(objs)
+    return objs
+
+
+class LogWriteBuffer:
+    def __init__(self, max_size=100, flush_interval=1.0):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, type, message, spot_id=None, timestamp=None):
+        entry = {
+            'timestamp': timestamp or timezone.now(),
+            'type': type,
+            'message': message,
+            'spot_id': spot_id,
+        }
+        with self._lock:
+            self._pending.append(entry)
+            full = len(self._pending) >= self.max_size
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='log-write-buffer', daemon=True)
+                self._thread.start()
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """寫出目前累積的紀錄，回傳寫入筆數"""
+        with self._flush_lock:
+            with self._lock:
+                entries, self._pending = self._pending, []
+            if not entries:
+                return 0
+            try:
+                bulk_insert_logs(entries)
+            except Exception as e:
+                # 寫入失敗時放回佇列，下次再試
+                with self._lock:
+                    self._pending[:0] = entries
+                logger.exception("紀錄批次寫入失敗，%d 筆: %s", len(entries), e)
+                return 0
+            return len(entries)
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+_buffer_lock = threading.Lock()
+_buffer = None
+
+
+def get_log_buffer():
+    """
+    取得共用的 LogWriteBuffer（單例模式）
+    """
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = LogWriteBuffer(
+                    max_size=settings.LOG_BUFFER_MAX_SIZE,
+                    flush_interval=settings.LOG_BUFFER_FLUSH_INTERVAL,
+                )
+                atexit.register(_buffer.flush)
+    return _buffer
+
+
+def log_event(type, message, spot_id=None):
+    """伺服器端事件寫入紀錄（經由 write-behind 緩衝）"""
+    get_log_buffer().add(type, message, spot_id=spot_id)
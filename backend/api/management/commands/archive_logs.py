@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.retention import ArchiveLocked, archive_logs
+
+
+class Command(BaseCommand):
+    help = 'Move log entries older than --days into gzip JSON Lines archives and delete them from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='retention in days (default: LOG_RETENTION_DAYS)')
+        parser.add_argument('--dir', help='archive directory (default: LOG_ARCHIVE_DIR)')
+        parser.add_argument('--chunk-size', type=int, help='rows per transaction (default: LOG_RETENTION_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.LOG_RETENTION_DAYS
+        if days <= 0:
+            raise CommandError('--days must be > 0 (LOG_RETENTION_DAYS <= 0 means retention is disabled)')
+        try:
+            total = archive_logs(days=days, archive_dir=options['dir'], chunk_size=options['chunk_size'])
+        except ArchiveLocked as e:
+            raise CommandError(f'another archive run holds the lock: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} log entries'))
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.jobs import RecognitionWorkerPool
+from api.recognition import warm_up_vision
+
+
+class Command(BaseCommand):
+    help = 'Run recognition job workers in a dedicated process (the queue is shared through the database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='worker threads (default: RECOGNITION_JOB_WORKERS)')
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or settings.RECOGNITION_JOB_WORKERS
+        if workers <= 0:
+            raise CommandError('--workers must be > 0')
+        pool = RecognitionWorkerPool(
+            workers=workers,
+            poll_interval=settings.RECOGNITION_JOB_POLL_INTERVAL,
+            stale_seconds=settings.RECOGNITION_JOB_STALE_SECONDS,
+            max_attempts=settings.RECOGNITION_JOB_MAX_ATTEMPTS,
+            keep_hours=settings.RECOGNITION_JOB_KEEP_HOURS,
+            retry_delay=settings.RECOGNITION_JOB_RETRY_DELAY,
+        ).start()
+        warm_up_vision(indices=[])
+        self.stdout.write(self.style.SUCCESS(f'Running {workers} recognition workers (Ctrl+C to stop)'))
+        try:
+            pool.join()
+        except KeyboardInterrupt:
+            pool.stop()
@@ -0,0 +1,259 @@
+"""
+輕量的 metrics registry
+
+取代各階段以 time.time() + print() 輸出的耗時：以 perf_counter 量測，累積到 process 內的
+counter / histogram / gauge，由 GET /api/metrics 以 Prometheus 文字格式輸出（每個 process 各自一份）。
+- MetricsMiddleware：所有請求依 (method, route, status) 計數並記錄延遲（route 為 URL pattern，不是實際路徑）
+- stage()：辨識、相機等流程的各階段耗時，同時可寫入回應用的 timings dict
+記錄只是在鎖內更新幾個數字，不會在熱路徑上寫 stdout。
+"""
+import bisect
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """fn 不為 None 時在輸出時才取值（回傳數字，或 {label 值 tuple: 數字}），用於既有的統計數字"""
+    type = None
+
+    def __init__(self, name, help, labelnames=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(labels.get(n, '') for n in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self):
+        if self.fn is not None:
+            try:
+                result = self.fn()
+            except Exception:
+                return []
+            values = result if isinstance(result, dict) else {(): result}
+            with self._lock:
+                self._values = dict(values)
+        with self._lock:
+            items = sorted(self._values.items(), key=lambda kv: [str(v) for v in kv[0]])
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in items]
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [各 bucket 的個數（非累積）..., +Inf], sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()),
+                           key=lambda kv: [str(v) for v in kv[0]])
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help, labelnames=(), fn=None):
+        return self._register(Counter, name, help, labelnames, fn=fn)
+
+    def gauge(self, name, help, labelnames=(), fn=None):
+        return self._register(Gauge, name, help, labelnames, fn=fn)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+STAGE_SECONDS = histogram('stage_duration_seconds', 'Duration of recognition / camera processing stages',
+                          ['stage'])
+HTTP_REQUESTS = counter('http_requests_total', 'HTTP requests by route pattern and status',
+                        ['method', 'route', 'status'])
+HTTP_DURATION = histogram('http_request_duration_seconds', 'HTTP request latency until the response is returned',
+                          ['method', 'route'])
+HTTP_IN_FLIGHT = gauge('http_requests_in_flight', 'HTTP requests currently being handled')
+
+
+@contextmanager
+def stage(name, timings=None):
+    """
+    記錄一個階段的耗時到 stage_duration_seconds{stage=name}
+    timings 不為 None 時同時寫入 timings[f'{name}_ms']（回傳給客戶端的毫秒數）
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        if timings is not None:
+            timings[f'{name}_ms'] = round(elapsed * 1000, 2)
+
+
+@require_GET
+def metrics_view(request):
+    """GET /api/metrics：Prometheus 文字格式 (text/plain; version=0.0.4)"""
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# DRF router 的 regex 路由 (^spots/$) 去掉錨點，字元類別內的 ^ 保留
+_ANCHORS = re.compile(r'(?<!\[)\^|\$$')
+
+
+class MetricsMiddleware:
+    """所有請求的計數與延遲；同時支援 WSGI 與 ASGI（不會把 async view 轉成同步）"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            response = self.get_response(request)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+        self._record(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            response = await self.get_response(request)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+        self._record(request, response, start)
+        return response
+
+    @staticmethod
+    def _record(request, response, start):
+        elapsed = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        # 用 URL pattern 當 label，避免 /api/spots/A-1/ 這類實際路徑讓 label 數量無限增加
+        route = '/' + _ANCHORS.sub('', match.route) if match is not None else '<unmatched>'
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+        HTTP_DURATION.observe(elapsed, method=request.method, route=route)
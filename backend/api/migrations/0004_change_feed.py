@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+def create_change_version(apps, schema_editor):
+    ChangeVersion = apps.get_model('api', 'ChangeVersion')
+    ChangeVersion.objects.get_or_create(pk=1, defaults={'value': 0, 'reset_value': 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_remove_ev_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+                ('reset_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='logentry',
+            name='version',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='parkingspot',
+            name='version',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(create_change_version, reverse_code=migrations.RunPython.noop),
+    ]
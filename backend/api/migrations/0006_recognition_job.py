@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_log_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecognitionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='QUEUED', max_length=16)),
+                ('priority', models.SmallIntegerField(default=5)),
+                ('source', models.CharField(blank=True, default='', max_length=32)),
+                ('image_base64', models.TextField(blank=True, default='')),
+                ('plate_number', models.CharField(blank=True, max_length=32, null=True)),
+                ('cached', models.BooleanField(default=False)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'priority', 'id'], name='job_queue_idx')],
+            },
+        ),
+    ]
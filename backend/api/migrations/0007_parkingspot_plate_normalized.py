@@ -0,0 +1,38 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize_plate(value):
+    # 與撰寫本 migration 時的 api.plate_search.normalize_plate 相同；複製一份，之後修改該函式不影響既有資料的轉換
+    if not value:
+        return None
+    text = unicodedata.normalize('NFKC', str(value)).upper()
+    text = ''.join(ch for ch in text if ch.isalnum())[:32]
+    if not text or text == 'UNKNOWN':
+        return None
+    return text
+
+
+def fill_plate_normalized(apps, schema_editor):
+    ParkingSpot = apps.get_model('api', 'ParkingSpot')
+    spots = list(ParkingSpot.objects.exclude(plate_number=None).only('id', 'plate_number'))
+    for spot in spots:
+        spot.plate_normalized = normalize_plate(spot.plate_number)
+    ParkingSpot.objects.bulk_update(spots, ['plate_normalized'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_recognition_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parkingspot',
+            name='plate_normalized',
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+        migrations.RunPython(fill_plate_normalized, reverse_code=migrations.RunPython.noop),
+    ]
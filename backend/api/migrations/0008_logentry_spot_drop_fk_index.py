@@ -0,0 +1,17 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_parkingspot_plate_normalized'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='logentry',
+            name='spot',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.parkingspot'),
+        ),
+    ]
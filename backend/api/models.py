@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+
+from .db import retry_on_locked
 
 
 class ParkingSpot(models.Model):
@@ -16,8 +18,30 @@ class ParkingSpot(models.Model):
     floor = models.IntegerField(default=1)
     section = models.CharField(max_length=8, default='A')
     plate_number = models.CharField(max_length=32, null=True, blank=True)
+    # 歸一化後的車牌（大寫、去掉 - 與空白），供出場比對與查詢走索引；由 save() 等寫入路徑維護
+    plate_normalized = models.CharField(max_length=32, null=True, blank=True, db_index=True)
     parked_time = models.DateTimeField(null=True, blank=True)
     abnormal_reason = models.TextField(null=True, blank=True)
+    # 最後一次變更時的全域版本號（見 ChangeVersion）
+    version = models.BigIntegerField(default=0, db_index=True)
+
+    @retry_on_locked
+    def save(self, *args, **kwargs):
+        from .changes import next_version
+        from .plate_search import normalize_plate
+        self.plate_normalized = normalize_plate(self.plate_number)
+        # 版本號與資料列在同一個交易內寫入，讀到新版本號時資料一定已經可見
+        with transaction.atomic():
+            self.version = next_version()
+            super().save(*args, **kwargs)
+
+    @retry_on_locked
+    def delete(self, *args, **kwargs):
+        from .changes import mark_reset
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            mark_reset()
+        return result
 
     def __str__(self):
         return self.label
@@ -27,7 +51,87 @@ class LogEntry(models.Model):
     timestamp = models.DateTimeField()
     type = models.CharField(max_length=32)
     message = models.TextField()
-    spot = models.ForeignKey(ParkingSpot, on_delete=models.SET_NULL, null=True, blank=True)
+    # 不另建單欄索引：Meta 的 log_spot_ts_idx 以 spot 開頭，spot_id 查詢與 SET_NULL 都會使用它
+    spot = models.ForeignKey(ParkingSpot, on_delete=models.SET_NULL, null=True, blank=True, db_index=False)
+    version = models.BigIntegerField(default=0, db_index=True)
+
+    @retry_on_locked
+    def save(self, *args, **kwargs):
+        from .changes import next_version
+        # 版本號與資料列在同一個交易內寫入，讀到新版本號時資料一定已經可見
+        with transaction.atomic():
+            self.version = next_version()
+            super().save(*args, **kwargs)
+
+    @retry_on_locked
+    def delete(self, *args, **kwargs):
+        from .changes import mark_reset
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            mark_reset()
+        return result
+
+    class Meta:
+        # 支援 /api/logs/ 的 (timestamp, id) cursor 分頁與 type / spot 篩選
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='log_ts_id_idx'),
+            models.Index(fields=['type', '-timestamp', '-id'], name='log_type_ts_idx'),
+            models.Index(fields=['spot', '-timestamp', '-id'], name='log_spot_ts_idx'),
+        ]
 
     def __str__(self):
         return f"[{self.timestamp}] {self.type} - {self.message[:40]}"
+
+
+class ChangeVersion(models.Model):
+    """
+    全域遞增的變更版本號（只有一列，pk=1）
+    每次寫入車位或紀錄都會取得新的版本號；刪除/重置時記錄在 reset_value，
+    版本早於 reset_value 的客戶端必須重新抓取完整資料。
+    """
+    value = models.BigIntegerField(default=0)
+    reset_value = models.BigIntegerField(default=0)
+
+
+class RecognitionJob(models.Model):
+    """
+    非同步車牌辨識工作（SQLite 持久化佇列，process 重啟後未完成的工作仍會執行）
+    priority 越小越先執行：閘門進場 (GATE) 優先於管理員複查 (RECHECK)
+    """
+    QUEUED = 'QUEUED'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    PRIORITY_GATE = 0
+    PRIORITY_DEFAULT = 5
+    PRIORITY_RECHECK = 10
+    PRIORITY_NAMES = {'gate': PRIORITY_GATE, 'default': PRIORITY_DEFAULT, 'recheck': PRIORITY_RECHECK}
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    priority = models.SmallIntegerField(default=PRIORITY_DEFAULT)
+    source = models.CharField(max_length=32, blank=True, default='')
+    # 完成後清空，避免佇列資料表隨影像持續變大
+    image_base64 = models.TextField(blank=True, default='')
+    plate_number = models.CharField(max_length=32, null=True, blank=True)
+    cached = models.BooleanField(default=False)
+    error = models.TextField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # worker 取下一個工作：WHERE status='QUEUED' ORDER BY priority, id
+        indexes = [
+            models.Index(fields=['status', 'priority', 'id'], name='job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.status} p{self.priority} {self.plate_number or ''}"
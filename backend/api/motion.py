@@ -0,0 +1,275 @@
+"""
+車輛進場偵測：只在車輛進入並停穩時才觸發車牌辨識
+
+以縮小後的灰階畫面做背景相減，判斷畫面中是否有車（前景比例），再以相鄰兩幀的差異判斷是否已經停穩：
+    IDLE    --前景比例 >= enter_ratio 連續 enter_frames 幀-->  MOTION（車輛進入）
+    MOTION  --幀間差異 <= settle_ratio 連續 settle_frames 幀-->  PRESENT，觸發一次辨識
+    PRESENT --又開始移動-->  MOTION（停穩後再觸發一次）
+    MOTION / PRESENT --前景比例 < exit_ratio 連續 exit_frames 幀-->  IDLE（車輛離開）
+    PRESENT --靜止 relearn_frames 幀-->  以目前畫面重建背景並回到 IDLE（relearn）
+只有 IDLE 時更新背景（學習率 learning_rate），停著的車不會被吸收進背景；
+光線突然改變時整個畫面都像「停著的車」，靠 relearn 恢復（relearn_frames 應大於車輛在閘門停留的時間）。
+空車道、車輛移動中的畫面都不會送往 LLM。比較基準是每次進場 (enter -> exit) 辨識一次：
+MotionTrigger 統計的省下次數是沒有停下就離開（直接通過）的車輛。
+
+VehiclePresenceDetector 不依賴 Django，可直接用錄影檔重播測試（benchmarks.replay_motion）。
+"""
+import base64
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+MOTION_FRAMES = metrics.counter('motion_frames_total', 'Camera frames analysed by the vehicle detector', ['camera'])
+MOTION_EVENTS = metrics.counter('motion_events_total', 'Vehicle detector transitions (enter / settled / exit)',
+                                ['camera', 'event'])
+
+
+class VehiclePresenceDetector:
+    IDLE = 'IDLE'
+    MOTION = 'MOTION'
+    PRESENT = 'PRESENT'
+
+    def __init__(self, width=160, pixel_threshold=25, enter_ratio=0.04, exit_ratio=0.02, settle_ratio=0.005,
+                 enter_frames=2, settle_frames=5, exit_frames=10, learning_rate=0.05, relearn_frames=300):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.enter_ratio = enter_ratio
+        self.exit_ratio = exit_ratio
+        self.settle_ratio = settle_ratio
+        self.enter_frames = enter_frames
+        self.settle_frames = settle_frames
+        self.exit_frames = exit_frames
+        self.learning_rate = learning_rate
+        self.relearn_frames = relearn_frames
+        self.reset()
+
+    def reset(self):
+        self.state = self.IDLE
+        self.foreground = 0.0
+        self.motion = 0.0
+        self._background = None
+        self._previous = None
+        self._enter_count = 0
+        self._still_count = 0
+        self._exit_count = 0
+
+    def _prepare(self, image):
+        import cv2
+        height, width = image.shape[:2]
+        if width > self.width:
+            image = cv2.resize(image, (self.width, max(1, int(height * self.width / width))),
+                               interpolation=cv2.INTER_AREA)
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # 模糊處理降低感光雜訊造成的誤判
+        return cv2.GaussianBlur(image, (5, 5), 0)
+
+    def _changed_ratio(self, a, b):
+        import cv2
+        diff = cv2.absdiff(a, b)
+        return float((diff > self.pixel_threshold).mean())
+
+    def update(self, image):
+        """
+        輸入一幀 BGR（或灰階）影像，回傳狀態轉換事件 'enter' / 'settled' / 'exit'，沒有轉換時回傳 None
+        'settled' 表示車輛已停穩，應該送出辨識；'relearn' 表示長時間靜止後以目前畫面重建背景（視同離開）
+        """
+        import cv2
+        small = self._prepare(image)
+        if self._background is None:
+            self._background = small.astype('float32')
+            self._previous = small
+            return None
+
+        self.foreground = self._changed_ratio(small, cv2.convertScaleAbs(self._background))
+        self.motion = self._changed_ratio(small, self._previous)
+        self._previous = small
+
+        if self.state == self.IDLE:
+            if self.foreground >= self.enter_ratio:
+                self._enter_count += 1
+                if self._enter_count >= self.enter_frames:
+                    self.state = self.MOTION
+                    self._still_count = self._exit_count = 0
+                    return 'enter'
+            else:
+                self._enter_count = 0
+                # 只在沒有車時學習背景，適應光線的緩慢變化
+                cv2.accumulateWeighted(small, self._background, self.learning_rate)
+            return None
+
+        if self.foreground < self.exit_ratio:
+            self._exit_count += 1
+            if self._exit_count >= self.exit_frames:
+                self.state = self.IDLE
+                self._enter_count = 0
+                return 'exit'
+            return None
+        self._exit_count = 0
+
+        if self.state == self.MOTION:
+            if self.motion <= self.settle_ratio:
+                self._still_count += 1
+                if self._still_count >= self.settle_frames:
+                    self.state = self.PRESENT
+                    return 'settled'
+            else:
+                self._still_count = 0
+        elif self.motion > self.enter_ratio:
+            # 停穩後又開始移動（例如倒車重新對準），等再次停穩後重新辨識
+            self.state = self.MOTION
+            self._still_count = 0
+        elif self.motion <= self.settle_ratio:
+            self._still_count += 1
+            if self.relearn_frames and self._still_count >= self.settle_frames + self.relearn_frames:
+                # 光線突然改變等情況會一直停在 PRESENT；靜止夠久就把目前畫面當成新的背景
+                self._background = small.astype('float32')
+                self.state = self.IDLE
+                self._enter_count = self._still_count = self._exit_count = 0
+                return 'relearn'
+        return None
+
+
+def detector_from_settings():
+    return VehiclePresenceDetector(
+        width=settings.MOTION_DETECT_WIDTH,
+        pixel_threshold=settings.MOTION_PIXEL_THRESHOLD,
+        enter_ratio=settings.MOTION_ENTER_RATIO,
+        exit_ratio=settings.MOTION_EXIT_RATIO,
+        settle_ratio=settings.MOTION_SETTLE_RATIO,
+        enter_frames=settings.MOTION_ENTER_FRAMES,
+        settle_frames=settings.MOTION_SETTLE_FRAMES,
+        exit_frames=settings.MOTION_EXIT_FRAMES,
+        learning_rate=settings.MOTION_LEARNING_RATE,
+        relearn_frames=settings.MOTION_RELEARN_FRAMES,
+    )
+
+
+def submit_recognition(camera, frame):
+    """預設的觸發動作：把停穩時的畫面以閘門優先順序放入辨識工作佇列，回傳 RecognitionJob"""
+    from .jobs import submit_job
+    from .models import RecognitionJob
+    data = camera.encode_jpeg(frame, 95)
+    if data is None:
+        return None
+    return submit_job(base64.b64encode(data).decode('ascii'), priority=RecognitionJob.PRIORITY_GATE,
+                      source=f'motion:{camera.index}')
+
+
+class MotionTrigger:
+    """
+    在相機擷取服務旁的執行緒：以 sample_fps 取最新畫面交給偵測器，車輛停穩時呼叫 on_trigger(camera, frame)
+    偵測在獨立執行緒進行，不會拖慢擷取執行緒；持續取用畫面也讓相機不會因閒置而被釋放
+    """
+    def __init__(self, camera, detector, sample_fps=5.0, on_trigger=submit_recognition):
+        self.camera = camera
+        self.detector = detector
+        self.interval = 1.0 / sample_fps if sample_fps > 0 else 0.0
+        self.on_trigger = on_trigger
+        self.frames_analyzed = 0
+        self.vehicles = 0
+        self.triggers = 0
+        # 沒有停下就離開的車輛：每次進場辨識一次的做法會送出、這裡沒有送出的呼叫
+        self.passes_without_trigger = 0
+        self._visit_triggered = False
+        self.last_trigger_at = None
+        self.last_job_id = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f'motion-{self.camera.index}', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, wait=True):
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def stats(self):
+        return {
+            'camera': self.camera.index,
+            'state': self.detector.state,
+            'foreground': round(self.detector.foreground, 4),
+            'frames_analyzed': self.frames_analyzed,
+            'vehicles': self.vehicles,
+            'triggers': self.triggers,
+            # 與每次進場都辨識一次相比省下的呼叫（最多每次進場一次）
+            'llm_calls_avoided': self.passes_without_trigger,
+            'last_trigger_at': self.last_trigger_at,
+            'last_job_id': self.last_job_id,
+        }
+
+    def _run(self):
+        label = str(self.camera.index)
+        seq = 0
+        while not self._stop.is_set():
+            started = time.monotonic()
+            frame = self.camera.wait_for_frame(seq, timeout=settings.CAMERA_FRAME_TIMEOUT)
+            if frame is None:
+                self._stop.wait(self.interval or 0.5)
+                continue
+            seq = frame.seq
+            try:
+                with metrics.stage('motion_detect'):
+                    event = self.detector.update(frame.image)
+            except Exception as e:
+                logger.warning("相機 %s 車輛偵測失敗: %s", label, e)
+                event = None
+            self.frames_analyzed += 1
+            MOTION_FRAMES.inc(camera=label)
+            if event is not None:
+                MOTION_EVENTS.inc(camera=label, event=event)
+                logger.info("相機 %s 車輛偵測: %s", label, event)
+            if event == 'enter':
+                self.vehicles += 1
+                self._visit_triggered = False
+            elif event in ('exit', 'relearn'):
+                if not self._visit_triggered:
+                    self.passes_without_trigger += 1
+            elif event == 'settled':
+                self._visit_triggered = True
+                self.triggers += 1
+                self.last_trigger_at = time.time()
+                try:
+                    job = self.on_trigger(self.camera, frame)
+                    self.last_job_id = getattr(job, 'pk', None)
+                except Exception as e:
+                    logger.warning("相機 %s 送出辨識失敗: %s", label, e)
+
+            remaining = self.interval - (time.monotonic() - started)
+            if remaining > 0:
+                self._stop.wait(remaining)
+
+
+_triggers_lock = threading.Lock()
+_triggers = {}
+
+
+def start_motion_triggers(indices=None):
+    """
+    為 MOTION_TRIGGER_CAMERAS 的相機啟動進場偵測（由 wsgi/asgi 進入點呼叫）
+    多個 worker process 時只在一個 worker 設定，否則同一台車會被每個 worker 各送一次
+    """
+    from .camera import get_camera
+    indices = settings.MOTION_TRIGGER_CAMERAS if indices is None else indices
+    with _triggers_lock:
+        for index in indices:
+            if index not in _triggers:
+                _triggers[index] = MotionTrigger(get_camera(index), detector_from_settings(),
+                                                 sample_fps=settings.MOTION_SAMPLE_FPS).start()
+        return [_triggers[index] for index in indices]
+
+
+def motion_stats():
+    with _triggers_lock:
+        return [trigger.stats() for trigger in _triggers.values()]
@@ -0,0 +1,128 @@
+"""
+Process 內的車位佔用索引
+
+以 (floor, section) 為 key 統計各狀態的車位數，供 /api/spots/summary/ 以 O(1) 回傳，
+不必每個客戶端都下載整份車位清單自行計算。
+- 第一次使用時從 ParkingSpot 建立
+- ParkingSpotViewSet / occupy 寫入後以 apply() 立即增量更新
+- 其他 worker process 的寫入：讀取時比對全域版本號，只抓 version 大於已知版本的車位（走索引）
+"""
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+
+from .changes import current_version
+from .models import ParkingSpot
+
+STATUSES = [choice for choice, _ in ParkingSpot.STATUS_CHOICES]
+
+
+class SpotIndex(ABC):
+    """
+    以 ParkingSpot 為資料來源的 process 內索引基底類別
+    子類別實作 _clear / _set(row) / _unset(spot_id)，呼叫時已持有 self._lock
+    """
+    fields = ('id', 'floor', 'section', 'status')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._known_version = None
+
+    def apply(self, spot):
+        """單一車位寫入後呼叫（spot 為 ParkingSpot 或含 fields 欄位的 dict）"""
+        row = spot if isinstance(spot, dict) else {f: getattr(spot, f) for f in self.fields}
+        with self._lock:
+            if self._known_version is not None:
+                self._set(row)
+
+    def remove(self, spot_id):
+        with self._lock:
+            if self._known_version is not None:
+                self._unset(spot_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._known_version = None
+            self._clear()
+
+    def _sync(self):
+        """補上其他 process 的寫入；呼叫時已持有鎖"""
+        version, reset_value = current_version()
+        if self._known_version is None or reset_value > self._known_version:
+            self._clear()
+            for row in ParkingSpot.objects.values(*self.fields):
+                self._set(row)
+            self._known_version = version
+        elif version > self._known_version:
+            # 只抓 version 較新的車位（走索引），通常是零筆
+            for row in ParkingSpot.objects.filter(version__gt=self._known_version).values(*self.fields):
+                self._set(row)
+            self._known_version = version
+
+    @abstractmethod
+    def _clear(self):
+        """清空索引"""
+
+    @abstractmethod
+    def _set(self, row):
+        """加入或更新一個車位（row 含 fields 欄位）"""
+
+    @abstractmethod
+    def _unset(self, spot_id):
+        """移除一個車位；不在索引內時忽略"""
+
+
+class OccupancyIndex(SpotIndex):
+    def __init__(self):
+        super().__init__()
+        self._spots = {}       # id -> (floor, section, status)
+        self._counts = {}      # (floor, section) -> Counter(status)
+        self._snapshot = None  # 快取的 summary 結果，有變更時清除
+
+    def summary(self):
+        with self._lock:
+            self._sync()
+            if self._snapshot is None:
+                self._snapshot = self._build_snapshot()
+            return dict(self._snapshot, version=self._known_version)
+
+    # --- 內部方法（呼叫時已持有鎖） ---
+
+    def _clear(self):
+        self._spots.clear()
+        self._counts.clear()
+        self._snapshot = None
+
+    def _set(self, row):
+        self._unset(row['id'])
+        key = (row['floor'], row['section'])
+        self._spots[row['id']] = (row['floor'], row['section'], row['status'])
+        self._counts.setdefault(key, Counter())[row['status']] += 1
+        self._snapshot = None
+
+    def _unset(self, spot_id):
+        previous = self._spots.pop(spot_id, None)
+        if previous is None:
+            return
+        floor, section, old_status = previous
+        counts = self._counts[(floor, section)]
+        counts[old_status] -= 1
+        if not +counts:
+            del self._counts[(floor, section)]
+        self._snapshot = None
+
+    def _build_snapshot(self):
+        totals = Counter()
+        floors = []
+        for (floor, section), counts in sorted(self._counts.items()):
+            entry = {'floor': floor, 'section': section}
+            entry.update({s: counts.get(s, 0) for s in STATUSES})
+            entry['total'] = sum(counts.values())
+            totals.update(counts)
+            floors.append(entry)
+        total = {s: totals.get(s, 0) for s in STATUSES}
+        total['total'] = sum(totals.values())
+        return {'total': total, 'floors': floors}
+
+
+occupancy_index = OccupancyIndex()
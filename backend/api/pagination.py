@@ -0,0 +1,82 @@
+"""
+LogEntry 的 keyset (cursor) 分頁
+
+依 (timestamp, id) 由新到舊排序，cursor 記錄上一頁最後一筆的 (timestamp, id)，
+下一頁以索引範圍掃描取得，不論資料表多大、翻到第幾頁，成本都相同（不使用 OFFSET）。
+"""
+import base64
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TimestampCursorPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self._page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            timestamp, pk = self._decode_cursor(cursor)
+            # timestamp <= ts 走索引範圍掃描，再排除同一時間點中 id 不小於游標的資料
+            queryset = queryset.filter(timestamp__lte=timestamp).exclude(timestamp=timestamp, id__gte=pk)
+
+        rows = list(queryset.order_by('-timestamp', '-id')[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self._encode_cursor(self.last))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def _page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw is None:
+            return settings.LOG_PAGE_SIZE
+        try:
+            return max(1, min(int(raw), settings.LOG_MAX_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: 'must be an integer'})
+
+    @staticmethod
+    def _encode_cursor(entry):
+        raw = f'{entry.timestamp.isoformat()}|{entry.id}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def _decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            timestamp, pk = base64.urlsafe_b64decode(padded).decode().rsplit('|', 1)
+            parsed = parse_datetime(timestamp)
+            if parsed is None:
+                raise ValueError(timestamp)
+            return parsed, int(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise ValidationError({self.cursor_query_param: 'invalid cursor'})
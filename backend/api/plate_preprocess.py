@@ -0,0 +1,91 @@
+"""
+送往 LLM 前的車牌區域前處理
+
+以 OpenCV 邊緣 + 輪廓找出最像車牌的矩形區域，裁切後縮放到固定寬度並以可調整的 JPEG 品質重新編碼。
+上傳量與模型推論時間都隨像素數增加，只送車牌區域可以同時降低兩者。
+找不到候選區域時退回整張畫面（限制最大寬度）。
+"""
+from collections import namedtuple
+
+import cv2
+
+PreprocessResult = namedtuple('PreprocessResult', ['jpeg', 'region', 'size'])
+
+# 偵測時先把畫面縮到這個寬度，輪廓搜尋的成本與解析度無關
+_DETECT_WIDTH = 640
+# 車牌長寬比範圍（台灣/歐美車牌約 2:1 ~ 5:1，保留透視變形的空間）
+_MIN_ASPECT, _MAX_ASPECT = 1.8, 6.5
+# 候選區域面積佔整張畫面的比例範圍
+_MIN_AREA_RATIO, _MAX_AREA_RATIO = 0.002, 0.25
+
+
+def find_plate_region(image):
+    """
+    回傳最可能的車牌區域 (x, y, w, h)（原圖座標）；找不到時回傳 None
+    """
+    height, width = image.shape[:2]
+    scale = min(1.0, _DETECT_WIDTH / width)
+    small = cv2.resize(image, (int(width * scale), int(height * scale)),
+                       interpolation=cv2.INTER_AREA) if scale < 1.0 else image
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    # 保留邊緣的平滑 -> Canny -> 橫向閉運算把字元連成一整塊
+    gray = cv2.bilateralFilter(gray, 9, 75, 75)
+    edges = cv2.Canny(gray, 50, 200)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (9, 3))
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
+
+    contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    frame_area = float(gray.shape[0] * gray.shape[1])
+    best, best_score = None, 0.0
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:40]:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h == 0:
+            continue
+        aspect = w / h
+        area_ratio = (w * h) / frame_area
+        if not (_MIN_ASPECT <= aspect <= _MAX_ASPECT and _MIN_AREA_RATIO <= area_ratio <= _MAX_AREA_RATIO):
+            continue
+        # 越接近實心矩形、四個角越明確的輪廓分數越高
+        rectangularity = cv2.contourArea(contour) / float(w * h)
+        corners = len(cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True))
+        score = rectangularity * (1.0 if 4 <= corners <= 8 else 0.6)
+        if score > best_score:
+            best, best_score = (x, y, w, h), score
+
+    if best is None or best_score < 0.45:
+        return None
+    x, y, w, h = (int(round(v / scale)) for v in best)
+    return x, y, w, h
+
+
+def preprocess_for_llm(image, target_width=480, quality=85, fallback_max_width=1024, padding=0.15):
+    """
+    裁切車牌區域並編碼成 JPEG bytes
+    回傳 PreprocessResult(jpeg, region, size)；region 為 None 表示使用整張畫面
+    """
+    height, width = image.shape[:2]
+    region = find_plate_region(image)
+    if region is not None:
+        x, y, w, h = region
+        pad_x, pad_y = int(w * padding), int(h * padding * 2)
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1, y1 = min(width, x + w + pad_x), min(height, y + h + pad_y)
+        crop = image[y0:y1, x0:x1]
+        # 車牌太小時放大到 target_width，讓模型看得清楚
+        ratio = target_width / crop.shape[1]
+        interpolation = cv2.INTER_CUBIC if ratio > 1.0 else cv2.INTER_AREA
+        out = cv2.resize(crop, (target_width, max(1, int(crop.shape[0] * ratio))),
+                         interpolation=interpolation)
+        region = (x0, y0, x1 - x0, y1 - y0)
+    elif width > fallback_max_width:
+        ratio = fallback_max_width / width
+        out = cv2.resize(image, (fallback_max_width, max(1, int(height * ratio))),
+                         interpolation=cv2.INTER_AREA)
+    else:
+        out = image
+
+    ok, buffer = cv2.imencode('.jpg', out, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        return None
+    return PreprocessResult(buffer.tobytes(), region, (out.shape[1], out.shape[0]))
@@ -0,0 +1,171 @@
+"""
+車牌模糊查詢：出場時以辨識結果找回停放的車位
+
+LLM 讀到的車牌常有字元混淆（0/O、8/B、5/S...），完全比對會找不到車。
+- normalize_plate()：統一大小寫、全形半形並去掉 - 與空白，存進 ParkingSpot.plate_normalized（有資料庫索引）
+- plate_distance()：加權編輯距離，易混淆字元互換只算 CONFUSABLE_COST，其他插入/刪除/替換算 1
+- PlateSearchIndex：process 內只收錄 OCCUPIED 車位的車牌，以「混淆字元歸一化後」的 bigram 倒排索引篩選候選，
+  再以加權編輯距離排序取前 k 筆。易混淆字元歸一化後完全相同，不會因此被篩掉；
+  每多一個真正的錯字最多少 2 個共同 bigram，共同 bigram 不足的車牌不可能在距離上限內，不必計算距離。
+  同步方式與 occupancy / allocation 的索引相同（SpotIndex）。
+"""
+import heapq
+import unicodedata
+from collections import Counter
+
+from .models import ParkingSpot
+from .occupancy import SpotIndex
+
+# 同一組內的字元互相混淆；歸一化成每組第一個字元
+CONFUSABLE_GROUPS = ('0ODQ', '1IL', '2Z', '5S', '6G', '8B')
+CONFUSABLE_COST = 0.25
+_FOLD = {ch: group[0] for group in CONFUSABLE_GROUPS for ch in group}
+
+# 辨識失敗的結果，不當成車牌
+UNKNOWN_PLATES = {'UNKNOWN'}
+
+
+def normalize_plate(value):
+    """'abc-1234' / 'ＡＢＣ １２３４' -> 'ABC1234'；空值或 UNKNOWN 回傳 None"""
+    if not value:
+        return None
+    text = unicodedata.normalize('NFKC', str(value)).upper()
+    text = ''.join(ch for ch in text if ch.isalnum())[:32]
+    if not text or text in UNKNOWN_PLATES:
+        return None
+    return text
+
+
+def fold_confusables(plate):
+    return ''.join(_FOLD.get(ch, ch) for ch in plate)
+
+
+def _bigrams(folded):
+    padded = f'^{folded}$'
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def plate_distance(a, b, limit=None):
+    """
+    加權編輯距離（a、b 為 normalize_plate 後的字串）
+    limit 不為 None 時，確定超過 limit 就提前回傳 float('inf')
+    """
+    if a == b:
+        return 0.0
+    if limit is not None and abs(len(a) - len(b)) > limit:
+        return float('inf')
+    folded_b = fold_confusables(b)
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        fa = _FOLD.get(ca, ca)
+        current = [float(i)]
+        for j, cb in enumerate(b, 1):
+            if ca == cb:
+                cost = 0.0
+            elif fa == folded_b[j - 1]:
+                cost = CONFUSABLE_COST
+            else:
+                cost = 1.0
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost))
+        if limit is not None and min(current) > limit:
+            return float('inf')
+        previous = current
+    return previous[-1]
+
+
+class PlateSearchIndex(SpotIndex):
+    fields = ('id', 'status', 'plate_normalized')
+
+    def __init__(self):
+        super().__init__()
+        self._spots = {}   # spot id -> plate_normalized（只有 OCCUPIED 且有車牌的車位）
+        self._plates = {}  # plate_normalized -> {spot id, ...}
+        self._grams = {}   # bigram（混淆字元歸一化後）-> {plate_normalized, ...}
+
+    def search(self, plate, limit=5, max_distance=2.0):
+        """
+        回傳 (results, version)；results 為 [(spot_id, plate_normalized, distance), ...]，距離由小到大
+        只回傳距離 <= max_distance 的車牌；同一車牌停了多個車位時各自列出
+        """
+        query = normalize_plate(plate)
+        with self._lock:
+            self._sync()
+            version = self._known_version
+            if query is None or limit <= 0:
+                return [], version
+            scored = []
+            for candidate in self._candidates(query, max_distance):
+                distance = plate_distance(query, candidate, max_distance)
+                if distance <= max_distance:
+                    scored.append((distance, candidate))
+            results = []
+            for distance, candidate in heapq.nsmallest(limit, scored):
+                results.extend((spot_id, candidate, round(distance, 2)) for spot_id in sorted(self._plates[candidate]))
+        return results[:limit], version
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return len(self._spots)
+
+    # --- 內部方法（呼叫時已持有鎖） ---
+
+    def _candidates(self, query, max_distance):
+        # 歸一化後的編輯次數 <= 加權距離，每次編輯最多破壞查詢字串的 2 個 bigram
+        edits = int(max_distance)
+        grams = _bigrams(fold_confusables(query))
+        required = len(grams) - 2 * edits
+        if required <= 0:
+            # 查詢太短，bigram 無法篩選
+            candidates = self._plates.keys()
+        else:
+            shared = Counter()
+            for gram in grams:
+                shared.update(self._grams.get(gram, ()))
+            candidates = [plate for plate, count in shared.items() if count >= required]
+        return [plate for plate in candidates if abs(len(plate) - len(query)) <= edits]
+
+    def _clear(self):
+        self._spots.clear()
+        self._plates.clear()
+        self._grams.clear()
+
+    def _set(self, row):
+        self._unset(row['id'])
+        plate = row['plate_normalized']
+        if row['status'] != 'OCCUPIED' or not plate:
+            return
+        self._spots[row['id']] = plate
+        spot_ids = self._plates.get(plate)
+        if spot_ids is None:
+            spot_ids = self._plates[plate] = set()
+            for gram in _bigrams(fold_confusables(plate)):
+                self._grams.setdefault(gram, set()).add(plate)
+        spot_ids.add(row['id'])
+
+    def _unset(self, spot_id):
+        plate = self._spots.pop(spot_id, None)
+        if plate is None:
+            return
+        spot_ids = self._plates[plate]
+        spot_ids.discard(spot_id)
+        if spot_ids:
+            return
+        del self._plates[plate]
+        for gram in _bigrams(fold_confusables(plate)):
+            plates = self._grams.get(gram)
+            if plates is not None:
+                plates.discard(plate)
+                if not plates:
+                    del self._grams[gram]
+
+
+def find_spots_by_plate(plate):
+    """以資料庫索引完全比對（歸一化後）目前停放該車牌的車位"""
+    normalized = normalize_plate(plate)
+    if normalized is None:
+        return ParkingSpot.objects.none()
+    return ParkingSpot.objects.filter(plate_normalized=normalized, status='OCCUPIED').order_by('id')
+
+
+plate_search_index = PlateSearchIndex()
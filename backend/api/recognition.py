@@ -0,0 +1,320 @@
+"""
+車牌辨識流程（views 與辨識工作 worker 共用）
+
+畫面快取 -> 車牌區域前處理 -> LLM（單張、micro-batching 分派器，或 ASGI 下的 async httpx）。
+OpenCV 不在 import 時載入：本模組與 camera / plate_preprocess / recognition_cache 都在第一次處理影像時
+才 import cv2，只提供車位與紀錄 API 的 worker 與 manage.py 指令不會載入 OpenCV。
+"""
+import asyncio
+import base64
+import functools
+import json
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import metrics
+from .batching import RecognitionBatcher
+from .llm_client import LLMClientError, get_async_llm_client, get_llm_client
+from .recognition_cache import frame_key, recognition_cache
+
+logger = logging.getLogger(__name__)
+
+LLM_REQUESTS = metrics.counter('llm_requests_total', 'Plate recognition calls to the LLM service',
+                               ['mode', 'outcome'])
+RECOGNITIONS = metrics.counter('recognitions_total', 'Plate recognitions by where the result came from',
+                               ['endpoint', 'source'])
+PREPROCESS_RESULTS = metrics.counter('plate_preprocess_total', 'Preprocessed frames by whether a plate region was found',
+                                     ['region'])
+PREPROCESS_BYTES = metrics.counter('plate_preprocess_output_bytes_total', 'JPEG bytes sent to the LLM after preprocessing')
+PREPROCESS_INPUT_BYTES = metrics.counter('plate_preprocess_input_bytes_total',
+                                         'Original image bytes of uploaded frames that were preprocessed')
+LLM_BATCH_SIZE = metrics.histogram('llm_batch_size', 'Images per batched LLM request',
+                                   buckets=(1, 2, 4, 8, 16, 32, 64))
+
+
+def parse_plate_response(ai_response_text):
+    try:
+        # 1. 使用 Regex 搜尋字串中第一個被 {} 包住的內容 (支援換行)
+        match = re.search(r'\{.*\}', ai_response_text, re.DOTALL)
+        
+        if match:
+            json_str = match.group()
+            # 2. 解析 JSON
+            data = json.loads(json_str)
+            return data
+        else:
+            logger.warning("找不到 JSON 格式: %.200s", ai_response_text)
+            return {"plate_number": "UNKNOWN"}
+
+    except json.JSONDecodeError:
+        logger.warning("JSON 格式錯誤 (可能是引號問題): %.200s", ai_response_text)
+        return {"plate_number": "UNKNOWN"}
+
+
+PLATE_PROMPT = """Role: You are an Automated License Plate Recognition (ALPR) system.
+Task: Analyze the provided image and extract the vehicle license plate number.
+
+Strict Output Rules:
+1. Output ONLY a valid JSON object.
+2. Format: {"plate_number": "YOUR_RESULT_HERE"}
+3. Convert all characters to UPPERCASE.
+4. Remove all spaces, dashes ('-'), and special characters. Return only alphanumeric characters (A-Z, 0-9).
+5. If the plate is unclear, too small, or not visible, return: {"plate_number": "UNKNOWN"}
+6. DO NOT provide any explanations, markdown formatting (like ```json), or conversational text. Just the raw JSON string.
+"""
+
+
+def post_to_llm(image_base64: str, raise_errors=False) -> str:
+    """
+    送出單張影像，回傳車牌號碼；失敗時回傳 "UNKNOWN"
+    raise_errors=True 時 LLM 服務的失敗（LLMClientError，含斷路器開啟）改為拋出，讓呼叫端可以重試
+    """
+    payload = {
+        "key": "text+image",
+        "text_query": PLATE_PROMPT,
+        "image_base64": image_base64,
+    }
+    client = get_llm_client()
+    try:
+        with metrics.stage('llm_request'):
+            resp_data = client.post_json(payload)
+        with metrics.stage('llm_parse'):
+            plate_number_data = parse_plate_response(resp_data.get("response", "{}"))
+    except Exception as e:
+        LLM_REQUESTS.inc(mode='sync', outcome='error')
+        logger.warning("LLM 連線失敗: %s", e)
+        if raise_errors and isinstance(e, LLMClientError):
+            raise
+        return "UNKNOWN"
+    LLM_REQUESTS.inc(mode='sync', outcome='ok')
+    return plate_number_data.get("plate_number", "UNKNOWN")
+
+
+def _post_or_error(image_base64):
+    try:
+        return post_to_llm(image_base64, raise_errors=True)
+    except LLMClientError as e:
+        return e
+
+
+def post_batch_to_llm(images_base64, raise_errors=False):
+    """
+    一次送出多張影像，回傳同樣順序的車牌號碼
+    有設定 LLM_BATCH_URL 時以單一請求送出；否則透過連線池平行送出單張請求
+    raise_errors=True 時 LLM 服務的失敗不轉成 "UNKNOWN"：批次請求失敗時拋出 LLMClientError，
+    平行送出時失敗的那幾張在結果中以例外物件表示（RecognitionBatcher 交給對應的 Future）
+    """
+    if not settings.LLM_BATCH_URL:
+        with ThreadPoolExecutor(max_workers=min(len(images_base64), settings.LLM_MAX_IN_FLIGHT)) as pool:
+            results = list(pool.map(_post_or_error, images_base64))
+        if raise_errors:
+            return results
+        return ["UNKNOWN" if isinstance(r, Exception) else r for r in results]
+
+    payload = {
+        "key": "text+images",
+        "text_query": PLATE_PROMPT,
+        "images_base64": images_base64,
+    }
+    LLM_BATCH_SIZE.observe(len(images_base64))
+    try:
+        with metrics.stage('llm_batch_request'):
+            resp_data = get_llm_client().post_json(payload, url=settings.LLM_BATCH_URL)
+        responses = resp_data.get("responses", [])
+    except Exception as e:
+        LLM_REQUESTS.inc(mode='batch', outcome='error')
+        logger.warning("LLM 批次請求失敗，%d 張: %s", len(images_base64), e)
+        if raise_errors and isinstance(e, LLMClientError):
+            raise
+        return ["UNKNOWN"] * len(images_base64)
+    LLM_REQUESTS.inc(mode='batch', outcome='ok')
+
+    plates = [parse_plate_response(text).get("plate_number", "UNKNOWN") for text in responses]
+    return plates + ["UNKNOWN"] * (len(images_base64) - len(plates))
+
+
+_batcher_lock = threading.Lock()
+_batcher = None
+
+
+def get_recognition_batcher():
+    """
+    取得共用的 micro-batching 分派器（單例模式）
+    """
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                # 失敗以例外回報給各 Future：辨識工作需要區分 LLM 失敗與真的讀不到車牌
+                _batcher = RecognitionBatcher(
+                    functools.partial(post_batch_to_llm, raise_errors=True),
+                    max_batch_size=settings.RECOGNITION_BATCH_MAX_SIZE,
+                    max_wait_ms=settings.RECOGNITION_BATCH_MAX_WAIT_MS,
+                )
+    return _batcher
+
+
+def batcher_stats():
+    """分派器的統計；尚未建立（沒有走過批次路徑）時回傳 None"""
+    return _batcher.stats() if _batcher is not None else None
+
+
+metrics.gauge('recognition_batch_queue', 'Images waiting in the micro-batching dispatcher',
+              fn=lambda: (batcher_stats() or {}).get('queued', 0))
+
+
+def prepare_frame(frame, base64_str=None, timings=None):
+    """
+    辨識前置流程：畫面快取 -> 車牌區域前處理
+    frame 為解碼後的 BGR 影像（None 時略過快取），base64_str 為已編碼好的影像（可省略）
+    回傳 (image_hash, cached_plate, base64_str)；cached_plate 不為 None 時不必再呼叫 LLM
+    各階段耗時記錄到 metrics，並以毫秒寫入 timings
+    """
+    timings = timings if timings is not None else {}
+
+    # 相同的畫面直接回傳快取結果
+    image_hash = None
+    if frame is not None:
+        with metrics.stage('cache', timings):
+            image_hash = frame_key(frame)
+            cached = recognition_cache.get(image_hash)
+        if cached is not None:
+            return image_hash, cached, base64_str
+
+    # 只送車牌區域給 LLM：裁切、縮放並重新編碼（找不到車牌時送整張畫面）
+    if frame is not None and settings.PLATE_PREPROCESS_ENABLED:
+        from .plate_preprocess import preprocess_for_llm
+        with metrics.stage('preprocess', timings):
+            result = preprocess_for_llm(
+                frame,
+                target_width=settings.PLATE_TARGET_WIDTH,
+                quality=settings.PLATE_JPEG_QUALITY,
+                fallback_max_width=settings.PLATE_FALLBACK_MAX_WIDTH,
+            )
+        if result is not None:
+            # 上傳的影像才知道原始大小（相機畫面沒有原始 JPEG）
+            original_bytes = len(base64_str) * 3 // 4 if base64_str else None
+            PREPROCESS_RESULTS.inc(region='found' if result.region else 'full_frame')
+            PREPROCESS_BYTES.inc(len(result.jpeg))
+            if original_bytes:
+                PREPROCESS_INPUT_BYTES.inc(original_bytes)
+            logger.debug("影像前處理完成，耗時: %.2fms，車牌區域: %s，原始: %s bytes，送出: %d bytes",
+                         timings['preprocess_ms'], result.region or '未找到 (整張畫面)',
+                         original_bytes or '-', len(result.jpeg))
+            base64_str = base64.b64encode(result.jpeg).decode('ascii')
+
+    if base64_str is None:
+        import cv2
+        with metrics.stage('encode', timings):
+            _, buffer = cv2.imencode('.jpg', frame)
+            base64_str = base64.b64encode(buffer).decode('ascii')
+
+    return image_hash, None, base64_str
+
+
+def remember_result(image_hash, plate_number):
+    # UNKNOWN 不快取，讓下一次重試仍會送往 LLM
+    if image_hash is not None and plate_number != 'UNKNOWN':
+        recognition_cache.set(image_hash, plate_number)
+
+
+def recognize_frame(frame, base64_str=None, timings=None, raise_errors=False):
+    """
+    車牌辨識流程：畫面快取 -> 車牌區域前處理 -> post_to_llm（或 micro-batching 分派器）
+    回傳 (plate_number, cached)；各階段耗時 (ms) 寫入 timings
+    LLM 服務失敗時回傳 "UNKNOWN"；raise_errors=True 時拋出 LLMClientError（辨識工作據此重試）
+    """
+    timings = timings if timings is not None else {}
+    image_hash, cached, base64_str = prepare_frame(frame, base64_str, timings)
+    if cached is not None:
+        return cached, True
+
+    with metrics.stage('llm', timings):
+        try:
+            if settings.RECOGNITION_BATCHING_ENABLED:
+                plate_number = get_recognition_batcher().submit(base64_str).result()
+            else:
+                plate_number = post_to_llm(base64_str, raise_errors=raise_errors)
+        except LLMClientError:
+            if raise_errors:
+                raise
+            plate_number = 'UNKNOWN'
+
+    remember_result(image_hash, plate_number)
+    return plate_number, False
+
+
+# --- ASGI async 路徑：等待 LLM 時不佔用執行緒，OpenCV / 相機工作交給專用執行緒池 ---
+
+_blocking_executor = ThreadPoolExecutor(max_workers=settings.ASYNC_BLOCKING_THREADS,
+                                        thread_name_prefix='async-blocking')
+
+
+async def run_blocking(func, *args, **kwargs):
+    """在專用執行緒池執行阻塞工作，不卡住 event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_executor, functools.partial(func, *args, **kwargs))
+
+
+async def post_to_llm_async(image_base64: str) -> str:
+    client = await get_async_llm_client()
+    if client is None:
+        # 沒有長期存在的 event loop（WSGI / runserver）：走共用的同步連線池，遵守 LLM_MAX_IN_FLIGHT
+        return await run_blocking(post_to_llm, image_base64)
+    payload = {
+        "key": "text+image",
+        "text_query": PLATE_PROMPT,
+        "image_base64": image_base64,
+    }
+    try:
+        with metrics.stage('llm_request'):
+            resp_data = await client.post_json(payload)
+        with metrics.stage('llm_parse'):
+            plate_number_data = parse_plate_response(resp_data.get("response", "{}"))
+    except Exception as e:
+        LLM_REQUESTS.inc(mode='async', outcome='error')
+        logger.warning("LLM (async) 連線失敗: %s", e)
+        return "UNKNOWN"
+    LLM_REQUESTS.inc(mode='async', outcome='ok')
+    return plate_number_data.get("plate_number", "UNKNOWN")
+
+
+async def recognize_frame_async(frame, base64_str=None, timings=None):
+    """
+    recognize_frame 的 async 版本：前處理在執行緒池執行，LLM 呼叫以 httpx 非同步等待
+    啟用 micro-batching 時等待分派器的 Future，同樣不佔用執行緒
+    """
+    timings = timings if timings is not None else {}
+    image_hash, cached, base64_str = await run_blocking(prepare_frame, frame, base64_str, timings)
+    if cached is not None:
+        return cached, True
+
+    with metrics.stage('llm', timings):
+        if settings.RECOGNITION_BATCHING_ENABLED:
+            try:
+                plate_number = await asyncio.wrap_future(get_recognition_batcher().submit(base64_str))
+            except LLMClientError:
+                plate_number = 'UNKNOWN'
+        else:
+            plate_number = await post_to_llm_async(base64_str)
+
+    remember_result(image_hash, plate_number)
+    return plate_number, False
+
+
+def warm_up_vision(indices=None):
+    """
+    預先載入 OpenCV 與車牌前處理，並開啟相機開始擷取（VISION_WARMUP=1 的 worker 由 wsgi/asgi 進入點呼叫）
+    第一個快照 / 辨識請求不必等待 import cv2 與相機初始化；之後沒有人取用時相機照常在閒置逾時後釋放
+    """
+    if not settings.VISION_WARMUP:
+        return None
+    import cv2  # noqa: F401
+    from . import plate_preprocess  # noqa: F401
+    from .camera import get_camera
+    indices = settings.CAMERA_INDICES if indices is None else indices
+    return [get_camera(index) for index in indices]
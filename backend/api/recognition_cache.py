@@ -0,0 +1,132 @@
+"""
+車牌辨識結果快取
+
+以解碼後影像像素的 BLAKE2b 雜湊為 key：完全相同的畫面（上傳重試、相機尚未產生新畫面）
+直接回傳先前的 plate_number，不必再呼叫 post_to_llm。支援 TTL 與 LRU 淘汰。
+
+整張畫面的感知雜湊 (dHash, 64 bit) 只保留作為選用的近似比對 (max_distance > 0)：
+縮到 9x8 後車牌只剩幾個像素，同一個閘門場景中不同車牌的 dHash 幾乎相同，
+近似比對會把前一台車的車牌回傳給下一台車，因此預設關閉 (max_distance=0)。
+"""
+import base64
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import metrics
+
+
+def decode_image(base64_str):
+    """Base64 字串 -> OpenCV BGR 影像；無法解碼時回傳 None"""
+    import cv2
+    import numpy as np
+    try:
+        raw = base64.b64decode(base64_str)
+    except (ValueError, TypeError):
+        return None
+    return cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def dhash(image, hash_size=8):
+    """
+    差異雜湊：縮成 (hash_size+1) x hash_size 灰階圖，比較相鄰像素亮度
+    回傳 hash_size*hash_size 位元的整數
+    """
+    import cv2
+    import numpy as np
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def frame_key(image):
+    """快取 key：(像素內容的 BLAKE2b digest, dHash)；尺寸不同的畫面 digest 一定不同"""
+    digest = hashlib.blake2b(image.tobytes(), digest_size=16)
+    digest.update(repr(image.shape).encode())
+    return digest.digest(), dhash(image)
+
+
+class RecognitionCache:
+    """
+    執行緒安全的 LRU + TTL 快取，key 為 frame_key() 的結果
+    完全相同的畫面以 digest O(1) 命中；max_distance > 0 時再線性掃描 dHash 近似的畫面
+    （容量通常只有數百筆，掃描成本遠低於一次 LLM 呼叫）
+    """
+    def __init__(self, max_entries=256, ttl=10.0, max_distance=0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # digest -> (plate_number, expires_at, dhash)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, image_key):
+        digest, image_hash = image_key
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            key = digest if digest in self._entries else None
+            if key is None and self.max_distance > 0:
+                best = self.max_distance + 1
+                for candidate, (_, _, candidate_hash) in self._entries.items():
+                    distance = hamming(candidate_hash, image_hash)
+                    if distance < best:
+                        key, best = candidate, distance
+            if key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def set(self, image_key, plate_number):
+        digest, image_hash = image_key
+        with self._lock:
+            self._entries[digest] = (plate_number, time.monotonic() + self.ttl, image_hash)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'ttl': self.ttl,
+                'max_distance': self.max_distance,
+            }
+
+    def _evict_expired(self, now):
+        # OrderedDict 依最近使用排序，過期的項目不一定在最前面，因此全部檢查
+        expired = [k for k, (_, expires_at, _) in self._entries.items() if expires_at <= now]
+        for k in expired:
+            del self._entries[k]
+
+
+recognition_cache = RecognitionCache(
+    max_entries=settings.RECOGNITION_CACHE_SIZE,
+    ttl=settings.RECOGNITION_CACHE_TTL,
+    max_distance=settings.RECOGNITION_CACHE_MAX_DISTANCE,
+)
+
+metrics.gauge('recognition_cache_entries', 'Entries in the frame recognition cache',
+              fn=lambda: recognition_cache.stats()['entries'])
+metrics.counter('recognition_cache_lookups_total', 'Recognition cache lookups by result', ['result'],
+                fn=lambda: {('hit',): recognition_cache.hits, ('miss',): recognition_cache.misses})
@@ -0,0 +1,24 @@
+from rest_framework.renderers import BaseRenderer
+
+
+class JPEGRenderer(BaseRenderer):
+    """
+    讓 APIView 通過 image/jpeg 的內容協商；view 直接回傳 HttpResponse，不經過 render
+    """
+    media_type = 'image/jpeg'
+    format = 'jpg'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class MJPEGRenderer(JPEGRenderer):
+    media_type = 'multipart/x-mixed-replace'
+    format = 'mjpeg'
+
+
+class EventStreamRenderer(JPEGRenderer):
+    media_type = 'text/event-stream'
+    format = 'sse'
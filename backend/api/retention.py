@@ -0,0 +1,159 @@
+"""
+LogEntry 保存期限與壓縮封存
+
+超過 LOG_RETENTION_DAYS 天的紀錄依日期寫入 append-only 的 gzip JSON Lines 檔
+(LOG_ARCHIVE_DIR/logs-YYYY-MM-DD.jsonl.gz，每天一個檔案)，再分批從 SQLite 刪除。
+每批先寫入並 fsync 封存檔、再以獨立交易刪除，因此中途中斷最多造成封存檔內重複，不會遺失紀錄。
+
+執行方式：
+- python manage.py archive_logs --days 30
+- 伺服器 process 內的定期任務（start_retention_scheduler，由 wsgi/asgi 進入點啟動）
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .changes import mark_reset
+from .db import retry_on_locked
+from .models import LogEntry
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = ('id', 'timestamp', 'type', 'message', 'spot_id', 'version')
+# 封存鎖超過此秒數視為上一次執行異常結束留下的
+_STALE_LOCK_SECONDS = 3600
+
+
+class ArchiveLocked(Exception):
+    """另一個 process 正在封存"""
+
+
+def _acquire_lock(archive_dir):
+    lock_path = archive_dir / '.archive.lock'
+    try:
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        if time.time() - lock_path.stat().st_mtime < _STALE_LOCK_SECONDS:
+            raise ArchiveLocked(str(lock_path))
+        lock_path.unlink(missing_ok=True)
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    os.write(fd, str(os.getpid()).encode())
+    os.close(fd)
+    return lock_path
+
+
+def _append_archive(path, rows):
+    # gzip 支援多個 member 串接，append 模式寫入的檔案可直接用 gzip.open 連續讀出
+    with gzip.open(path, 'at', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+            f.write('\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def archive_logs(days=None, archive_dir=None, chunk_size=None, now=None):
+    """
+    封存並刪除早於 days 天的紀錄，回傳封存筆數
+    days 省略時使用 LOG_RETENTION_DAYS；<= 0（未啟用保存期限）時拒絕執行，否則會封存並刪除所有紀錄
+    """
+    days = settings.LOG_RETENTION_DAYS if days is None else days
+    if days <= 0:
+        raise ValueError(f'retention days must be > 0, got {days}')
+    archive_dir = Path(archive_dir or settings.LOG_ARCHIVE_DIR)
+    chunk_size = chunk_size or settings.LOG_RETENTION_CHUNK_SIZE
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    lock_path = _acquire_lock(archive_dir)
+    total = 0
+    try:
+        while True:
+            rows = list(
+                LogEntry.objects.filter(timestamp__lt=cutoff)
+                .order_by('timestamp', 'id')
+                .values(*ARCHIVE_FIELDS)[:chunk_size]
+            )
+            if not rows:
+                break
+
+            by_day = defaultdict(list)
+            for row in rows:
+                by_day[row['timestamp'].date()].append(row)
+            for day, day_rows in by_day.items():
+                _append_archive(archive_dir / f'logs-{day.isoformat()}.jsonl.gz', day_rows)
+
+            _delete_chunk([row['id'] for row in rows])
+            total += len(rows)
+            # 讓其他寫入者有機會取得 SQLite 寫入鎖
+            time.sleep(0)
+    finally:
+        lock_path.unlink(missing_ok=True)
+
+    if total:
+        # 客戶端手上的舊紀錄已被移除，通知重新抓取
+        mark_reset()
+    return total
+
+
+@retry_on_locked
+def _delete_chunk(ids):
+    with transaction.atomic():
+        LogEntry.objects.filter(id__in=ids).delete()
+
+
+@retry_on_locked
+def truncate_logs():
+    """
+    清空 LogEntry 資料表（SQLite 為不帶 WHERE 的 DELETE，走 truncate 最佳化；PostgreSQL 為 TRUNCATE）
+    不經過 ORM 的逐筆收集，資料量再大也是常數時間
+    """
+    statements = connection.ops.sql_flush(no_style(), [LogEntry._meta.db_table])
+    with transaction.atomic(), connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+_scheduler_lock = threading.Lock()
+_scheduler = None
+
+
+def _run_scheduler(interval):
+    while True:
+        try:
+            archived = archive_logs()
+            if archived:
+                logger.info("紀錄封存完成，%d 筆", archived)
+        except ArchiveLocked:
+            pass
+        except Exception as e:
+            logger.exception("紀錄封存失敗: %s", e)
+        time.sleep(interval)
+
+
+def start_retention_scheduler():
+    """
+    啟動定期封存執行緒（LOG_RETENTION_DAYS > 0 時）；多個 worker 同時啟動時由封存鎖確保同一時間只有一個在執行
+    """
+    global _scheduler
+    if settings.LOG_RETENTION_DAYS <= 0:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            interval = settings.LOG_RETENTION_INTERVAL_HOURS * 3600
+            _scheduler = threading.Thread(target=_run_scheduler, args=(interval,),
+                                          name='log-retention', daemon=True)
+            _scheduler.start()
+    return _scheduler
@@ -1,14 +1,22 @@
 from rest_framework import serializers
-from .models import ParkingSpot, LogEntry
+from .models import ParkingSpot, LogEntry, RecognitionJob
 
 
 class ParkingSpotSerializer(serializers.ModelSerializer):
     class Meta:
         model = ParkingSpot
         fields = '__all__'
+        read_only_fields = ('version', 'plate_normalized')
 
 
 class LogEntrySerializer(serializers.ModelSerializer):
     class Meta:
         model = LogEntry
         fields = '__all__'
+        read_only_fields = ('version',)
+
+
+class RecognitionJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RecognitionJob
+        exclude = ('image_base64',)
@@ -0,0 +1,88 @@
+"""
+GET /api/spots/ 的快速讀取路徑
+
+每個瀏覽器每 5 秒輪詢一次完整清單，ModelSerializer 逐欄位轉換的成本與車位數成正比。
+- ETag 由 (最大車位版本號, 車位數, reset_value) 組成：資料沒變時回 304，不查詢也不序列化整張表
+- 直接取 .values() 的 dict，以 orjson（有安裝時）或標準 json 編碼，輸出與 ParkingSpotSerializer 相同
+- 超過 SPOTS_GZIP_MIN_BYTES 且客戶端接受 gzip 時壓縮
+- 同一個 ETag 的編碼結果（含壓縮後內容）快取在 process 內，多個客戶端共用
+"""
+import gzip
+import json
+import threading
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+
+from .changes import current_version
+from .models import ParkingSpot
+
+try:
+    import orjson
+except ImportError:  # 選用套件，沒有安裝時退回標準 json
+    orjson = None
+
+_cache_lock = threading.Lock()
+_cache = {}  # 'etag' / 'body' / 'gzip'
+
+
+def spots_etag():
+    stats = ParkingSpot.objects.aggregate(latest=Max('version'), count=Count('pk'))
+    _, reset_value = current_version()
+    return f'"spots-{stats["latest"] or 0}-{stats["count"]}-{reset_value}"'
+
+
+def _format_datetime(value, tz):
+    # 與 DRF DateTimeField 相同：轉成目前時區，UTC 以 Z 結尾
+    text = value.astimezone(tz).isoformat()
+    if text.endswith('+00:00'):
+        text = text[:-6] + 'Z'
+    return text
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_spots(queryset):
+    """queryset -> 與 ParkingSpotSerializer(many=True) 相同內容的 JSON bytes"""
+    fields = [f.attname for f in ParkingSpot._meta.concrete_fields]
+    rows = list(queryset.values(*fields))
+    tz = timezone.get_current_timezone()
+    for row in rows:
+        if row['parked_time'] is not None:
+            row['parked_time'] = _format_datetime(row['parked_time'], tz)
+    return dumps(rows)
+
+
+def spots_response(request, queryset):
+    etag = spots_etag()
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    with _cache_lock:
+        cached = dict(_cache) if _cache.get('etag') == etag else None
+    if cached is None:
+        body = encode_spots(queryset)
+        cached = {'etag': etag, 'body': body, 'gzip': None}
+        if len(body) >= settings.SPOTS_GZIP_MIN_BYTES:
+            cached['gzip'] = gzip.compress(body, compresslevel=settings.SPOTS_GZIP_LEVEL)
+        with _cache_lock:
+            _cache.clear()
+            _cache.update(cached)
+
+    use_gzip = cached['gzip'] is not None and 'gzip' in request.headers.get('Accept-Encoding', '')
+    response = HttpResponse(cached['gzip'] if use_gzip else cached['body'], content_type='application/json')
+    if use_gzip:
+        response['Content-Encoding'] = 'gzip'
+    response['Vary'] = 'Accept-Encoding'
+    response['ETag'] = etag
+    # 每次都向伺服器確認 (If-None-Match)，資料沒變時瀏覽器直接使用快取內容
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,79 @@
+"""
+車位狀態批次更新
+
+感測器巡檢或封閉整個樓層時一次改變大量車位：
+全部變更先一起驗證，再於單一交易內以 bulk_update 寫入並配發連續的變更版本號，
+取代逐筆 PATCH（每筆各自一個交易與完整的 serializer 來回）。
+"""
+from django.db import transaction
+from rest_framework import serializers
+
+from .changes import next_version
+from .db import retry_on_locked
+from .models import ParkingSpot
+from .plate_search import normalize_plate
+
+UPDATABLE_FIELDS = ('status', 'plate_number', 'abnormal_reason')
+
+
+class SpotChangeSerializer(serializers.Serializer):
+    id = serializers.CharField(max_length=32)
+    status = serializers.ChoiceField(choices=ParkingSpot.STATUS_CHOICES, required=False)
+    plate_number = serializers.CharField(max_length=32, required=False, allow_null=True, allow_blank=True)
+    abnormal_reason = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+
+
+@retry_on_locked
+def bulk_update_spots(changes, all_or_nothing=False):
+    """
+    changes: [{ "id": "A-1", "status": "ABNORMAL", "abnormal_reason": "..." }, ...]
+    與 PATCH 相同，只更新有提供的欄位
+    回傳 (results, updated_spots)；results 與 changes 順序相同：
+        { "id": "A-1", "ok": true } 或 { "id": "A-1", "ok": false, "errors": {...} }
+    all_or_nothing=True 時只要有一筆失敗就全部不寫入
+    """
+    results = []
+    valid = {}  # id -> (result index, validated data)
+    for i, change in enumerate(changes):
+        serializer = SpotChangeSerializer(data=change)
+        spot_id = change.get('id') if isinstance(change, dict) else None
+        if not serializer.is_valid():
+            results.append({'id': spot_id, 'ok': False, 'errors': serializer.errors})
+            continue
+        data = serializer.validated_data
+        if data['id'] in valid:
+            results.append({'id': data['id'], 'ok': False, 'errors': {'id': ['duplicate id in request']}})
+            continue
+        valid[data['id']] = (i, data)
+        results.append({'id': data['id'], 'ok': True})
+
+    updated = []
+    with transaction.atomic():
+        spots = ParkingSpot.objects.select_for_update().in_bulk(list(valid))
+        for spot_id, (i, _) in valid.items():
+            if spot_id not in spots:
+                results[i] = {'id': spot_id, 'ok': False, 'errors': {'id': ['spot not found']}}
+        if all_or_nothing and not all(r['ok'] for r in results):
+            return results, []
+
+        fields = set()
+        for spot_id, (i, data) in valid.items():
+            spot = spots.get(spot_id)
+            if spot is None:
+                continue
+            for field in UPDATABLE_FIELDS:
+                if field in data:
+                    setattr(spot, field, data[field])
+                    fields.add(field)
+            if 'plate_number' in data:
+                spot.plate_normalized = normalize_plate(spot.plate_number)
+                fields.add('plate_normalized')
+            updated.append(spot)
+        if not updated:
+            return results, []
+
+        last = next_version(len(updated))
+        for offset, spot in enumerate(updated):
+            spot.version = last - len(updated) + 1 + offset
+        ParkingSpot.objects.bulk_update(updated, sorted(fields) + ['version'])
+    return results, updated
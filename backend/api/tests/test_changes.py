@@ -0,0 +1,30 @@
+from django.test import TestCase
+
+from api.changes import changes_since, current_version
+from api.models import ChangeVersion, LogEntry, ParkingSpot
+
+
+class MissingVersionRowTests(TestCase):
+    def setUp(self):
+        self.spot = ParkingSpot.objects.create(id='T-1', label='T-1')
+        self.before = self.spot.version
+        ChangeVersion.objects.all().delete()
+
+    def test_saves_recreate_the_row(self):
+        self.spot.status = 'OCCUPIED'
+        self.spot.save()
+        self.assertGreater(self.spot.version, self.before)
+        entry = LogEntry.objects.create(timestamp='2026-01-01T00:00:00Z', type='ENTRY', message='m', spot=self.spot)
+        self.assertGreater(entry.version, self.spot.version)
+        self.assertEqual(current_version()[0], entry.version)
+
+    def test_delete_and_reads_recreate_the_row(self):
+        self.assertEqual(current_version(), (self.before, self.before))
+        ChangeVersion.objects.all().delete()
+        self.spot.delete()
+        self.assertEqual(ChangeVersion.objects.count(), 1)
+
+    def test_clients_resync_after_restore(self):
+        delta = changes_since(self.before - 1)
+        self.assertTrue(delta['reset'])
+        self.assertFalse(changes_since(self.before)['reset'])
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from api.jobs import RecognitionWorkerPool, claim_next_job, submit_job
+from api.llm_client import CircuitOpenError, LLMClientError
+from api.models import RecognitionJob
+
+
+class DownClient:
+    def __init__(self, error):
+        self.error = error
+
+    def post_json(self, payload, url=None):
+        raise self.error
+
+
+class JobRetryTests(TestCase):
+    def setUp(self):
+        self.pool = RecognitionWorkerPool(workers=0, max_attempts=3, retry_delay=0)
+
+    def run_attempts(self, error):
+        job = submit_job('aGVsbG8=')
+        statuses = [RecognitionJob.objects.get(pk=job.pk).status]
+        with mock.patch('api.recognition.get_llm_client', return_value=DownClient(error)):
+            for _ in range(self.pool.max_attempts):
+                claimed = claim_next_job()
+                self.assertEqual(claimed.pk, job.pk)
+                statuses.append(RecognitionJob.objects.get(pk=job.pk).status)
+                self.pool._execute(claimed)
+                statuses.append(RecognitionJob.objects.get(pk=job.pk).status)
+        return RecognitionJob.objects.get(pk=job.pk), statuses
+
+    def assert_retried_then_failed(self, job, statuses):
+        self.assertEqual(statuses, ['QUEUED', 'RUNNING', 'QUEUED', 'RUNNING', 'QUEUED', 'RUNNING', 'FAILED'])
+        self.assertEqual(job.attempts, 3)
+        self.assertIsNone(job.plate_number)
+        self.assertTrue(job.error)
+        self.assertIsNone(claim_next_job())
+
+    @override_settings(RECOGNITION_BATCHING_ENABLED=False)
+    def test_llm_down_is_retried_then_failed(self):
+        self.assert_retried_then_failed(*self.run_attempts(LLMClientError('connection refused')))
+
+    @override_settings(RECOGNITION_BATCHING_ENABLED=False)
+    def test_open_circuit_is_retried_then_failed(self):
+        self.assert_retried_then_failed(*self.run_attempts(CircuitOpenError('circuit open')))
+
+    @override_settings(RECOGNITION_BATCHING_ENABLED=True, LLM_BATCH_URL='')
+    def test_llm_down_through_batcher_is_retried_then_failed(self):
+        self.assert_retried_then_failed(*self.run_attempts(LLMClientError('connection refused')))
+
+    @override_settings(RECOGNITION_BATCHING_ENABLED=False)
+    def test_unreadable_plate_is_done(self):
+        client = mock.Mock()
+        client.post_json.return_value = {'response': '{"plate_number": "UNKNOWN"}'}
+        job = submit_job('aGVsbG8=')
+        with mock.patch('api.recognition.get_llm_client', return_value=client):
+            self.pool._execute(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.plate_number, job.attempts), ('DONE', 'UNKNOWN', 1))
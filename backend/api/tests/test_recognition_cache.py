@@ -0,0 +1,42 @@
+import cv2
+import numpy as np
+from django.test import SimpleTestCase
+
+from api.recognition_cache import RecognitionCache, frame_key, hamming
+
+
+def gate_scene(plate):
+    """固定的閘門背景，車輛停在同一位置，只有車牌文字不同"""
+    image = np.zeros((480, 640, 3), np.uint8)
+    image[:] = np.linspace(70, 130, 640, dtype=np.uint8)[None, :, None]
+    cv2.rectangle(image, (180, 200), (460, 350), (40, 40, 150), -1)
+    cv2.rectangle(image, (270, 295), (370, 325), (255, 255, 255), -1)
+    cv2.putText(image, plate, (275, 318), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+    return image
+
+
+class RecognitionCacheTests(SimpleTestCase):
+    def test_different_plates_in_same_scene_do_not_collide(self):
+        plates = ['ABC-1230', 'ABC-1231', 'ABC-1232']
+        keys = [frame_key(gate_scene(plate)) for plate in plates]
+        # 整張畫面的 dHash 分不出車牌，快取不能只靠它
+        self.assertLessEqual(hamming(keys[0][1], keys[1][1]), 4)
+
+        cache = RecognitionCache(ttl=60)
+        cache.set(keys[0], 'ABC1230')
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNone(cache.get(keys[2]))
+        self.assertEqual(cache.get(frame_key(gate_scene(plates[0]))), 'ABC1230')
+
+    def test_near_match_is_opt_in(self):
+        first = frame_key(gate_scene('ABC-1230'))
+        second = frame_key(gate_scene('ABC-1231'))
+        cache = RecognitionCache(ttl=60, max_distance=64)
+        cache.set(first, 'ABC1230')
+        self.assertEqual(cache.get(second), 'ABC1230')
+
+    def test_expired_entries_miss(self):
+        key = frame_key(gate_scene('ABC-1230'))
+        cache = RecognitionCache(ttl=0)
+        cache.set(key, 'ABC1230')
+        self.assertIsNone(cache.get(key))
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ParkingSpotViewSet, LogEntryViewSet, RecognizePlateAPIView, ResetSystemAPIView, CameraSnapshotAPIView
+from .metrics import metrics_view
+from .views import ParkingSpotViewSet, LogEntryViewSet, recognize_plate, camera_snapshot, CaptureRecognizeAPIView, BatchRecognizeAPIView, RecognitionCacheAPIView, RecognitionJobsAPIView, RecognitionJobAPIView, ResetSystemAPIView, CameraJPEGAPIView, CameraStreamAPIView, changes_feed, ChangeStreamAPIView, CameraMotionAPIView
 
 router = DefaultRouter()
 router.register(r'spots', ParkingSpotViewSet, basename='spot')
@@ -8,7 +9,18 @@ router.register(r'logs', LogEntryViewSet, basename='log')
 
 urlpatterns = [
     path('', include(router.urls)),
-    path('recognize/', RecognizePlateAPIView.as_view(), name='recognize-plate'),
+    path('recognize/', recognize_plate, name='recognize-plate'),
+    path('recognize/camera/', CaptureRecognizeAPIView.as_view(), name='recognize-camera'),
+    path('recognize/batch/', BatchRecognizeAPIView.as_view(), name='recognize-batch'),
+    path('recognize/cache/', RecognitionCacheAPIView.as_view(), name='recognize-cache'),
+    path('recognize/jobs/', RecognitionJobsAPIView.as_view(), name='recognize-jobs'),
+    path('recognize/jobs/<int:pk>/', RecognitionJobAPIView.as_view(), name='recognize-job'),
+    path('changes/', changes_feed, name='changes'),
+    path('changes/stream/', ChangeStreamAPIView.as_view(), name='change-stream'),
     path('reset/', ResetSystemAPIView.as_view(), name='reset-system'),
-    path('camera/snapshot/', CameraSnapshotAPIView.as_view(), name='camera-snapshot'),
+    path('camera/snapshot/', camera_snapshot, name='camera-snapshot'),
+    path('camera/snapshot.jpg', CameraJPEGAPIView.as_view(), name='camera-snapshot-jpeg'),
+    path('camera/stream/', CameraStreamAPIView.as_view(), name='camera-stream'),
+    path('camera/motion/', CameraMotionAPIView.as_view(), name='camera-motion'),
+    path('metrics', metrics_view, name='metrics'),
 ]
\ No newline at end of file
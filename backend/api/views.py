@@ -1,76 +1,85 @@
 import os
-from datetime import datetime
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from .models import ParkingSpot, LogEntry
-from .serializers import ParkingSpotSerializer, LogEntrySerializer
-import requests
+from .serializers import ParkingSpotSerializer, LogEntrySerializer, RecognitionJobSerializer
+from .recognition import (RECOGNITIONS, batcher_stats, get_recognition_batcher, prepare_frame,
+                          recognize_frame, recognize_frame_async, remember_result, run_blocking)
+from .recognition_cache import recognition_cache, decode_image
+from .camera import get_camera
+from .motion import motion_stats
+from .renderers import JPEGRenderer, MJPEGRenderer, EventStreamRenderer
+from .pagination import TimestampCursorPagination
+from .log_buffer import bulk_insert_logs, log_event
+from .retention import truncate_logs
+from .occupancy import occupancy_index
+from .allocation import reserve_spot, spot_allocator
+from .plate_search import find_spots_by_plate, normalize_plate, plate_search_index
+from .spot_updates import bulk_update_spots
+from .spot_listing import spots_response
+from .db import retry_on_locked
+from .jobs import parse_priority, queue_position, submit_job, wait_for_job
+from .changes import changes_since, current_version, mark_reset, wait_for_change, wait_for_change_async
+from . import metrics
+import asyncio
 import json
-import re
+import logging
+import base64
+
+logger = logging.getLogger(__name__)
+
 
-def parse_plate_response(ai_response_text):
+@csrf_exempt
+@require_POST
+async def recognize_plate(request):
+    """
+    POST /api/recognize/
+    Body: { "image": "data:image/jpeg;base64,..." }
+    Returns: { "plate_number": "ABC-1234" }
+    async view：在 ASGI 下等待 LLM 回應時不佔用 worker
+    """
     try:
-        # 1. 使用 Regex 搜尋字串中第一個被 {} 包住的內容 (支援換行)
-        match = re.search(r'\{.*\}', ai_response_text, re.DOTALL)
-        
-        if match:
-            json_str = match.group()
-            # 2. 解析 JSON
-            data = json.loads(json_str)
-            return data
-        else:
-            print("❌ 找不到 JSON 格式")
-            return {"plate_number": "UNKNOWN"}
-
-    except json.JSONDecodeError:
-        print("❌ JSON 格式錯誤 (可能是引號問題)")
-        return {"plate_number": "UNKNOWN"}
-    
-def post_to_llm(image_base64: str) -> str:
-    import time
-    llm_start_time = time.time()
-    
-    prompt = """Role: You are an Automated License Plate Recognition (ALPR) system.
-Task: Analyze the provided image and extract the vehicle license plate number.
-
-Strict Output Rules:
-1. Output ONLY a valid JSON object.
-2. Format: {"plate_number": "YOUR_RESULT_HERE"}
-3. Convert all characters to UPPERCASE.
-4. Remove all spaces, dashes ('-'), and special characters. Return only alphanumeric characters (A-Z, 0-9).
-5. If the plate is unclear, too small, or not visible, return: {"plate_number": "UNKNOWN"}
-6. DO NOT provide any explanations, markdown formatting (like ```json), or conversational text. Just the raw JSON string.
-"""
-
-    payload = {
-        "key": "text+image",
-        "text_query": prompt,
-        "image_base64": image_base64,
-    }
-    llm_url = "http://192.168.50.105:5000/generate"
-    print(f"[後端] 發送請求到 LLM 服務: {llm_url}，時間: {datetime.now().isoformat()}")
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'detail': 'invalid JSON body'}, status=400)
+    image = data.get('image') if isinstance(data, dict) else None
+    if not image:
+        return JsonResponse({'detail': 'image is required'}, status=400)
+
     try:
-        request_start = time.time()
-        resp = requests.post(llm_url, json=payload, timeout=30)
-        request_time = (time.time() - request_start) * 1000
-        print(f"[後端] LLM 服務響應，耗時: {request_time:.2f}ms，狀態: {resp.status_code}")
-        
-        parse_start = time.time()
-        response = resp.json().get("response", "{}")
-        plate_number_data = parse_plate_response(response)
-        parse_time = (time.time() - parse_start) * 1000
-        print(f"[後端] LLM 響應解析，耗時: {parse_time:.2f}ms")
-        
-        total_llm_time = (time.time() - llm_start_time) * 1000
-        print(f"[後端] LLM 總處理時間: {total_llm_time:.2f}ms，結果: {plate_number_data['plate_number']}")
-        return plate_number_data["plate_number"]
+        base64_str = image.split('base64,')[-1]
+        with metrics.stage('decode'):
+            frame = await run_blocking(decode_image, base64_str)
+        plate_number, cached = await recognize_frame_async(frame, base64_str)
     except Exception as e:
-        total_llm_time = (time.time() - llm_start_time) * 1000
-        print(f"[後端] LLM 連線失敗，耗時: {total_llm_time:.2f}ms，錯誤: {e}")
-        return "UNKNOWN"
+        RECOGNITIONS.inc(endpoint='recognize', source='error')
+        logger.warning("車牌辨識失敗: %s", e)
+        return JsonResponse({'plate_number': 'UNKNOWN'})
+    RECOGNITIONS.inc(endpoint='recognize', source='cache' if cached else 'llm')
+
+    if cached:
+        return JsonResponse({'plate_number': plate_number, 'cached': True})
+    return JsonResponse({'plate_number': plate_number})
+
+
+def _spot_saved(spot):
+    """車位寫入後同步 process 內的索引"""
+    occupancy_index.apply(spot)
+    spot_allocator.apply(spot)
+    plate_search_index.apply(spot)
 
 
 class ParkingSpotViewSet(viewsets.ModelViewSet):
@@ -79,195 +88,689 @@ class ParkingSpotViewSet(viewsets.ModelViewSet):
     queryset = ParkingSpot.objects.all().order_by('id')
     serializer_class = ParkingSpotSerializer
 
+    def list(self, request, *args, **kwargs):
+        # 瀏覽 API 頁面 (text/html) 仍走 DRF；JSON 走 ETag + .values() + gzip 的快速路徑
+        if request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        return spots_response(request, self.filter_queryset(self.get_queryset()))
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        _spot_saved(serializer.instance)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        _spot_saved(serializer.instance)
+
+    def perform_destroy(self, instance):
+        spot_id = instance.id
+        super().perform_destroy(instance)
+        occupancy_index.remove(spot_id)
+        spot_allocator.remove(spot_id)
+        plate_search_index.remove(spot_id)
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        GET /api/spots/summary/
+        各樓層/區域的車位狀態統計（process 內索引，不掃描整個資料表）
+        Returns: { "version": 12, "total": {"AVAILABLE": 3, "OCCUPIED": 1, "ABNORMAL": 0, "total": 4},
+                   "floors": [{"floor": 1, "section": "A", "AVAILABLE": 3, ..., "total": 4}] }
+        """
+        return Response(occupancy_index.summary())
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        GET /api/spots/search/?plate=ABC-1234&limit=5&max_distance=2
+        以車牌找出目前停放的車位（出場比對）；容許辨識錯字，易混淆字元 (0/O、8/B...) 只算小距離
+        exact=true 時只做歸一化後的完全比對（走資料庫索引，不使用 process 內索引）
+        Returns: { "query": "ABC1234", "version": 12,
+                   "results": [{ "distance": 0.25, "spot": {...車位資料} }, ...] }（距離由小到大）
+        """
+        plate = request.query_params.get('plate')
+        query = normalize_plate(plate)
+        if query is None:
+            return Response({'detail': 'plate required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', settings.PLATE_SEARCH_LIMIT))
+            max_distance = float(request.query_params.get('max_distance', settings.PLATE_SEARCH_MAX_DISTANCE))
+        except ValueError:
+            return Response({'detail': 'limit and max_distance must be numbers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, settings.PLATE_SEARCH_MAX_LIMIT))
+        max_distance = max(0.0, min(max_distance, settings.PLATE_SEARCH_MAX_DISTANCE_LIMIT))
+
+        if request.query_params.get('exact') in ('true', '1'):
+            spots = list(find_spots_by_plate(query)[:limit])
+            return Response({'query': query, 'version': current_version()[0],
+                             'results': [{'distance': 0.0, 'spot': data}
+                                         for data in self.get_serializer(spots, many=True).data]})
+
+        matches, version = plate_search_index.search(query, limit=limit, max_distance=max_distance)
+        spots = ParkingSpot.objects.in_bulk([spot_id for spot_id, _, _ in matches])
+        results = []
+        for spot_id, _, distance in matches:
+            # 其他 process 剛好在查詢後寫入時可能已不存在
+            if spot_id in spots:
+                results.append({'distance': distance, 'spot': self.get_serializer(spots[spot_id]).data})
+        return Response({'query': query, 'version': version, 'results': results})
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        POST /api/spots/bulk/
+        Body: [{ "id": "A-1", "status": "ABNORMAL", "plate_number": null, "abnormal_reason": "..." }, ...]
+              或 { "changes": [...], "all_or_nothing": true }
+        全部一起驗證後於單一交易內以 bulk_update 寫入；只更新有提供的欄位
+        Returns: { "updated": 2, "results": [{ "id": "A-1", "ok": true }, { "id": "Z-9", "ok": false, "errors": {...} }] }
+        """
+        all_or_nothing = False
+        changes = request.data
+        if isinstance(request.data, dict):
+            changes = request.data.get('changes')
+            all_or_nothing = bool(request.data.get('all_or_nothing', False))
+        if not isinstance(changes, list) or not changes:
+            return Response({'detail': 'expected a non-empty list of spot changes'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(changes) > settings.SPOT_BULK_MAX_CHANGES:
+            return Response({'detail': f'at most {settings.SPOT_BULK_MAX_CHANGES} changes per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results, updated = bulk_update_spots(changes, all_or_nothing=all_or_nothing)
+        for spot in updated:
+            _spot_saved(spot)
+        failed = not updated and not all(r['ok'] for r in results)
+        return Response({'updated': len(updated), 'results': results},
+                        status=status.HTTP_400_BAD_REQUEST if failed else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'])
+    def allocate(self, request):
+        """
+        POST /api/spots/allocate/
+        Body: { "plate_number": "ABC-1234", "floor": 1, "section": "A", "strict": false }
+        保留離入口最近（distance_raw 最小）的空位；floor / section 為偏好，strict 時只在該區域分配
+        Returns: 車位資料；沒有空位時 409
+        """
+        if not isinstance(request.data, dict):
+            return Response({'detail': 'body must be a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+        plate = request.data.get('plate_number')
+        if not plate:
+            return Response({'detail': 'plate_number required'}, status=status.HTTP_400_BAD_REQUEST)
+        floor = request.data.get('floor')
+        try:
+            floor = int(floor) if floor not in (None, '') else None
+        except (TypeError, ValueError):
+            return Response({'detail': 'floor must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        section = request.data.get('section') or None
+        strict = request.data.get('strict') in (True, 'true', '1', 1)
+
+        spot = spot_allocator.allocate(plate, floor=floor, section=section, strict=strict)
+        if spot is None:
+            return Response({'detail': 'No available spot'}, status=status.HTTP_409_CONFLICT)
+        occupancy_index.apply(spot)
+        plate_search_index.apply(spot)
+        log_event('ENTRY', f'車牌 {plate} 分配至車位 {spot.label}', spot_id=spot.id)
+        return Response(self.get_serializer(spot).data)
+
     @action(detail=True, methods=['post'])
     def occupy(self, request, pk=None):
         spot = self.get_object()
+        if not isinstance(request.data, dict):
+            return Response({'detail': 'body must be a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
         plate = request.data.get('plate_number')
         if not plate:
             return Response({'detail': 'plate_number required'}, status=status.HTTP_400_BAD_REQUEST)
-        print(123)
-        spot.status = 'OCCUPIED'
-        spot.plate_number = plate
-        spot.parked_time = timezone.now()
-        spot.save()
+        # 條件式更新：兩個閘門同時選到同一個車位時只有一個會成功
+        if not reserve_spot(spot.id, plate):
+            return Response({'detail': 'Spot is not available'}, status=status.HTTP_409_CONFLICT)
+        spot.refresh_from_db()
+        _spot_saved(spot)
+        log_event('ENTRY', f'車牌 {plate} 停入車位 {spot.label}', spot_id=spot.id)
         return Response({'detail': 'occupied'})
 
 
 class LogEntryViewSet(viewsets.ModelViewSet):
-    queryset = LogEntry.objects.all().order_by('-timestamp')
+    """
+    GET /api/logs/?type=ENTRY&spot=A-1&start=<ISO 時間>&end=<ISO 時間>&page_size=100&cursor=...
+    由新到舊、以 (timestamp, id) 做 cursor 分頁；回傳 { "next": url 或 null, "results": [...] }
+    """
+    queryset = LogEntry.objects.all().order_by('-timestamp', '-id')
     serializer_class = LogEntrySerializer
+    pagination_class = TimestampCursorPagination
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        POST /api/logs/bulk/
+        Body: [{ "timestamp": "...", "type": "ENTRY", "message": "...", "spot": "A-1" }, ...]
+        在單一交易內以 bulk_create 寫入全部紀錄；任何一筆格式錯誤則全部不寫入
+        """
+        entries = request.data.get('entries') if isinstance(request.data, dict) else request.data
+        if not isinstance(entries, list) or not entries:
+            return Response({'detail': 'expected a non-empty list of log entries'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(entries) > settings.LOG_BULK_MAX_ENTRIES:
+            return Response({'detail': f'at most {settings.LOG_BULK_MAX_ENTRIES} entries per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(data=entries, many=True)
+        serializer.is_valid(raise_exception=True)
+        objs = bulk_insert_logs(serializer.validated_data)
+        return Response(self.get_serializer(objs, many=True).data, status=status.HTTP_201_CREATED)
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
 
-class RecognizePlateAPIView(APIView):
+        params = self.request.query_params
+        if params.get('type'):
+            queryset = queryset.filter(type=params['type'])
+        if params.get('spot'):
+            queryset = queryset.filter(spot_id=params['spot'])
+        for name, lookup in (('start', 'timestamp__gte'), ('end', 'timestamp__lt')):
+            if params.get(name):
+                value = parse_datetime(params[name])
+                if value is None:
+                    raise ValidationError({name: 'must be an ISO 8601 datetime'})
+                if timezone.is_naive(value):
+                    value = timezone.make_aware(value)
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+
+class CaptureRecognizeAPIView(APIView):
     authentication_classes = []
     permission_classes = []
     """
-    POST /api/recognize/
-    Body: { "image": "data:image/jpeg;base64,..." }
-    Returns: { "plate_number": "ABC-1234" }
+    POST /api/recognize/camera/?camera=0
+    Body (可省略): { "thumbnail": true }
+    功能：直接在後端取相機最新畫面並辨識，省去「快照傳到瀏覽器再傳回來」的往返
+    Returns: { "plate_number": "ABC1234", "cached": false,
+               "timings": {"capture_ms": .., "llm_ms": .., "total_ms": ..},
+               "image": "data:image/jpeg;base64,..." (thumbnail=true 時) }
     """
     def post(self, request, format=None):
         import time
-        request_start_time = time.time()
-        print(f"[後端] 收到車牌識別請求，時間: {datetime.now().isoformat()}")
-        
-        data = request.data
-        image = data.get('image')
-        # api_key = os.environ.get('GEMINI_API_KEY')
-        if not image:
-            return Response({'detail': 'image is required'}, status=status.HTTP_400_BAD_REQUEST)
-        
+        request_start_time = time.perf_counter()
+
+        index = _camera_index(request)
+        if index is None:
+            return Response({"error": "Unknown camera"}, status=status.HTTP_400_BAD_REQUEST)
+
+        timings = {}
+        with metrics.stage('capture', timings):
+            camera = get_camera(index)
+            frame = camera.latest(max_age=settings.CAMERA_MAX_FRAME_AGE,
+                                  timeout=settings.CAMERA_FRAME_TIMEOUT)
+        if frame is None:
+            error = camera.last_error or "Failed to capture image"
+            return Response({"error": error}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
         try:
-            parse_start_time = time.time()
-            base64_str = request.data.get('image').split('base64,')[-1]
-            parse_time = (time.time() - parse_start_time) * 1000
-            print(f"[後端] 圖片解析完成，耗時: {parse_time:.2f}ms")
-            
-            llm_start_time = time.time()
-            print(f"[後端] 開始調用 LLM 服務...")
-            response = post_to_llm(base64_str)
-            llm_time = (time.time() - llm_start_time) * 1000
-            print(f"[後端] LLM 服務響應完成，耗時: {llm_time:.2f}ms，結果: {response}")
-            
-            total_time = (time.time() - request_start_time) * 1000
-            print(f"[後端] 總處理時間: {total_time:.2f}ms")
+            plate_number, cached = recognize_frame(frame.image, timings=timings)
         except Exception as e:
-            total_time = (time.time() - request_start_time) * 1000
-            print(f"[後端] 處理失敗，耗時: {total_time:.2f}ms，錯誤: {e}")
-            return Response({'plate_number': 'UNKNOWN'})
+            RECOGNITIONS.inc(endpoint='camera', source='error')
+            logger.warning("相機辨識失敗: %s", e)
+            plate_number, cached = 'UNKNOWN', False
+        else:
+            RECOGNITIONS.inc(endpoint='camera', source='cache' if cached else 'llm')
 
-        return Response({'plate_number': response})
+        result = {'plate_number': plate_number, 'cached': cached, 'timings': timings}
+        thumbnail = request.data.get('thumbnail') if isinstance(request.data, dict) else None
+        if thumbnail or request.query_params.get('thumbnail'):
+            with metrics.stage('thumbnail', timings):
+                data = camera.encode_jpeg(frame, settings.CAMERA_JPEG_QUALITY,
+                                          max_width=settings.CAPTURE_THUMBNAIL_WIDTH)
+                if data is not None:
+                    result['image'] = f"data:image/jpeg;base64,{base64.b64encode(data).decode('ascii')}"
 
+        timings['total_ms'] = round((time.perf_counter() - request_start_time) * 1000, 2)
+        return Response(result)
 
-import cv2
-import base64
-import threading
 
-# 全局相機管理器：保持相機連接打開，避免每次重新初始化
-_camera_lock = threading.Lock()
-_camera_instance = None
-_camera_last_used = None
+class BatchRecognizeAPIView(APIView):
+    authentication_classes = []
+    permission_classes = []
+    """
+    POST /api/recognize/batch/
+    Body: { "images": ["data:image/jpeg;base64,...", ...] }
+    Returns: { "results": [{ "plate_number": "ABC1234", "cached": false }, ...] }（順序與輸入相同）
+    """
+    def post(self, request, format=None):
+        if not isinstance(request.data, dict):
+            return Response({'detail': 'body must be a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+        images = request.data.get('images')
+        if not isinstance(images, list) or not images:
+            return Response({'detail': 'images must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(images) > settings.RECOGNITION_BATCH_MAX_IMAGES:
+            return Response({'detail': f'at most {settings.RECOGNITION_BATCH_MAX_IMAGES} images per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(images)
+        pending = []  # (index, image_hash, base64_str)
+        for i, image in enumerate(images):
+            if not isinstance(image, str) or not image:
+                results[i] = {'plate_number': 'UNKNOWN', 'cached': False}
+                continue
+            base64_str = image.split('base64,')[-1]
+            try:
+                with metrics.stage('decode'):
+                    frame = decode_image(base64_str)
+                image_hash, cached, base64_str = prepare_frame(frame, base64_str)
+            except Exception as e:
+                logger.warning("第 %d 張前處理失敗: %s", i, e)
+                image_hash, cached = None, None
+            if cached is not None:
+                RECOGNITIONS.inc(endpoint='batch', source='cache')
+                results[i] = {'plate_number': cached, 'cached': True}
+            else:
+                pending.append((i, image_hash, base64_str))
+
+        # 未命中快取的影像一起交給分派器，會被排進同一批送給模型
+        futures = get_recognition_batcher().submit_many([b64 for _, _, b64 in pending])
+        for (i, image_hash, _), future in zip(pending, futures):
+            try:
+                plate_number = future.result()
+            except Exception as e:
+                RECOGNITIONS.inc(endpoint='batch', source='error')
+                logger.warning("第 %d 張辨識失敗: %s", i, e)
+                plate_number = 'UNKNOWN'
+            else:
+                RECOGNITIONS.inc(endpoint='batch', source='llm')
+            remember_result(image_hash, plate_number)
+            results[i] = {'plate_number': plate_number, 'cached': False}
+        return Response({'results': results})
+
 
-def get_camera():
+class RecognitionCacheAPIView(APIView):
+    authentication_classes = []
+    permission_classes = []
     """
-    獲取相機實例（單例模式）
-    保持相機連接打開，避免重複初始化造成的延遲
+    GET /api/recognize/cache/     回傳辨識快取的命中/未命中統計（含批次分派器統計）
+    DELETE /api/recognize/cache/  清空快取
     """
-    import time
-    global _camera_instance, _camera_last_used
-    
-    with _camera_lock:
-        # 如果相機未初始化或已關閉，則重新打開
-        if _camera_instance is None or not _camera_instance.isOpened():
-            print("[後端] 初始化相機連接...")
-            init_start = time.time()
-            _camera_instance = cv2.VideoCapture(0)
-            init_time = (time.time() - init_start) * 1000
-            
-            if not _camera_instance.isOpened():
-                print(f"[後端] ❌ 無法開啟相機，耗時: {init_time:.2f}ms")
-                _camera_instance = None
-                return None
-            
-            print(f"[後端] ✅ 相機初始化完成，耗時: {init_time:.2f}ms")
-            _camera_last_used = time.time()
-        else:
-            # 相機已打開，直接使用
-            _camera_last_used = time.time()
-        
-        return _camera_instance
+    def get(self, request):
+        data = recognition_cache.stats()
+        batcher = batcher_stats()
+        if batcher is not None:
+            data['batcher'] = batcher
+        return Response(data)
+
+    def delete(self, request):
+        recognition_cache.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
-def release_camera():
+class RecognitionJobsAPIView(APIView):
+    authentication_classes = []
+    permission_classes = []
     """
-    釋放相機資源（可選，用於清理）
+    POST /api/recognize/jobs/
+    Body: { "image": "data:image/jpeg;base64,...", "priority": "gate" | "default" | "recheck" | 整數, "source": "gate-1" }
+    功能：辨識工作放入持久化佇列後立即回傳 (202)，不等待 LLM；priority 越小越先執行
+    Returns: { "id": 12, "status": "QUEUED", "priority": 0, "queue_position": 3, ... }
     """
-    global _camera_instance
-    with _camera_lock:
-        if _camera_instance is not None:
-            _camera_instance.release()
-            _camera_instance = None
-            print("[後端] 相機已釋放")
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response({'detail': 'body must be a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+        image = request.data.get('image')
+        if not image or not isinstance(image, str):
+            return Response({'detail': 'image is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            priority = parse_priority(request.data.get('priority'))
+        except (TypeError, ValueError):
+            return Response({'detail': 'priority must be gate, default, recheck or an integer'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        source = str(request.data.get('source') or '')[:32]
+
+        job = submit_job(image.split('base64,')[-1], priority=priority, source=source)
+        data = RecognitionJobSerializer(job).data
+        data['queue_position'] = queue_position(job)
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
 
-class CameraSnapshotAPIView(APIView):
+class RecognitionJobAPIView(APIView):
     authentication_classes = []
     permission_classes = []
     """
-    GET /api/camera/snapshot/
+    GET /api/recognize/jobs/<id>/?wait=20
+    功能：查詢辨識工作；wait > 0 時為 long-poll，等到工作完成 (DONE / FAILED) 或逾時
+    Returns: { "id": 12, "status": "DONE", "plate_number": "ABC1234", "cached": false, ... }
+    """
+    def get(self, request, pk):
+        wait = _parse_version(request.query_params.get('wait', 0))
+        if wait is None:
+            return Response({'detail': 'wait must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        job = wait_for_job(pk, min(wait, settings.RECOGNITION_JOB_MAX_WAIT))
+        if job is None:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        data = RecognitionJobSerializer(job).data
+        data['queue_position'] = queue_position(job)
+        return Response(data)
+
+
+def _camera_index(request):
+    """
+    從 ?camera=<index> 取得相機 index（每個閘門一支相機），預設 settings.CAMERA_DEFAULT_INDEX
+    不在 settings.CAMERA_INDICES 內時回傳 None
+    """
+    raw = request.GET.get('camera', settings.CAMERA_DEFAULT_INDEX)
+    try:
+        index = int(raw)
+    except (TypeError, ValueError):
+        return None
+    return index if index in settings.CAMERA_INDICES else None
+
+
+@require_GET
+async def camera_snapshot(request):
+    """
+    GET /api/camera/snapshot/?camera=0
     功能：擷取後端攝影機的即時畫面並回傳 Base64 字串
-    優化：使用全局相機實例，避免每次重新初始化
+    相機由背景執行緒持續擷取；等待畫面與 JPEG 編碼在執行緒池執行，不卡住 event loop
     """
+    index = _camera_index(request)
+    if index is None:
+        return JsonResponse({"error": "Unknown camera"}, status=400)
+
+    with metrics.stage('capture'):
+        camera = await run_blocking(get_camera, index)
+        frame = await run_blocking(camera.latest, max_age=settings.CAMERA_MAX_FRAME_AGE,
+                                   timeout=settings.CAMERA_FRAME_TIMEOUT)
+    if frame is None:
+        return JsonResponse({"error": camera.last_error or "Failed to capture image"}, status=500)
+
+    # 與 cv2.imencode 預設品質相同 (95)；同一幀被多個請求取用時只編碼一次
+    with metrics.stage('jpeg_encode'):
+        data = await run_blocking(camera.encode_jpeg, frame, 95)
+    if data is None:
+        return JsonResponse({"error": "Failed to encode image"}, status=500)
+    with metrics.stage('base64'):
+        base64_image = "data:image/jpeg;base64," + base64.b64encode(data).decode('ascii')
+
+    return JsonResponse({"image": base64_image})
+
+
+def _jpeg_params(request):
+    """
+    解析 ?quality=&width=&height= 參數，格式錯誤時拋出 ValueError
+    """
+    params = request.query_params
+    quality = int(params.get('quality', settings.CAMERA_JPEG_QUALITY))
+    max_width = int(params['width']) if params.get('width') else None
+    max_height = int(params['height']) if params.get('height') else None
+    if not 1 <= quality <= 100:
+        raise ValueError('quality must be between 1 and 100')
+    if (max_width is not None and max_width <= 0) or (max_height is not None and max_height <= 0):
+        raise ValueError('width/height must be positive')
+    return quality, max_width, max_height
+
+
+class CameraJPEGAPIView(APIView):
+    authentication_classes = []
+    permission_classes = []
+    renderer_classes = [JPEGRenderer]
+    """
+    GET /api/camera/snapshot.jpg?camera=0&quality=80&width=640&height=480
+    功能：直接回傳 image/jpeg（不經 Base64 / JSON），支援 ETag / If-None-Match
+    """
+    def get(self, request):
+        index = _camera_index(request)
+        if index is None:
+            return JsonResponse({"error": "Unknown camera"}, status=400)
+        try:
+            quality, max_width, max_height = _jpeg_params(request)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        camera = get_camera(index)
+        frame = camera.latest(max_age=settings.CAMERA_MAX_FRAME_AGE,
+                              timeout=settings.CAMERA_FRAME_TIMEOUT)
+        if frame is None:
+            return JsonResponse({"error": camera.last_error or "Failed to capture image"}, status=500)
+
+        # 畫面沒有變化時不必編碼，直接回 304
+        etag = camera.etag(frame, quality, max_width, max_height)
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        data = camera.encode_jpeg(frame, quality, max_width, max_height)
+        if data is None:
+            return JsonResponse({"error": "Failed to encode image"}, status=500)
+        response = HttpResponse(data, content_type='image/jpeg')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+class CameraStreamAPIView(APIView):
+    authentication_classes = []
+    permission_classes = []
+    renderer_classes = [MJPEGRenderer]
+    """
+    GET /api/camera/stream/?camera=0&fps=10&quality=70&width=640
+    功能：multipart/x-mixed-replace MJPEG 串流，可直接放進 <img src>
+    """
+    boundary = 'frame'
+
     def get(self, request):
+        index = _camera_index(request)
+        if index is None:
+            return JsonResponse({"error": "Unknown camera"}, status=400)
+        try:
+            quality, max_width, max_height = _jpeg_params(request)
+            fps = float(request.query_params.get('fps', settings.CAMERA_STREAM_FPS))
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        fps = min(max(fps, 0.5), 30.0)
+
+        camera = get_camera(index)
+        frames = self._aframes if _is_asgi(request) else self._frames
+        response = StreamingHttpResponse(
+            frames(camera, quality, max_width, max_height, 1.0 / fps),
+            content_type=f'multipart/x-mixed-replace; boundary={self.boundary}',
+        )
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    def _part(self, data):
+        return (f'--{self.boundary}\r\nContent-Type: image/jpeg\r\n'
+                f'Content-Length: {len(data)}\r\n\r\n').encode() + data + b'\r\n'
+
+    def _frames(self, camera, quality, max_width, max_height, interval):
+        """WSGI：在 worker 執行緒內逐幀產生"""
         import time
-        request_start_time = time.time()
-        print(f"[後端] 收到相機快照請求，時間: {datetime.now().isoformat()}")
-        
-        # 獲取相機實例（如果已打開則直接使用，否則初始化）
-        camera_start_time = time.time()
-        cap = get_camera()
-        camera_time = (time.time() - camera_start_time) * 1000
-        
-        if cap is None:
-            return Response({"error": "Cannot open camera"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        if camera_time > 10:  # 如果超過10ms，說明重新初始化了
-            print(f"[後端] 相機獲取，耗時: {camera_time:.2f}ms (重新初始化)")
-        else:
-            print(f"[後端] 相機獲取，耗時: {camera_time:.2f}ms (使用現有連接)")
-        
-        # 讀取畫面（可能需要丟棄幾幀以確保畫面是最新的）
-        read_start_time = time.time()
-        # 丟棄一幀以確保畫面是最新的
-        cap.read()
-        ret, frame = cap.read()
-        read_time = (time.time() - read_start_time) * 1000
-        print(f"[後端] 讀取畫面，耗時: {read_time:.2f}ms")
-        
-        if not ret:
-            print("[後端] ⚠️ 讀取畫面失敗，嘗試重新初始化相機...")
-            release_camera()
-            cap = get_camera()
-            if cap is None:
-                return Response({"error": "Failed to capture image"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            ret, frame = cap.read()
-            if not ret:
-                return Response({"error": "Failed to capture image"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # 將圖片編碼為 JPEG
-        encode_start_time = time.time()
-        _, buffer = cv2.imencode('.jpg', frame)
-        encode_time = (time.time() - encode_start_time) * 1000
-        print(f"[後端] 圖片編碼，耗時: {encode_time:.2f}ms")
-        
-        # 轉為 Base64 字串
-        base64_start_time = time.time()
-        jpg_as_text = base64.b64encode(buffer).decode('utf-8')
-        base64_time = (time.time() - base64_start_time) * 1000
-        print(f"[後端] Base64 轉換，耗時: {base64_time:.2f}ms")
-        
-        # 加上 Data URI Scheme 前綴
-        base64_image = f"data:image/jpeg;base64,{jpg_as_text}"
-        
-        total_time = (time.time() - request_start_time) * 1000
-        print(f"[後端] 相機快照總處理時間: {total_time:.2f}ms")
-        
-        return Response({"image": base64_image})
+        last_seq = 0
+        while True:
+            started = time.monotonic()
+            frame = camera.wait_for_frame(last_seq, timeout=settings.CAMERA_FRAME_TIMEOUT)
+            if frame is None:
+                return
+            last_seq = frame.seq
+            data = camera.encode_jpeg(frame, quality, max_width, max_height)
+            if data is not None:
+                yield self._part(data)
+            # 依 fps 限制推送頻率
+            remaining = interval - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
 
+    async def _aframes(self, camera, quality, max_width, max_height, interval):
+        """
+        ASGI：Django 會把同步 iterator 整個讀完才送出，所以改用 async 產生器
+        等待畫面與編碼在執行緒池執行，兩幀之間不佔用執行緒；客戶端斷線時 Django 會取消這個產生器
+        """
+        import time
+        last_seq = 0
+        while True:
+            started = time.monotonic()
+            frame = await run_blocking(camera.wait_for_frame, last_seq, timeout=settings.CAMERA_FRAME_TIMEOUT)
+            if frame is None:
+                return
+            last_seq = frame.seq
+            data = await run_blocking(camera.encode_jpeg, frame, quality, max_width, max_height)
+            if data is not None:
+                yield self._part(data)
+            remaining = interval - (time.monotonic() - started)
+            if remaining > 0:
+                await asyncio.sleep(remaining)
 
-class ResetSystemAPIView(APIView):
+
+class CameraMotionAPIView(APIView):
+    authentication_classes = []
+    permission_classes = []
     """
-    POST /api/reset/
-    功能：一鍵重置系統，清空所有車位並刪除紀錄
+    GET /api/camera/motion/
+    功能：各相機車輛進場偵測的狀態，以及已分析畫面數、進場車輛數、觸發辨識次數與省下的 LLM 呼叫次數
+    （與每次進場辨識一次相比：沒有停下就離開的車輛）
+    Returns: { "cameras": [{ "camera": 0, "state": "IDLE", "frames_analyzed": 1200, "vehicles": 4, "triggers": 3,
+                            "llm_calls_avoided": 1, "last_job_id": 42, ... }] }
     """
-    def post(self, request):
+    def get(self, request):
+        return Response({'cameras': motion_stats()})
+
+
+@retry_on_locked
+def _reset_system():
+    with transaction.atomic():
         # 1. 重置所有車位狀態為 AVAILABLE (空位)
         ParkingSpot.objects.all().update(
             status='AVAILABLE',
             plate_number=None,
+            plate_normalized=None,
             parked_time=None,
             abnormal_reason=None
         )
 
-        # 2. 清空所有 Log 紀錄
-        LogEntry.objects.all().delete()
+        # 2. 清空所有 Log 紀錄（truncate，不逐筆刪除）
+        truncate_logs()
+
+        # 3. 通知變更串流：客戶端需要重新抓取完整資料
+        mark_reset()
+
+
+class ResetSystemAPIView(APIView):
+    """
+    POST /api/reset/
+    功能：一鍵重置系統，清空所有車位並刪除紀錄
+    """
+    def post(self, request):
+        _reset_system()
+        occupancy_index.invalidate()
+        spot_allocator.invalidate()
+        plate_search_index.invalidate()
+
+        return Response({"message": "System reset successfully"})
+
+
+def _is_asgi(request):
+    """請求是否由 ASGI 伺服器處理（DRF Request 或 Django HttpRequest 皆可）"""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def _parse_version(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+@require_GET
+async def changes_feed(request):
+    """
+    GET /api/changes/                      只回傳目前版本號 { "version": 12 }
+    GET /api/changes/?since=12&wait=25     回傳版本 12 之後變更的車位與新增/修改的紀錄
+    功能：取代每 5 秒抓取完整車位與紀錄；wait > 0 時為 long-poll，沒有變更就等待最多 wait 秒
+    Returns: { "version": 15, "reset": false, "spots": [...], "logs": [...] }
+    reset 為 true 時（系統重置或刪除資料）客戶端需重新抓取完整資料
+    async view：long-poll 等待期間不佔用執行緒
+    """
+    import time
+    if 'since' not in request.GET:
+        version, _ = await sync_to_async(current_version)()
+        return JsonResponse({'version': version})
+
+    since = _parse_version(request.GET.get('since'))
+    wait = _parse_version(request.GET.get('wait', 0))
+    if since is None or wait is None:
+        return JsonResponse({'detail': 'since and wait must be integers'}, status=400)
+
+    deadline = time.monotonic() + min(wait, settings.CHANGE_FEED_MAX_WAIT)
+    version, _ = await sync_to_async(current_version)()
+    while version == since:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        version, _ = await wait_for_change_async(since, min(remaining, settings.CHANGE_FEED_POLL_INTERVAL))
+    return JsonResponse(await sync_to_async(changes_since)(since))
+
 
-        return Response({"message": "System reset successfully"})
\ No newline at end of file
+class ChangeStreamAPIView(APIView):
+    authentication_classes = []
+    permission_classes = []
+    renderer_classes = [EventStreamRenderer]
+    """
+    GET /api/changes/stream/?since=12
+    功能：Server-Sent Events 串流，有變更時推送 event: change（內容同 /api/changes/?since=）
+    斷線重連時瀏覽器會帶 Last-Event-ID，從上次收到的版本繼續
+    """
+    def get(self, request):
+        since = _parse_version(request.headers.get('Last-Event-ID') or request.query_params.get('since'))
+        if since is None:
+            return JsonResponse({'detail': 'since must be an integer'}, status=400)
+
+        events = self._aevents if _is_asgi(request) else self._events
+        response = StreamingHttpResponse(events(since), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # 避免反向代理緩衝
+        return response
+
+    @staticmethod
+    def _event(delta):
+        return f"id: {delta['version']}\nevent: change\ndata: {json.dumps(delta, cls=DjangoJSONEncoder)}\n\n"
+
+    def _events(self, since):
+        """WSGI：在 worker 執行緒內等待變更"""
+        import time
+        yield f"retry: {settings.CHANGE_FEED_RETRY_MS}\n\n"
+        # 串流有最長時間，讓 worker 執行緒定期釋放；瀏覽器會自動以 Last-Event-ID 重連
+        deadline = time.monotonic() + settings.CHANGE_FEED_STREAM_SECONDS
+        idle = 0.0
+        while time.monotonic() < deadline:
+            version, _ = wait_for_change(since, settings.CHANGE_FEED_POLL_INTERVAL)
+            if version == since:
+                idle += settings.CHANGE_FEED_POLL_INTERVAL
+                if idle >= settings.CHANGE_FEED_HEARTBEAT:
+                    idle = 0.0
+                    yield ": keepalive\n\n"
+                continue
+            idle = 0.0
+            delta = changes_since(since)
+            since = delta['version']
+            yield self._event(delta)
+
+    async def _aevents(self, since):
+        """
+        ASGI：同 _events，但以 async 產生器邊產生邊送出
+        等待變更時不佔用執行緒，只有讀取版本號與查詢差異時經 sync_to_async 存取資料庫
+        """
+        import time
+        yield f"retry: {settings.CHANGE_FEED_RETRY_MS}\n\n"
+        deadline = time.monotonic() + settings.CHANGE_FEED_STREAM_SECONDS
+        idle = 0.0
+        while time.monotonic() < deadline:
+            version, _ = await wait_for_change_async(since, settings.CHANGE_FEED_POLL_INTERVAL)
+            if version == since:
+                idle += settings.CHANGE_FEED_POLL_INTERVAL
+                if idle >= settings.CHANGE_FEED_HEARTBEAT:
+                    idle = 0.0
+                    yield ": keepalive\n\n"
+                continue
+            idle = 0.0
+            delta = await sync_to_async(changes_since)(since)
+            since = delta['version']
+            yield self._event(delta)
@@ -0,0 +1,21 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# ASGI 下每個 async 請求的同步 ORM 呼叫在新的 thread-sensitive context 執行，持久連線會一直累積；
+# 依 Django 文件建議預設關閉（仍可用 DB_CONN_MAX_AGE 覆寫）
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+application = get_asgi_application()
+
+# 伺服器 process 內的定期任務（只在實際提供服務時啟動，不影響 manage.py 指令）
+from api.jobs import start_recognition_workers  # noqa: E402
+from api.llm_client import enable_async_llm_client  # noqa: E402
+from api.motion import start_motion_triggers  # noqa: E402
+from api.recognition import warm_up_vision  # noqa: E402
+from api.retention import start_retention_scheduler  # noqa: E402
+
+enable_async_llm_client()
+start_retention_scheduler()
+start_recognition_workers()
+warm_up_vision()
+start_motion_triggers()
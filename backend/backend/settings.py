@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -25,6 +26,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -71,6 +73,162 @@ DATABASES = {
     }
 }
 
+# SQLite 設定檔：
+# - concurrent（預設）：WAL（讀取不會被寫入阻擋）、synchronous=NORMAL、busy timeout、
+#   交易一開始就取得寫入鎖 (BEGIN IMMEDIATE，避免讀鎖升級失敗)、連線重複使用、較大的 page cache 與 mmap
+# - default：Django 預設值（rollback journal，無 busy timeout 調整）
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'concurrent')
+SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', '10'))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', '20000'))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024)))
+if SQLITE_PROFILE == 'concurrent':
+    DATABASES['default']['OPTIONS'] = {
+        'timeout': SQLITE_BUSY_TIMEOUT,
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB};'
+            f'PRAGMA mmap_size={SQLITE_MMAP_SIZE};'
+            'PRAGMA temp_store=MEMORY;'
+        ),
+    }
+    # WSGI worker 重複使用連線；backend/asgi.py 會把預設改為 0（ASGI 下持久連線會累積）
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '600'))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+elif SQLITE_PROFILE != 'default':
+    raise ImproperlyConfigured(f"SQLITE_PROFILE must be 'concurrent' or 'default', got {SQLITE_PROFILE!r}")
+
+# 遇到 "database is locked" 時的重試次數與初始退避時間（秒，每次加倍）；見 api/db.py
+DB_LOCK_RETRIES = int(os.environ.get('DB_LOCK_RETRIES', '5'))
+DB_LOCK_RETRY_DELAY = float(os.environ.get('DB_LOCK_RETRY_DELAY', '0.05'))
+
+# LLM 車牌辨識服務設定（可用環境變數覆寫）
+LLM_SERVICE_URL = os.environ.get('LLM_SERVICE_URL', 'http://192.168.50.105:5000/generate')
+LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', '3'))
+LLM_READ_TIMEOUT = float(os.environ.get('LLM_READ_TIMEOUT', '20'))
+# 同時送往 LLM 服務的請求上限；超過時最多等待 LLM_ACQUIRE_TIMEOUT 秒
+LLM_MAX_IN_FLIGHT = int(os.environ.get('LLM_MAX_IN_FLIGHT', '4'))
+LLM_ACQUIRE_TIMEOUT = float(os.environ.get('LLM_ACQUIRE_TIMEOUT', '5'))
+# ASGI async view 同時等待中的 LLM 請求上限（不佔用執行緒，可以比 LLM_MAX_IN_FLIGHT 大很多）
+LLM_ASYNC_MAX_IN_FLIGHT = int(os.environ.get('LLM_ASYNC_MAX_IN_FLIGHT', '256'))
+# async view 執行 OpenCV / 相機等阻塞工作的執行緒數
+ASYNC_BLOCKING_THREADS = int(os.environ.get('ASYNC_BLOCKING_THREADS', '4'))
+# 連續失敗 N 次後斷路，冷卻 M 秒後再試
+LLM_BREAKER_FAILURES = int(os.environ.get('LLM_BREAKER_FAILURES', '5'))
+LLM_BREAKER_RESET_TIMEOUT = float(os.environ.get('LLM_BREAKER_RESET_TIMEOUT', '30'))
+# 批次辨識介面：POST {"images_base64": [...]} -> {"responses": [...]}；未設定時批次內改為平行送出單張請求
+LLM_BATCH_URL = os.environ.get('LLM_BATCH_URL', '')
+# 單張辨識請求是否經過 micro-batching 分派器（預設：有批次介面時才啟用）
+RECOGNITION_BATCHING_ENABLED = os.environ.get('RECOGNITION_BATCHING_ENABLED', '1' if LLM_BATCH_URL else '0') == '1'
+RECOGNITION_BATCH_MAX_SIZE = int(os.environ.get('RECOGNITION_BATCH_MAX_SIZE', '8'))
+RECOGNITION_BATCH_MAX_WAIT_MS = float(os.environ.get('RECOGNITION_BATCH_MAX_WAIT_MS', '20'))
+# /api/recognize/batch/ 單次請求最多幾張
+RECOGNITION_BATCH_MAX_IMAGES = int(os.environ.get('RECOGNITION_BATCH_MAX_IMAGES', '32'))
+
+# 車牌辨識快取：以畫面像素內容為 key，只有完全相同的畫面命中
+# MAX_DISTANCE > 0 時整張畫面 dHash 漢明距離 <= MAX_DISTANCE 也視為同一畫面；同一場景不同車牌的 dHash 幾乎相同，預設關閉
+RECOGNITION_CACHE_SIZE = int(os.environ.get('RECOGNITION_CACHE_SIZE', '256'))
+RECOGNITION_CACHE_TTL = float(os.environ.get('RECOGNITION_CACHE_TTL', '10'))
+RECOGNITION_CACHE_MAX_DISTANCE = int(os.environ.get('RECOGNITION_CACHE_MAX_DISTANCE', '0'))
+
+# 非同步辨識工作佇列 (/api/recognize/jobs/)：每個 process 的 worker 執行緒數（0 表示不在此 process 執行）、
+# 佇列為空時檢查其他 process 新工作的間隔、long-poll 最長等待、RUNNING 超過幾秒視為中斷、最多重試次數、
+# 完成的工作保留幾小時、LLM 失敗後 worker 暫停幾秒再取下一個工作
+RECOGNITION_JOB_WORKERS = int(os.environ.get('RECOGNITION_JOB_WORKERS', '2'))
+RECOGNITION_JOB_POLL_INTERVAL = float(os.environ.get('RECOGNITION_JOB_POLL_INTERVAL', '1'))
+RECOGNITION_JOB_MAX_WAIT = float(os.environ.get('RECOGNITION_JOB_MAX_WAIT', '30'))
+RECOGNITION_JOB_STALE_SECONDS = float(os.environ.get('RECOGNITION_JOB_STALE_SECONDS', '120'))
+RECOGNITION_JOB_MAX_ATTEMPTS = int(os.environ.get('RECOGNITION_JOB_MAX_ATTEMPTS', '3'))
+RECOGNITION_JOB_RETRY_DELAY = float(os.environ.get('RECOGNITION_JOB_RETRY_DELAY', '5'))
+RECOGNITION_JOB_KEEP_HOURS = float(os.environ.get('RECOGNITION_JOB_KEEP_HOURS', '24'))
+
+# 相機擷取服務：每個閘門一支相機，以逗號分隔的 index 清單
+CAMERA_INDICES = [int(i) for i in os.environ.get('CAMERA_INDICES', '0').split(',') if i.strip()]
+CAMERA_DEFAULT_INDEX = CAMERA_INDICES[0] if CAMERA_INDICES else 0
+CAMERA_BUFFER_SIZE = int(os.environ.get('CAMERA_BUFFER_SIZE', '3'))
+# 超過此秒數沒有請求取用畫面就釋放相機
+CAMERA_IDLE_TIMEOUT = float(os.environ.get('CAMERA_IDLE_TIMEOUT', '60'))
+# 最新畫面超過此秒數視為過期；等待新畫面最多 CAMERA_FRAME_TIMEOUT 秒
+CAMERA_MAX_FRAME_AGE = float(os.environ.get('CAMERA_MAX_FRAME_AGE', '1'))
+CAMERA_FRAME_TIMEOUT = float(os.environ.get('CAMERA_FRAME_TIMEOUT', '3'))
+# JPEG 快照 / MJPEG 串流的預設品質與串流幀率
+CAMERA_JPEG_QUALITY = int(os.environ.get('CAMERA_JPEG_QUALITY', '80'))
+CAMERA_STREAM_FPS = float(os.environ.get('CAMERA_STREAM_FPS', '10'))
+# 以影像檔目錄或影片檔取代實體相機（測試 / 效能測試用，{index} 會換成相機 index）；
+# 播放速度 CAMERA_PLAYBACK_FPS，0 表示使用影片本身的幀率
+CAMERA_SOURCE = os.environ.get('CAMERA_SOURCE', '')
+CAMERA_PLAYBACK_FPS = float(os.environ.get('CAMERA_PLAYBACK_FPS', '15'))
+# OpenCV 預設在第一次使用相機 / 辨識時才載入；設為 1 的 worker 啟動時就載入並開啟 CAMERA_INDICES 的相機
+VISION_WARMUP = os.environ.get('VISION_WARMUP', '0') == '1'
+# 車輛進場偵測（api/motion.py）：列出的相機持續偵測，車輛進入並停穩時自動送出辨識工作；空白表示不啟用
+# 多個 worker process 時只在其中一個設定
+MOTION_TRIGGER_CAMERAS = [int(i) for i in os.environ.get('MOTION_TRIGGER_CAMERAS', '').split(',') if i.strip()]
+MOTION_SAMPLE_FPS = float(os.environ.get('MOTION_SAMPLE_FPS', '5'))
+MOTION_DETECT_WIDTH = int(os.environ.get('MOTION_DETECT_WIDTH', '160'))
+# 灰階差異超過此值的像素視為變化；前景比例達 ENTER_RATIO 視為有車、低於 EXIT_RATIO 視為離開，
+# 幀間變化比例不超過 SETTLE_RATIO 連續 SETTLE_FRAMES 幀視為停穩
+MOTION_PIXEL_THRESHOLD = int(os.environ.get('MOTION_PIXEL_THRESHOLD', '25'))
+MOTION_ENTER_RATIO = float(os.environ.get('MOTION_ENTER_RATIO', '0.04'))
+MOTION_EXIT_RATIO = float(os.environ.get('MOTION_EXIT_RATIO', '0.02'))
+MOTION_SETTLE_RATIO = float(os.environ.get('MOTION_SETTLE_RATIO', '0.005'))
+MOTION_ENTER_FRAMES = int(os.environ.get('MOTION_ENTER_FRAMES', '2'))
+MOTION_SETTLE_FRAMES = int(os.environ.get('MOTION_SETTLE_FRAMES', '5'))
+MOTION_EXIT_FRAMES = int(os.environ.get('MOTION_EXIT_FRAMES', '10'))
+MOTION_LEARNING_RATE = float(os.environ.get('MOTION_LEARNING_RATE', '0.05'))
+# 停穩後持續靜止這麼多幀就以目前畫面重建背景（光線突然改變時恢復），0 = 不重建；預設 5 fps 下約 60 秒
+MOTION_RELEARN_FRAMES = int(os.environ.get('MOTION_RELEARN_FRAMES', '300'))
+# /api/recognize/camera/ 回傳縮圖的最大寬度
+CAPTURE_THUMBNAIL_WIDTH = int(os.environ.get('CAPTURE_THUMBNAIL_WIDTH', '480'))
+
+# 送往 LLM 前的車牌區域前處理：裁切後縮放到 PLATE_TARGET_WIDTH，以 PLATE_JPEG_QUALITY 重新編碼
+PLATE_PREPROCESS_ENABLED = os.environ.get('PLATE_PREPROCESS_ENABLED', '1') == '1'
+PLATE_TARGET_WIDTH = int(os.environ.get('PLATE_TARGET_WIDTH', '480'))
+PLATE_JPEG_QUALITY = int(os.environ.get('PLATE_JPEG_QUALITY', '85'))
+# 找不到車牌區域時送整張畫面，但寬度不超過此值
+PLATE_FALLBACK_MAX_WIDTH = int(os.environ.get('PLATE_FALLBACK_MAX_WIDTH', '1024'))
+
+# 變更推送 (/api/changes/)：檢查其他 worker 寫入的間隔、long-poll 最長等待、SSE 心跳與單次串流長度（秒）
+CHANGE_FEED_POLL_INTERVAL = float(os.environ.get('CHANGE_FEED_POLL_INTERVAL', '2'))
+CHANGE_FEED_MAX_WAIT = float(os.environ.get('CHANGE_FEED_MAX_WAIT', '30'))
+CHANGE_FEED_HEARTBEAT = float(os.environ.get('CHANGE_FEED_HEARTBEAT', '15'))
+CHANGE_FEED_STREAM_SECONDS = float(os.environ.get('CHANGE_FEED_STREAM_SECONDS', '300'))
+CHANGE_FEED_RETRY_MS = int(os.environ.get('CHANGE_FEED_RETRY_MS', '3000'))
+
+# GET /api/spots/ 回應超過此大小 (bytes) 且客戶端支援時以 gzip 壓縮
+SPOTS_GZIP_MIN_BYTES = int(os.environ.get('SPOTS_GZIP_MIN_BYTES', '1024'))
+SPOTS_GZIP_LEVEL = int(os.environ.get('SPOTS_GZIP_LEVEL', '6'))
+# POST /api/spots/bulk/ 單次最多筆數
+SPOT_BULK_MAX_CHANGES = int(os.environ.get('SPOT_BULK_MAX_CHANGES', '1000'))
+
+# GET /api/spots/search/ 車牌模糊查詢：預設回傳筆數與最大加權編輯距離（易混淆字元互換算 0.25）
+PLATE_SEARCH_LIMIT = int(os.environ.get('PLATE_SEARCH_LIMIT', '5'))
+PLATE_SEARCH_MAX_LIMIT = int(os.environ.get('PLATE_SEARCH_MAX_LIMIT', '50'))
+PLATE_SEARCH_MAX_DISTANCE = float(os.environ.get('PLATE_SEARCH_MAX_DISTANCE', '2'))
+PLATE_SEARCH_MAX_DISTANCE_LIMIT = float(os.environ.get('PLATE_SEARCH_MAX_DISTANCE_LIMIT', '3'))
+
+# /api/logs/ 分頁大小
+LOG_PAGE_SIZE = int(os.environ.get('LOG_PAGE_SIZE', '100'))
+LOG_MAX_PAGE_SIZE = int(os.environ.get('LOG_MAX_PAGE_SIZE', '500'))
+# POST /api/logs/bulk/ 單次最多筆數
+LOG_BULK_MAX_ENTRIES = int(os.environ.get('LOG_BULK_MAX_ENTRIES', '1000'))
+# 伺服器端事件紀錄的 write-behind 緩衝：累積 N 筆或每 M 秒寫入一次
+LOG_BUFFER_MAX_SIZE = int(os.environ.get('LOG_BUFFER_MAX_SIZE', '100'))
+LOG_BUFFER_FLUSH_INTERVAL = float(os.environ.get('LOG_BUFFER_FLUSH_INTERVAL', '1'))
+# 紀錄保存期限：超過 N 天的紀錄封存到 LOG_ARCHIVE_DIR（gzip JSON Lines，每天一個檔案）；0 表示不自動封存
+LOG_RETENTION_DAYS = int(os.environ.get('LOG_RETENTION_DAYS', '0'))
+LOG_ARCHIVE_DIR = Path(os.environ.get('LOG_ARCHIVE_DIR', BASE_DIR / 'log_archive'))
+LOG_RETENTION_CHUNK_SIZE = int(os.environ.get('LOG_RETENTION_CHUNK_SIZE', '1000'))
+LOG_RETENTION_INTERVAL_HOURS = float(os.environ.get('LOG_RETENTION_INTERVAL_HOURS', '6'))
+
+# api.* 的執行紀錄（取代原本的 print）；各階段耗時改由 GET /api/metrics 提供
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {'api': {'handlers': ['console'], 'level': os.environ.get('API_LOG_LEVEL', 'WARNING')}},
+}
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = 'en-us'
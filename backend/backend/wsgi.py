@@ -3,3 +3,14 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 application = get_wsgi_application()
+
+# 伺服器 process 內的定期任務（只在實際提供服務時啟動，不影響 manage.py 指令）
+from api.jobs import start_recognition_workers  # noqa: E402
+from api.motion import start_motion_triggers  # noqa: E402
+from api.recognition import warm_up_vision  # noqa: E402
+from api.retention import start_retention_scheduler  # noqa: E402
+
+start_retention_scheduler()
+start_recognition_workers()
+warm_up_vision()
+start_motion_triggers()
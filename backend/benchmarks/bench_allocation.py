@@ -0,0 +1,84 @@
+"""
+多個分配者同時搶車位：確認沒有重複分配，並量測每秒分配數
+
+每條執行緒使用自己的 SpotAllocator（模擬多個 worker process 各自的索引），
+全部從最近的車位開始搶，只能靠資料庫的條件式更新避免重複分配。
+
+用法 (在 backend/ 目錄下):
+    python -m benchmarks.bench_allocation --spots 2000 --threads 8
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+
+from benchmarks.django_env import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--spots', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--floors', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from api.allocation import SpotAllocator
+    from api.models import ParkingSpot
+
+    ParkingSpot.objects.bulk_create([
+        ParkingSpot(id=f'S-{i}', label=f'S-{i}', floor=i % args.floors + 1,
+                    section='AB'[i % 2], distance_raw=(i * 7919) % args.spots)
+        for i in range(args.spots)
+    ])
+    total = ParkingSpot.objects.filter(status='AVAILABLE').count()
+
+    results = [[] for _ in range(args.threads)]
+    errors = []
+    barrier = threading.Barrier(args.threads)
+
+    def worker(n):
+        allocator = SpotAllocator()
+        allocator.available_count()  # 先建好索引，不計入量測
+        barrier.wait()
+        try:
+            while True:
+                spot = allocator.allocate(f'T{n}-{len(results[n])}')
+                if spot is None:
+                    break
+                results[n].append((spot.id, spot.plate_number))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    allocated = [item for per_thread in results for item in per_thread]
+    per_spot = Counter(spot_id for spot_id, _ in allocated)
+    collisions = sum(count - 1 for count in per_spot.values() if count > 1)
+    stored = dict(ParkingSpot.objects.values_list('id', 'plate_number'))
+    mismatched = sum(1 for spot_id, plate in allocated if stored[spot_id] != plate)
+
+    print(f'threads:      {args.threads}')
+    print(f'allocated:    {len(allocated)} / {total} spots')
+    print(f'per thread:   {[len(r) for r in results]}')
+    print(f'collisions:   {collisions}')
+    print(f'mismatched:   {mismatched}')
+    print(f'errors:       {len(errors)} {errors[:1]}')
+    print(f'elapsed:      {elapsed:.2f}s  ({len(allocated) / elapsed:.1f} allocations/s)')
+
+    assert not errors, errors[0]
+    assert collisions == 0 and mismatched == 0, 'spot allocated twice'
+    assert len(allocated) == total, 'not every spot was allocated'
+
+
+if __name__ == '__main__':
+    main()
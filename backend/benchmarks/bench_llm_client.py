@@ -0,0 +1,72 @@
+"""
+比較「每次 requests.post 新連線」與共用 LLMClient（keep-alive 連線池）的延遲與吞吐量
+
+用法 (在 backend/ 目錄下):
+    python -m benchmarks.bench_llm_client --requests 500 --concurrency 8
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from api.llm_client import CircuitBreaker, LLMClient, LLMClientError
+from benchmarks.stub_llm import StubLLMServer
+
+PAYLOAD = {'key': 'text+image', 'text_query': 'bench', 'image_base64': 'A' * 4096}
+
+
+def run(label, call, total, concurrency):
+    latencies = []
+
+    def one(_):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f'{label:<28} {total / elapsed:8.1f} req/s   '
+          f'p50 {statistics.median(latencies):7.2f}ms   p95 {p95:7.2f}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    server = StubLLMServer(latency_ms=args.latency_ms).start()
+    url = server.url
+
+    run('requests.post (no pool)',
+        lambda: requests.post(url, json=PAYLOAD, timeout=30).json(),
+        args.requests, args.concurrency)
+
+    client = LLMClient(url, max_in_flight=args.concurrency, acquire_timeout=30)
+    run('LLMClient (pooled)', lambda: client.post_json(PAYLOAD), args.requests, args.concurrency)
+
+    # 後端停止時：斷路器應讓請求快速失敗，而不是卡在連線逾時
+    server.shutdown()
+    server.server_close()
+    down = LLMClient(url, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+
+    def call_down():
+        try:
+            down.post_json(PAYLOAD)
+        except LLMClientError:
+            pass
+
+    run('LLMClient (backend down)', call_down, args.requests, args.concurrency)
+    print(f'breaker state after outage: {down.breaker.state}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+比較逐筆 POST /api/logs/ 與批次寫入（POST /api/logs/bulk/、write-behind 緩衝）的寫入速率
+
+用法 (在 backend/ 目錄下):
+    python -m benchmarks.bench_log_ingest --entries 2000 --batch 100
+"""
+import argparse
+import time
+
+from benchmarks.django_env import setup_django
+
+
+def entry(i):
+    return {
+        'timestamp': '2025-01-01T00:00:00Z',
+        'type': 'SYSTEM',
+        'message': f'bench entry {i}',
+    }
+
+
+def report(label, count, elapsed):
+    print(f'{label:<32} {count:6d} entries  {elapsed:7.2f}s  {count / elapsed:9.1f} entries/s')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+    from api.log_buffer import LogWriteBuffer
+    from api.models import LogEntry
+
+    client = Client()
+
+    start = time.perf_counter()
+    for i in range(args.entries):
+        client.post('/api/logs/', entry(i), content_type='application/json')
+    report('POST /api/logs/ (one by one)', args.entries, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for offset in range(0, args.entries, args.batch):
+        batch = [entry(i) for i in range(offset, min(offset + args.batch, args.entries))]
+        client.post('/api/logs/bulk/', batch, content_type='application/json')
+    report(f'POST /api/logs/bulk/ (x{args.batch})', args.entries, time.perf_counter() - start)
+
+    buffer = LogWriteBuffer(max_size=args.batch, flush_interval=0.2)
+    start = time.perf_counter()
+    for i in range(args.entries):
+        buffer.add('SYSTEM', f'buffered entry {i}')
+    buffer.flush()
+    report('LogWriteBuffer', args.entries, time.perf_counter() - start)
+
+    print(f'rows in table: {LogEntry.objects.count()}')
+
+
+if __name__ == '__main__':
+    main()
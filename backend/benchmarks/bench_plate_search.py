@@ -0,0 +1,135 @@
+"""
+車牌模糊查詢 (api.plate_search) 在大量停放車輛下的延遲與召回率
+
+建立 --plates 個 OCCUPIED 車位（隨機 ABC-1234 格式車牌），查詢時模擬辨識錯誤：
+- exact：正確車牌（也比較 plate_number 無索引完全比對 vs plate_normalized 索引比對）
+- confusable：1~2 個易混淆字元 (0/O、8/B...)
+- typo1 / typo2：1 / 2 個任意字元替換
+每種各 --queries 次，回報 PlateSearchIndex 與逐一計算距離 (linear scan) 的 p50/p95 與 top-1 正確率。
+
+用法 (在 backend/ 目錄下):
+    python -m benchmarks.bench_plate_search --plates 10000 20000 --queries 300
+"""
+import argparse
+import json
+import random
+import statistics
+import string
+import time
+
+from benchmarks.django_env import setup_django
+
+LETTERS = string.ascii_uppercase
+DIGITS = string.digits
+
+
+def make_plates(count, rng):
+    plates = set()
+    while len(plates) < count:
+        plates.add(''.join(rng.choice(LETTERS) for _ in range(3)) + '-'
+                   + ''.join(rng.choice(DIGITS) for _ in range(4)))
+    return sorted(plates)
+
+
+def corrupt(plate, kind, rng):
+    from api.plate_search import CONFUSABLE_GROUPS
+    chars = list(plate)
+    positions = [i for i, ch in enumerate(chars) if ch != '-']
+    if kind == 'confusable':
+        groups = {ch: group for group in CONFUSABLE_GROUPS for ch in group}
+        candidates = [i for i in positions if chars[i] in groups]
+        for i in rng.sample(candidates, min(len(candidates), rng.choice((1, 2)))):
+            chars[i] = rng.choice([ch for ch in groups[chars[i]] if ch != chars[i]])
+    elif kind.startswith('typo'):
+        for i in rng.sample(positions, int(kind[-1])):
+            chars[i] = rng.choice([ch for ch in LETTERS + DIGITS if ch != chars[i]])
+    return ''.join(chars)
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(samples_ms):
+    return {'p50_ms': round(statistics.median(samples_ms), 3), 'p95_ms': round(percentile(samples_ms, 0.95), 3)}
+
+
+def linear_search(plates, query, limit, max_distance):
+    from api.plate_search import normalize_plate, plate_distance
+    query = normalize_plate(query)
+    scored = [(plate_distance(query, p, max_distance), p) for p in plates]
+    return sorted(s for s in scored if s[0] <= max_distance)[:limit]
+
+
+def run(count, queries, seed):
+    from django.db import connection
+    from api.models import ParkingSpot
+    from api.plate_search import PlateSearchIndex, normalize_plate
+
+    rng = random.Random(seed)
+    ParkingSpot.objects.all().delete()
+    plates = make_plates(count, rng)
+    ParkingSpot.objects.bulk_create([
+        ParkingSpot(id=f'P-{i}', label=f'P-{i}', status='OCCUPIED', plate_number=plate,
+                    plate_normalized=normalize_plate(plate))
+        for i, plate in enumerate(plates)
+    ], batch_size=1000)
+    spot_of = {normalize_plate(p): f'P-{i}' for i, p in enumerate(plates)}
+    normalized = list(spot_of)
+
+    index = PlateSearchIndex()
+    start = time.perf_counter()
+    len(index)  # 從資料庫建立索引
+    build_ms = (time.perf_counter() - start) * 1000
+
+    report = {'plates': count, 'index_build_ms': round(build_ms, 1), 'db': {}}
+    targets = [rng.choice(plates) for _ in range(queries)]
+
+    # 完全比對：原本的 plate_number（無索引）vs plate_normalized（有索引）
+    for column in ('plate_number', 'plate_normalized'):
+        samples = []
+        for plate in targets:
+            value = plate if column == 'plate_number' else normalize_plate(plate)
+            start = time.perf_counter()
+            list(ParkingSpot.objects.filter(**{column: value}).values_list('id', flat=True))
+            samples.append((time.perf_counter() - start) * 1000)
+        report['db'][column] = summarize(samples)
+
+    report['fuzzy'] = {}
+    for kind in ('exact', 'confusable', 'typo1', 'typo2'):
+        probes = [(corrupt(p, kind, rng), spot_of[normalize_plate(p)]) for p in targets]
+        index_ms, hits = [], 0
+        for query, expected in probes:
+            start = time.perf_counter()
+            results, _ = index.search(query, limit=5, max_distance=2.0)
+            index_ms.append((time.perf_counter() - start) * 1000)
+            hits += bool(results) and results[0][0] == expected
+        scan_ms = []
+        for query, _ in probes[:max(1, queries // 10)]:
+            start = time.perf_counter()
+            linear_search(normalized, query, 5, 2.0)
+            scan_ms.append((time.perf_counter() - start) * 1000)
+        report['fuzzy'][kind] = {
+            'index': summarize(index_ms),
+            'linear_scan': summarize(scan_ms),
+            'top1_accuracy': round(hits / len(probes), 3),
+        }
+    connection.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plates', type=int, nargs='+', default=[10000, 20000])
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    for count in args.plates:
+        print(json.dumps(run(count, args.queries, args.seed)))
+
+
+if __name__ == '__main__':
+    main()
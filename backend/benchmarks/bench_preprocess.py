@@ -0,0 +1,89 @@
+"""
+比較「整張畫面」與「車牌區域前處理」送往 LLM 的上傳量與端到端時間
+
+用法 (在 backend/ 目錄下):
+    python -m benchmarks.bench_preprocess --images ./samples
+    python -m benchmarks.bench_preprocess --images ./samples --llm-url http://192.168.50.105:5000/generate
+
+未指定 --llm-url 時使用本地 stub，延遲 = --latency-ms + --ms-per-kb * 上傳 KB
+"""
+import argparse
+import base64
+import statistics
+import time
+from pathlib import Path
+
+import cv2
+
+from api.llm_client import LLMClient
+from api.plate_preprocess import preprocess_for_llm
+from benchmarks.stub_llm import StubLLMServer
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+
+def send(client, jpeg_bytes):
+    payload = {
+        'key': 'text+image',
+        'text_query': 'Return {"plate_number": "..."}',
+        'image_base64': base64.b64encode(jpeg_bytes).decode('ascii'),
+    }
+    start = time.perf_counter()
+    client.post_json(payload)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', required=True, help='folder of sample frames')
+    parser.add_argument('--llm-url', help='real LLM service (default: local stub)')
+    parser.add_argument('--latency-ms', type=float, default=200.0)
+    parser.add_argument('--ms-per-kb', type=float, default=2.0)
+    parser.add_argument('--target-width', type=int, default=480)
+    parser.add_argument('--quality', type=int, default=85)
+    args = parser.parse_args()
+
+    paths = sorted(p for p in Path(args.images).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not paths:
+        parser.error(f'no images found in {args.images}')
+
+    url = args.llm_url
+    if url is None:
+        url = StubLLMServer(latency_ms=args.latency_ms, ms_per_kb=args.ms_per_kb).start().url
+    client = LLMClient(url, read_timeout=60)
+
+    rows = []
+    for path in paths:
+        image = cv2.imread(str(path))
+        if image is None:
+            continue
+        full = path.read_bytes() if path.suffix.lower() in ('.jpg', '.jpeg') \
+            else cv2.imencode('.jpg', image)[1].tobytes()
+
+        start = time.perf_counter()
+        result = preprocess_for_llm(image, target_width=args.target_width, quality=args.quality)
+        preprocess_ms = (time.perf_counter() - start) * 1000
+
+        full_ms = send(client, full)
+        cropped_ms = preprocess_ms + send(client, result.jpeg)
+        rows.append((path.name, len(full), len(result.jpeg), result.region is not None,
+                     full_ms, cropped_ms, preprocess_ms))
+        print(f'{path.name:<32} {len(full) / 1024:8.1f}KB -> {len(result.jpeg) / 1024:7.1f}KB '
+              f'{"plate" if result.region else "full ":>5}  '
+              f'{full_ms:8.1f}ms -> {cropped_ms:8.1f}ms (preprocess {preprocess_ms:.1f}ms)')
+
+    if not rows:
+        return
+    total_full = sum(r[1] for r in rows)
+    total_cropped = sum(r[2] for r in rows)
+    found = sum(1 for r in rows if r[3])
+    print()
+    print(f'images: {len(rows)}   plate region found: {found}')
+    print(f'payload: {total_full / 1024:.1f}KB -> {total_cropped / 1024:.1f}KB '
+          f'({100 * (1 - total_cropped / total_full):.1f}% smaller)')
+    print(f'median end-to-end: {statistics.median(r[4] for r in rows):.1f}ms -> '
+          f'{statistics.median(r[5] for r in rows):.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
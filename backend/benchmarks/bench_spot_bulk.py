@@ -0,0 +1,52 @@
+"""
+比較逐筆 PATCH /api/spots/:id/ 與 POST /api/spots/bulk/ 的車位狀態更新速率
+
+用法 (在 backend/ 目錄下):
+    python -m benchmarks.bench_spot_bulk --spots 1000 --batch 200
+"""
+import argparse
+import time
+
+from benchmarks.django_env import setup_django
+
+
+def report(label, count, elapsed):
+    print(f'{label:<34} {count:6d} spots  {elapsed:7.2f}s  {count / elapsed:9.1f} updates/s')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--spots', type=int, default=1000)
+    parser.add_argument('--batch', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+    from api.models import ParkingSpot
+
+    ParkingSpot.objects.bulk_create([
+        ParkingSpot(id=f'S-{i}', label=f'S-{i}', floor=i % 3 + 1, distance_raw=i)
+        for i in range(args.spots)
+    ])
+    ids = [f'S-{i}' for i in range(args.spots)]
+    client = Client()
+
+    start = time.perf_counter()
+    for spot_id in ids:
+        client.patch(f'/api/spots/{spot_id}/', {'status': 'ABNORMAL', 'abnormal_reason': 'sweep'},
+                     content_type='application/json')
+    report('PATCH /api/spots/:id/ (one by one)', args.spots, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for offset in range(0, args.spots, args.batch):
+        changes = [{'id': spot_id, 'status': 'AVAILABLE', 'abnormal_reason': None}
+                   for spot_id in ids[offset:offset + args.batch]]
+        response = client.post('/api/spots/bulk/', changes, content_type='application/json')
+        assert response.status_code == 200 and response.json()['updated'] == len(changes), response.content
+    report(f'POST /api/spots/bulk/ (x{args.batch})', args.spots, time.perf_counter() - start)
+
+    assert not ParkingSpot.objects.filter(id__in=ids).exclude(status='AVAILABLE').exists()
+
+
+if __name__ == '__main__':
+    main()
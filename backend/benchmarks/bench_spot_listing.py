@@ -0,0 +1,71 @@
+"""
+比較 GET /api/spots/ 的序列化方式：ParkingSpotSerializer + JSONRenderer 與 .values() 快速路徑
+
+用法 (在 backend/ 目錄下):
+    python -m benchmarks.bench_spot_listing --sizes 100 1000 10000
+"""
+import argparse
+import gzip
+import time
+
+from benchmarks.django_env import setup_django
+
+
+def measure(fn, repeat):
+    fn()  # 暖身
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+    from django.utils import timezone
+    from rest_framework.renderers import JSONRenderer
+    from api import spot_listing
+    from api.models import ParkingSpot
+    from api.serializers import ParkingSpotSerializer
+
+    print(f'JSON encoder: {"orjson" if spot_listing.orjson else "json"}')
+    print(f'{"spots":>6} {"serializer":>12} {"values()":>10} {"+gzip":>9} {"GET":>9} {"GET 304":>9}'
+          f' {"bytes":>9} {"gzip bytes":>10}')
+    client = Client()
+    now = timezone.now()
+    for size in args.sizes:
+        ParkingSpot.objects.all().delete()
+        ParkingSpot.objects.bulk_create([
+            ParkingSpot(id=f'S-{i}', label=f'S-{i}', floor=i % 3 + 1, distance_raw=i, version=i + 1,
+                        status='OCCUPIED' if i % 2 else 'AVAILABLE',
+                        plate_number=f'ABC-{i:04d}' if i % 2 else None,
+                        parked_time=now if i % 2 else None)
+            for i in range(size)
+        ])
+        queryset = ParkingSpot.objects.all().order_by('id')
+        repeat = max(3, args.repeat * 1000 // max(size, 1000))
+
+        serializer_ms, reference = measure(
+            lambda: JSONRenderer().render(ParkingSpotSerializer(queryset, many=True).data), repeat)
+        values_ms, body = measure(lambda: spot_listing.encode_spots(queryset), repeat)
+        gzip_ms, compressed = measure(lambda: gzip.compress(spot_listing.encode_spots(queryset), 6), repeat)
+        assert body == reference, 'fast path output differs from ParkingSpotSerializer'
+
+        # 透過完整的 view：第一次請求之後會命中同一個 ETag 的編碼快取
+        get_ms, response = measure(lambda: client.get('/api/spots/', HTTP_ACCEPT_ENCODING='gzip'), repeat)
+        etag = response['ETag']
+        not_modified_ms, response = measure(
+            lambda: client.get('/api/spots/', HTTP_IF_NONE_MATCH=etag), repeat)
+        assert response.status_code == 304
+
+        print(f'{size:>6} {serializer_ms:>10.2f}ms {values_ms:>8.2f}ms {gzip_ms:>7.2f}ms {get_ms:>7.2f}ms'
+              f' {not_modified_ms:>7.2f}ms {len(body):>9} {len(compressed):>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+SQLite 併發壓力測試：多個 worker process（各自多條執行緒）同時讀寫，比較兩種 SQLITE_PROFILE
+
+before = SQLITE_PROFILE=default 且不重試 (DB_LOCK_RETRIES=1)
+after  = SQLITE_PROFILE=concurrent（WAL、busy timeout、BEGIN IMMEDIATE、連線重用）+ 鎖定重試
+
+每個操作隨機選擇：讀取 GET /api/spots/、GET /api/logs/，或寫入 PATCH /api/spots/:id/、POST /api/logs/
+
+用法 (在 backend/ 目錄下):
+    python -m benchmarks.bench_sqlite_concurrency --processes 4 --threads 4 --seconds 10 --write-ratio 0.3
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+
+PROFILES = {
+    'before': {'SQLITE_PROFILE': 'default', 'DB_LOCK_RETRIES': '1'},
+    'after': {'SQLITE_PROFILE': 'concurrent'},
+}
+
+
+def _prepare(db_path, spots):
+    from benchmarks.django_env import setup_django
+    setup_django(db_path)
+    from api.models import ParkingSpot
+    ParkingSpot.objects.bulk_create([
+        ParkingSpot(id=f'S-{i}', label=f'S-{i}', distance_raw=i, version=i + 1) for i in range(spots)
+    ])
+
+
+def _worker(db_path, profile_env, args, results):
+    os.environ.update(profile_env)
+    from benchmarks.django_env import setup_django
+    setup_django(db_path, migrate=False)
+    from django.db import connection
+    from django.test import Client
+
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.seconds
+
+    def run():
+        client = Client()
+        rng = random.Random()
+        local = {'reads': 0, 'writes': 0, 'errors': 0}
+        local_latencies = []
+        while time.monotonic() < deadline:
+            write = rng.random() < args.write_ratio
+            start = time.perf_counter()
+            try:
+                if write and rng.random() < 0.5:
+                    spot_id = f'S-{rng.randrange(args.spots)}'
+                    response = client.patch(f'/api/spots/{spot_id}/',
+                                            {'status': rng.choice(['AVAILABLE', 'OCCUPIED', 'ABNORMAL'])},
+                                            content_type='application/json')
+                elif write:
+                    response = client.post('/api/logs/', {
+                        'timestamp': '2025-01-01T00:00:00Z', 'type': 'SYSTEM', 'message': 'stress',
+                    }, content_type='application/json')
+                elif rng.random() < 0.5:
+                    response = client.get('/api/spots/')
+                else:
+                    response = client.get('/api/logs/?page_size=50')
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            local_latencies.append(time.perf_counter() - start)
+            local['errors' if not ok else ('writes' if write else 'reads')] += 1
+        connection.close()
+        with lock:
+            for key, value in local.items():
+                counts[key] += value
+            latencies.extend(local_latencies)
+
+    threads = [threading.Thread(target=run) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    results.put({**counts, 'latencies': latencies[::max(1, len(latencies) // 2000)]})
+
+
+def run_profile(name, args):
+    db_path = os.path.join(tempfile.mkdtemp(prefix=f'aipark-stress-{name}-'), 'stress.sqlite3')
+    env = PROFILES[name]
+    ctx = multiprocessing.get_context('spawn')
+
+    # 在子 process 內建立資料庫，設定與 worker 相同
+    setup = ctx.Process(target=_setup_entry, args=(db_path, env, args.spots))
+    setup.start()
+    setup.join()
+
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_worker, args=(db_path, env, args, results)) for _ in range(args.processes)]
+    for p in workers:
+        p.start()
+    collected = [results.get() for _ in workers]
+    for p in workers:
+        p.join()
+
+    latencies = sorted(x for r in collected for x in r['latencies'])
+    total = {key: sum(r[key] for r in collected) for key in ('reads', 'writes', 'errors')}
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+
+    ops = total['reads'] + total['writes']
+    return {
+        'profile': name,
+        **env,
+        **total,
+        'ops_per_sec': round(ops / args.seconds, 1),
+        'error_rate': round(total['errors'] / max(1, ops + total['errors']), 4),
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+    }
+
+
+def _setup_entry(db_path, env, spots):
+    os.environ.update(env)
+    _prepare(db_path, spots)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--spots', type=int, default=200)
+    parser.add_argument('--write-ratio', type=float, default=0.3)
+    parser.add_argument('--profiles', nargs='+', default=['before', 'after'], choices=sorted(PROFILES))
+    args = parser.parse_args()
+
+    for name in args.profiles:
+        print(json.dumps(run_profile(name, args)))
+
+
+if __name__ == '__main__':
+    main()
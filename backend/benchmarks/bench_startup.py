@@ -0,0 +1,71 @@
+"""
+worker 啟動時間與常駐記憶體 (RSS)：每次在新的 Python process 內量測
+
+- api：django.setup() + 載入 URLconf（等同 worker 處理第一個請求前的載入）
+- vision：同上，再載入相機 / 辨識模組並 import cv2（辨識 worker 第一次處理影像時的成本）
+- manage：python manage.py check 的總執行時間
+
+用法 (在 backend/ 目錄下):
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+PROBE = r'''
+import json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+if sys.argv[1] == 'vision':
+    import cv2
+    import api.camera, api.plate_preprocess, api.recognition_cache
+elapsed = time.perf_counter() - start
+rss_kb = 0
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            rss_kb = int(line.split()[1])
+print(json.dumps({
+    'startup_ms': round(elapsed * 1000, 1),
+    'rss_mb': round(rss_kb / 1024, 1),
+    'loaded': sorted(m for m in ('cv2', 'numpy', 'requests', 'httpx') if m in sys.modules),
+}))
+'''
+
+
+def probe(mode):
+    out = subprocess.run([sys.executable, '-c', PROBE, mode], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def time_manage_check():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, 'manage.py', 'check'], capture_output=True, check=True)
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    for mode in ('api', 'vision'):
+        samples = [probe(mode) for _ in range(args.runs)]
+        print(json.dumps({
+            'mode': mode,
+            'startup_ms': statistics.median(s['startup_ms'] for s in samples),
+            'rss_mb': statistics.median(s['rss_mb'] for s in samples),
+            'loaded': samples[-1]['loaded'],
+        }))
+    print(json.dumps({'mode': 'manage', 'check_ms': statistics.median(time_manage_check() for _ in range(args.runs))}))
+
+
+if __name__ == '__main__':
+    main()
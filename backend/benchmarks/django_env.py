@@ -0,0 +1,25 @@
+"""
+讓效能測試在暫存的 SQLite 資料庫上執行 Django（不會動到 db.sqlite3）
+
+用法:
+    from benchmarks.django_env import setup_django
+    setup_django()          # 必須在 import api.* 的 model / view 之前呼叫
+"""
+import os
+import tempfile
+
+
+def setup_django(db_path=None, migrate=True):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    import django
+    from django.conf import settings
+
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='aipark-bench-'), 'bench.sqlite3')
+    settings.DATABASES['default']['NAME'] = db_path
+    django.setup()
+
+    if migrate:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+    return db_path
@@ -0,0 +1,305 @@
+"""
+離線負載測試：不需要實體相機與 LLM 服務，可重複執行並比較結果
+
+- 啟動本地 LLM stub（可設定延遲、抖動與錯誤率）
+- 相機改為循環播放影像檔 (CAMERA_SOURCE)；沒有指定 --images 時產生合成的車牌畫面
+- 在子 process 以 uvicorn 啟動 backend.asgi（暫存 SQLite 資料庫，預先建立 --spots 個車位）
+- 以指定的併發數對各情境送出請求，輸出每個情境的 p50 / p95 / p99 延遲與每秒請求數
+- --output 寫入 JSON（含執行環境與參數）；--baseline 指定先前的 JSON 時列出差異
+
+用法 (在 backend/ 目錄下):
+    python -m benchmarks.load_test --concurrency 1 8 32 --seconds 10 --output results.json
+    python -m benchmarks.load_test --scenarios recognize snapshot --llm-latency-ms 800 --llm-error-rate 0.05
+    python -m benchmarks.load_test --baseline results.json --output results-new.json
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --scenarios spots logs   # 測試已在執行的伺服器
+"""
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import cv2
+import httpx
+import numpy as np
+
+from benchmarks.stub_llm import StubLLMServer
+
+
+def _spot_id(i):
+    return f'LT-{i}'
+
+
+def _spot_patch(ctx, rng):
+    spot_id = _spot_id(rng.randrange(ctx['spots']))
+    return 'PATCH', f'/api/spots/{spot_id}/', {'status': rng.choice(['AVAILABLE', 'OCCUPIED', 'ABNORMAL'])}
+
+
+def _log_create(ctx, rng):
+    return 'POST', '/api/logs/', {
+        'timestamp': datetime.now(timezone.utc).isoformat(), 'type': 'SYSTEM', 'message': 'load test',
+    }
+
+
+def _recognize(ctx, rng):
+    return 'POST', '/api/recognize/', {'image': rng.choice(ctx['images'])}
+
+
+# 情境名稱 -> 產生 (method, path, json body) 的函式
+SCENARIOS = {
+    'spots': lambda ctx, rng: ('GET', '/api/spots/', None),
+    'spot_patch': _spot_patch,
+    'summary': lambda ctx, rng: ('GET', '/api/spots/summary/', None),
+    'logs': lambda ctx, rng: ('GET', '/api/logs/?page_size=50', None),
+    'log_create': _log_create,
+    'snapshot': lambda ctx, rng: ('GET', '/api/camera/snapshot/', None),
+    'snapshot_jpeg': lambda ctx, rng: ('GET', '/api/camera/snapshot.jpg', None),
+    'recognize': _recognize,
+}
+DEFAULT_SCENARIOS = ['spots', 'spot_patch', 'logs', 'log_create', 'snapshot', 'recognize']
+
+
+def make_plate_images(directory, count, seed=0):
+    """產生 count 張 640x480 的合成畫面：灰色背景上的白底黑字車牌（車牌號碼與位置各不相同）"""
+    rng = random.Random(seed)
+    letters = 'ABCDEFGHJKLMNPRSTUVWXYZ'
+    for i in range(count):
+        image = np.full((480, 640, 3), rng.randrange(60, 140), np.uint8)
+        x, y = rng.randrange(60, 300), rng.randrange(150, 330)
+        plate = ''.join(rng.choice(letters) for _ in range(3)) + '-' + f'{rng.randrange(10000):04d}'
+        cv2.rectangle(image, (x, y), (x + 280, y + 80), (255, 255, 255), -1)
+        cv2.rectangle(image, (x, y), (x + 280, y + 80), (0, 0, 0), 3)
+        cv2.putText(image, plate, (x + 14, y + 56), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 4)
+        cv2.imwrite(os.path.join(directory, f'frame-{i:04d}.jpg'), image)
+    return directory
+
+
+def load_images_as_data_uris(directory):
+    uris = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(('.jpg', '.jpeg', '.png')):
+            with open(os.path.join(directory, name), 'rb') as f:
+                uris.append('data:image/jpeg;base64,' + base64.b64encode(f.read()).decode('ascii'))
+    return uris
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _serve(db_path, port, env, spots):
+    """子 process：設定環境、建立資料庫與車位後以 uvicorn 提供 backend.asgi"""
+    os.environ.update(env)
+    from benchmarks.django_env import setup_django
+    setup_django(db_path)
+    from api.models import ParkingSpot
+    ParkingSpot.objects.bulk_create([
+        ParkingSpot(id=_spot_id(i), label=_spot_id(i), floor=1 + i % 3, section='ABCD'[i % 4],
+                    distance_raw=i, version=i + 1)
+        for i in range(spots)
+    ])
+
+    import uvicorn
+    from backend.asgi import application
+    uvicorn.run(application, host='127.0.0.1', port=port, log_level='warning', access_log=False)
+
+
+def _wait_ready(base_url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f'{base_url}/api/spots/summary/', timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'server at {base_url} did not become ready within {timeout:.0f}s')
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))] * 1000, 2)
+
+
+async def run_scenario(base_url, name, concurrency, seconds, ctx, warmup=0.5, seed=0):
+    """concurrency 個並行的客戶端在 seconds 秒內連續送出請求，回傳統計結果"""
+    build = SCENARIOS[name]
+    latencies = []
+    counts = {'requests': 0, 'errors': 0, 'unknown': 0}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker(worker_id, deadline, record):
+            rng = random.Random(seed * 100003 + worker_id)
+            while time.monotonic() < deadline:
+                method, path, body = build(ctx, rng)
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    ok = response.status_code < 400
+                    unknown = ok and name == 'recognize' and response.json().get('plate_number') == 'UNKNOWN'
+                except httpx.HTTPError:
+                    ok, unknown = False, False
+                elapsed = time.perf_counter() - start
+                if record:
+                    counts['requests'] += 1
+                    counts['errors'] += not ok
+                    counts['unknown'] += unknown
+                    latencies.append(elapsed)
+
+        # 暖身：建立連線、啟動相機擷取執行緒，不計入結果
+        if warmup > 0:
+            deadline = time.monotonic() + warmup
+            await asyncio.gather(*(worker(i, deadline, False) for i in range(concurrency)))
+
+        started = time.monotonic()
+        deadline = started + seconds
+        await asyncio.gather(*(worker(i, deadline, True) for i in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    result = {
+        'scenario': name,
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 2),
+        **counts,
+        'rps': round(counts['requests'] / elapsed, 1),
+        'error_rate': round(counts['errors'] / max(1, counts['requests']), 4),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+        'p50_ms': _percentile(latencies, 0.50),
+        'p95_ms': _percentile(latencies, 0.95),
+        'p99_ms': _percentile(latencies, 0.99),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+    }
+    if name != 'recognize':
+        del result['unknown']
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(baseline, results):
+    """與先前的結果比較（相同情境與併發數），回傳 rps / p95 的變化百分比"""
+    previous = {(r['scenario'], r['concurrency']): r for r in baseline.get('results', [])}
+    rows = []
+    for r in results:
+        old = previous.get((r['scenario'], r['concurrency']))
+        if old is None:
+            continue
+        row = {'scenario': r['scenario'], 'concurrency': r['concurrency']}
+        for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            if old.get(key) and r.get(key) is not None:
+                row[f'{key}_change_pct'] = round((r[key] - old[key]) / old[key] * 100, 1)
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline load test for the AI-Park backend')
+    parser.add_argument('--scenarios', nargs='+', default=DEFAULT_SCENARIOS, choices=sorted(SCENARIOS))
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8, 32])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=1.0)
+    parser.add_argument('--spots', type=int, default=200)
+    parser.add_argument('--images', help='directory of camera frames (default: generated plate images)')
+    parser.add_argument('--image-count', type=int, default=50)
+    parser.add_argument('--llm-latency-ms', type=float, default=300)
+    parser.add_argument('--llm-jitter-ms', type=float, default=100)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--recognition-cache', action='store_true',
+                        help='keep the recognition cache on (off by default so every request reaches the LLM)')
+    parser.add_argument('--url', help='test an already running server instead of starting one')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='previous --output file to compare against')
+    args = parser.parse_args()
+
+    images_dir = args.images or make_plate_images(tempfile.mkdtemp(prefix='aipark-frames-'),
+                                                  args.image_count, args.seed)
+    ctx = {'spots': args.spots, 'images': load_images_as_data_uris(images_dir)}
+    if not ctx['images']:
+        parser.error(f'no images found in {images_dir}')
+
+    stub = None
+    server = None
+    base_url = args.url
+    if base_url is None:
+        stub = StubLLMServer(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms,
+                             error_rate=args.llm_error_rate, seed=args.seed).start()
+        port = _free_port()
+        env = {
+            'LLM_SERVICE_URL': stub.url,
+            'CAMERA_SOURCE': images_dir,
+            'RECOGNITION_JOB_WORKERS': '0',
+            'LOG_RETENTION_DAYS': '0',
+            'API_LOG_LEVEL': 'ERROR',  # stub 的模擬錯誤不必逐筆印出
+        }
+        if not args.recognition_cache:
+            env['RECOGNITION_CACHE_TTL'] = '0'
+        db_path = os.path.join(tempfile.mkdtemp(prefix='aipark-load-'), 'load.sqlite3')
+        server = multiprocessing.get_context('spawn').Process(
+            target=_serve, args=(db_path, port, env, args.spots), daemon=True)
+        server.start()
+        base_url = f'http://127.0.0.1:{port}'
+    else:
+        base_url = base_url.rstrip('/')
+
+    results = []
+    try:
+        _wait_ready(base_url)
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                result = asyncio.run(run_scenario(base_url, name, concurrency, args.seconds, ctx,
+                                                  warmup=args.warmup, seed=args.seed))
+                results.append(result)
+                print(json.dumps(result))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join(timeout=10)
+        if stub is not None:
+            stub.shutdown()
+            stub.server_close()
+
+    report = {
+        'run': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': vars(args),
+        },
+        'results': results,
+    }
+    if stub is not None:
+        report['llm_stub'] = {'requests': stub.request_count, 'errors': stub.error_count}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            report['comparison'] = compare(json.load(f), results)
+        for row in report['comparison']:
+            print(json.dumps(row))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
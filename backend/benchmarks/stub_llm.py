@@ -0,0 +1,105 @@
+"""
+本地 LLM 服務替身 (stub)：模擬 /generate 介面，供效能測試使用
+
+用法:
+    python -m benchmarks.stub_llm --port 5055 --latency-ms 50 --ms-per-kb 0.5 --error-rate 0.05
+
+--ms-per-kb 讓回應延遲隨上傳量增加，粗略模擬影像越大推論越久
+--jitter-ms 在延遲上加上 0 ~ N ms 的隨機變化；--error-rate 為回應 HTTP 500 的比例
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 支援 keep-alive
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            server.bytes_received += length
+            jitter = server.random.uniform(0, server.jitter_ms) if server.jitter_ms else 0.0
+            failed = server.random.random() < server.error_rate
+            if failed:
+                server.error_count += 1
+        delay_ms = server.latency_ms + jitter + server.ms_per_kb * length / 1024.0
+        time.sleep(delay_ms / 1000.0)
+
+        if failed:
+            self._send(500, json.dumps({'error': 'stub failure'}).encode())
+            return
+        answer = json.dumps({'plate_number': self.server.plate})
+        if 'images_base64' in payload:
+            # 批次介面：一次推論多張，回傳同樣順序的結果
+            body = json.dumps({'responses': [answer] * len(payload['images_base64'])}).encode()
+        else:
+            body = json.dumps({'response': answer}).encode()
+        self._send(200, body)
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 預設 backlog 只有 5，數百個同時連線的壓力測試會被拒絕連線
+    request_queue_size = 1024
+
+    def __init__(self, port=0, latency_ms=0.0, plate='ABC1234', ms_per_kb=0.0, error_rate=0.0,
+                 jitter_ms=0.0, seed=None):
+        super().__init__(('127.0.0.1', port), StubLLMHandler)
+        self.latency_ms = latency_ms
+        self.ms_per_kb = ms_per_kb
+        self.plate = plate
+        self.error_rate = error_rate
+        self.jitter_ms = jitter_ms
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.error_count = 0
+        self.bytes_received = 0
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/generate'
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stub LLM server')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--ms-per-kb', type=float, default=0.0)
+    parser.add_argument('--plate', default='ABC1234')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.port, args.latency_ms, args.plate, args.ms_per_kb,
+                           error_rate=args.error_rate, jitter_ms=args.jitter_ms, seed=args.seed)
+    print(f'Stub LLM listening on {server.url}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
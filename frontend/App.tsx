@@ -5,7 +5,7 @@ import ClientView from './pages/ClientView';
 import AdminView from './pages/AdminView';
 import AdminLogin, { ADMIN_AUTH_KEY } from './pages/AdminLogin';
 import { AbnormalAlertOverlay } from './components/Shared';
-import { api } from './services/api';
+import { api, LOG_PAGE_SIZE } from './services/api';
 
 const App: React.FC = () => {
   const [spots, setSpots] = useState<ParkingSpot[]>([]);
@@ -33,11 +33,53 @@ const App: React.FC = () => {
     }
   }, []);
 
-  // Initial load and Polling (every 5 seconds)
+  // Initial load, then apply pushed changes (SSE) instead of re-fetching everything
   useEffect(() => {
-    refreshData();
-    const interval = setInterval(refreshData, 5000);
-    return () => clearInterval(interval);
+    let unsubscribe = () => {};
+    let cancelled = false;
+
+    const subscribe = async () => {
+      try {
+        // Take the version before the full fetch; anything newer arrives as a delta
+        const version = await api.fetchChangeVersion();
+        await refreshData();
+        if (cancelled) return;
+        unsubscribe = api.subscribeChanges(version, (changes) => {
+          if (changes.reset) {
+            unsubscribe();
+            subscribe();
+            return;
+          }
+          if (changes.spots.length > 0) {
+            setSpots(prev => {
+              const changed = new Map(changes.spots.map(s => [s.id, s]));
+              const merged = prev.map(s => changed.get(s.id) ?? s);
+              const added = changes.spots.filter(s => !prev.some(p => p.id === s.id));
+              return [...merged, ...added];
+            });
+          }
+          if (changes.logs.length > 0) {
+            setLogs(prev => {
+              const changedIds = new Set(changes.logs.map(l => l.id));
+              return [...changes.logs, ...prev.filter(l => !changedIds.has(l.id))]
+                .sort((a, b) => b.timestamp.getTime() - a.timestamp.getTime())
+                .slice(0, LOG_PAGE_SIZE);
+            });
+          }
+        });
+      } catch (error) {
+        console.error("Failed to subscribe to changes", error);
+      }
+    };
+
+    subscribe();
+    // Safety net: slow full refresh in case the stream is blocked by a proxy
+    const interval = setInterval(refreshData, 60000);
+    return () => {
+      cancelled = true;
+      unsubscribe();
+      clearInterval(interval);
+    };
   }, [refreshData]);
 
   // Monitor abnormalities locally for the Overlay
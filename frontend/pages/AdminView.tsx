@@ -1,5 +1,5 @@
 import React from 'react';
-import { LayoutDashboard, Info, RotateCcw, Settings } from 'lucide-react'; // 引入 RotateCcw 和 Settings
+import { LayoutDashboard, Info, RotateCcw, Settings, Video } from 'lucide-react'; // 引入 RotateCcw 和 Settings
 import { Header, StatusBadge } from '../components/Shared';
 import { ParkingSpot, SpotStatus, LogEntry } from '../types';
 import { api } from '../services/api';
@@ -123,6 +123,20 @@ const AdminView: React.FC<AdminViewProps> = ({ spots, logs, onRefresh }) => {
           </div>
         </div>
 
+        {/* Live Camera (MJPEG stream) */}
+        <div className="bg-white p-6 rounded-xl shadow-sm lg:col-span-2">
+          <h2 className="text-lg font-bold mb-4 flex items-center gap-2">
+            <Video /> 即時影像 (Live Camera)
+          </h2>
+          <div className="flex justify-center bg-gray-900 rounded-lg overflow-hidden">
+            <img
+              src={api.getCameraStreamUrl()}
+              alt="Live Camera"
+              className="max-h-96 object-contain"
+            />
+          </div>
+        </div>
+
         {/* Device Simulation Status */}
         <div className="bg-white p-6 rounded-xl shadow-sm lg:col-span-2">
           <h2 className="text-lg font-bold mb-4">設備狀態 (Device Mock)</h2>
@@ -2,7 +2,6 @@ import React, { useState, useRef } from 'react';
 import { ScanLine, Check, RotateCcw } from 'lucide-react';
 import ParkingMap from '../components/ParkingMap';
 import { Header, StatusBadge } from '../components/Shared';
-import { recognizeLicensePlate } from '../services/VLMService';
 import { ParkingSpot, SpotStatus } from '../types';
 import { api } from '../services/api';
 
@@ -42,20 +41,13 @@ const ClientView: React.FC<ClientViewProps> = ({ spots, onRefresh }) => {
     setSelectedSpot(null);
 
     try {
-      // 1. Get snapshot from backend camera
-      const snapshotStartTime = Date.now();
-      console.log('[前端] 發送相機快照請求...');
-      const imageBase64 = await api.getCameraSnapshot();
-      const snapshotTime = Date.now() - snapshotStartTime;
-      console.log(`[前端] 相機快照完成，耗時: ${snapshotTime}ms`);
-      setCapturedImage(imageBase64);
-
-      // 2. Recognize plate from the snapshot
+      // Backend captures the current frame and recognizes it in one request
       const recognizeStartTime = Date.now();
-      console.log('[前端] 發送車牌識別請求到後端...');
-      const recognizedPlate = await recognizeLicensePlate(imageBase64);
+      console.log('[前端] 發送相機辨識請求到後端...');
+      const { plateNumber: recognizedPlate, image } = await api.captureAndRecognize();
       const recognizeTime = Date.now() - recognizeStartTime;
       console.log(`[前端] 車牌識別完成，耗時: ${recognizeTime}ms，結果: ${recognizedPlate}`);
+      if (image) setCapturedImage(image);
       
       const totalTime = Date.now() - startTime;
       console.log(`[前端] 總流程耗時: ${totalTime}ms`);
@@ -8,11 +8,71 @@ const USE_MOCK_API = false;
 // const currentHostname = window.location.hostname;
 const API_BASE_URL = `/api`;
 
+// 管理頁面顯示的紀錄筆數（最新一頁）
+export const LOG_PAGE_SIZE = 100;
+
 // --- MOCK DATA (Simulating Database) ---
 // 預設為空資料，若使用 Mock 模式，重置時會清空回這裡
 let MOCK_SPOTS: ParkingSpot[] = [];
 let MOCK_LOGS: LogEntry[] = [];
 
+// Convert backend (snake_case) to frontend shape (camelCase + Date objects)
+const toSpot = (s: any): ParkingSpot => ({
+  id: s.id,
+  label: s.label,
+  status: s.status as SpotStatus,
+  distanceRaw: s.distance_raw,
+  floor: s.floor,
+  section: s.section,
+  plateNumber: s.plate_number || undefined,
+  parkedTime: s.parked_time ? new Date(s.parked_time) : undefined,
+  abnormalReason: s.abnormal_reason || undefined,
+});
+
+const toLog = (log: any): LogEntry => ({
+  id: log.id?.toString(),
+  timestamp: new Date(log.timestamp),
+  type: log.type,
+  message: log.message,
+  plateNumber: log.plate_number || undefined,
+  spotId: log.spot || undefined,
+});
+
+export interface ChangeSet {
+  version: number;
+  reset: boolean; // true: 系統重置或資料被刪除，需要重新抓取完整資料
+  spots: ParkingSpot[];
+  logs: LogEntry[];
+}
+
+// --- LOG BATCHING ---
+// createLog 先放進佇列，LOG_BATCH_DELAY_MS 內的紀錄合併成一次 POST /api/logs/bulk/
+const LOG_BATCH_MAX_SIZE = 50;
+const LOG_BATCH_DELAY_MS = 200;
+let pendingLogs: { payload: any; resolve: () => void; reject: (err: unknown) => void }[] = [];
+let logFlushTimer: ReturnType<typeof setTimeout> | null = null;
+
+const flushLogs = async () => {
+  if (logFlushTimer !== null) {
+    clearTimeout(logFlushTimer);
+    logFlushTimer = null;
+  }
+  const batch = pendingLogs;
+  pendingLogs = [];
+  if (batch.length === 0) return;
+  try {
+    const res = await fetch(`${API_BASE_URL}/logs/bulk/`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(batch.map(item => item.payload))
+    });
+    if (!res.ok) throw new Error(`Failed to create logs: ${res.status}`);
+    batch.forEach(item => item.resolve());
+  } catch (error) {
+    batch.forEach(item => item.reject(error));
+  }
+};
+
 // --- API FUNCTIONS ---
 
 export const api = {
@@ -40,6 +100,41 @@ export const api = {
     }
   },
 
+  /**
+   * POST /api/recognize/camera/
+   * 後端直接擷取相機最新畫面並辨識車牌，畫面不必經過瀏覽器往返
+   * 回傳辨識結果與縮圖 (data URI)
+   */
+  captureAndRecognize: async (camera: number = 0): Promise<{ plateNumber: string; image?: string }> => {
+    if (USE_MOCK_API) {
+      return { plateNumber: 'UNKNOWN' };
+    }
+    const requestStartTime = Date.now();
+    console.log(`[前端] 發送相機辨識請求，時間: ${new Date().toISOString()}`);
+    const response = await fetch(`${API_BASE_URL}/recognize/camera/?camera=${camera}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ thumbnail: true })
+    });
+    const requestTime = Date.now() - requestStartTime;
+    console.log(`[前端] 相機辨識響應，耗時: ${requestTime}ms，狀態: ${response.status}`);
+    if (!response.ok) throw new Error('Failed to capture and recognize');
+    const data = await response.json();
+    console.log('[前端] 後端各階段耗時:', data.timings);
+    return {
+      plateNumber: (data.plate_number || 'UNKNOWN').toString().toUpperCase(),
+      image: data.image,
+    };
+  },
+
+  /**
+   * GET /api/camera/stream/
+   * MJPEG 即時影像串流網址，可直接作為 <img src> 使用
+   */
+  getCameraStreamUrl: (camera: number = 0, fps: number = 10, width: number = 640): string => {
+    return `${API_BASE_URL}/camera/stream/?camera=${camera}&fps=${fps}&width=${width}`;
+  },
+
   /**
    * GET /api/spots/
    */
@@ -52,18 +147,7 @@ export const api = {
 
     const res = await fetch(`${API_BASE_URL}/spots/`);
     const data = await res.json();
-    // Convert backend (snake_case) to frontend shape (camelCase + Date objects)
-    return data.map((s: any) => ({
-      id: s.id,
-      label: s.label,
-      status: s.status as SpotStatus,
-      distanceRaw: s.distance_raw,
-      floor: s.floor,
-      section: s.section,
-      plateNumber: s.plate_number || undefined,
-      parkedTime: s.parked_time ? new Date(s.parked_time) : undefined,
-      abnormalReason: s.abnormal_reason || undefined,
-    }));
+    return data.map(toSpot);
   },
 
   /**
@@ -81,11 +165,13 @@ export const api = {
       return;
     }
 
-    await fetch(`${API_BASE_URL}/spots/${spotId}/occupy/`, {
+    const res = await fetch(`${API_BASE_URL}/spots/${spotId}/occupy/`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({ plate_number: plateNumber })
     });
+    // 409: 車位已被其他閘門先佔用
+    if (!res.ok) throw new Error(`occupy failed: ${res.status}`);
   },
 
   /**
@@ -109,28 +195,87 @@ export const api = {
     });
   },
 
+  /**
+   * POST /api/spots/bulk/
+   * 一次更新多個車位（封閉樓層、感測器巡檢），單一交易寫入
+   */
+  updateSpotsBulk: async (changes: { id: string; status?: SpotStatus; plateNumber?: string | null; abnormalReason?: string | null }[]): Promise<{ id: string; ok: boolean }[]> => {
+    if (USE_MOCK_API) {
+      const byId = new Map(changes.map(c => [c.id, c]));
+      MOCK_SPOTS = MOCK_SPOTS.map(s => {
+        const c = byId.get(s.id);
+        return c ? {
+          ...s,
+          ...(c.status !== undefined && { status: c.status }),
+          ...(c.plateNumber !== undefined && { plateNumber: c.plateNumber ?? undefined }),
+          ...(c.abnormalReason !== undefined && { abnormalReason: c.abnormalReason ?? undefined })
+        } : s;
+      });
+      return changes.map(c => ({ id: c.id, ok: MOCK_SPOTS.some(s => s.id === c.id) }));
+    }
+
+    const res = await fetch(`${API_BASE_URL}/spots/bulk/`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(changes.map(c => ({
+        id: c.id,
+        ...(c.status !== undefined && { status: c.status }),
+        ...(c.plateNumber !== undefined && { plate_number: c.plateNumber }),
+        ...(c.abnormalReason !== undefined && { abnormal_reason: c.abnormalReason })
+      })))
+    });
+    const data = await res.json();
+    return data.results ?? [];
+  },
+
   /**
    * GET /api/logs/
+   * 後端以 cursor 分頁，這裡只取最新一頁
    */
   fetchLogs: async (): Promise<LogEntry[]> => {
     if (USE_MOCK_API) {
       return [...MOCK_LOGS];
     }
-    const res = await fetch(`${API_BASE_URL}/logs/`);
+    const res = await fetch(`${API_BASE_URL}/logs/?page_size=${LOG_PAGE_SIZE}`);
     // Need to convert string timestamps to Date objects if fetching from JSON
     const data = await res.json();
-    return data.map((log: any) => ({
-      id: log.id?.toString(),
-      timestamp: new Date(log.timestamp),
-      type: log.type,
-      message: log.message,
-      plateNumber: log.plate_number || undefined,
-      spotId: log.spot || undefined,
-    }));
+    return data.results.map(toLog);
   },
 
   /**
-   * POST /api/logs/
+   * GET /api/changes/
+   * 取得目前的變更版本號（搭配 subscribeChanges 使用）
+   */
+  fetchChangeVersion: async (): Promise<number> => {
+    if (USE_MOCK_API) return 0;
+    const res = await fetch(`${API_BASE_URL}/changes/`);
+    const data = await res.json();
+    return data.version;
+  },
+
+  /**
+   * GET /api/changes/stream/?since=<version>  (Server-Sent Events)
+   * 只推送變更過的車位與新的紀錄；回傳取消訂閱的函式
+   * 斷線時瀏覽器會自動以 Last-Event-ID 重連
+   */
+  subscribeChanges: (since: number, onChange: (changes: ChangeSet) => void): (() => void) => {
+    if (USE_MOCK_API || typeof EventSource === 'undefined') return () => {};
+    const source = new EventSource(`${API_BASE_URL}/changes/stream/?since=${since}`);
+    source.addEventListener('change', (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      onChange({
+        version: data.version,
+        reset: data.reset,
+        spots: data.spots.map(toSpot),
+        logs: data.logs.map(toLog),
+      });
+    });
+    return () => source.close();
+  },
+
+  /**
+   * POST /api/logs/bulk/
+   * 短時間內的多筆紀錄合併成一個批次請求（一次資料庫交易）
    */
   createLog: async (entry: Omit<LogEntry, 'id'>): Promise<void> => {
     if (USE_MOCK_API) {
@@ -148,10 +293,13 @@ export const api = {
     if (entry.plateNumber) payload.plate_number = entry.plateNumber;
     if (entry.spotId) payload.spot = entry.spotId;
 
-    await fetch(`${API_BASE_URL}/logs/`, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify(payload)
+    return new Promise<void>((resolve, reject) => {
+      pendingLogs.push({ payload, resolve, reject });
+      if (pendingLogs.length >= LOG_BATCH_MAX_SIZE) {
+        flushLogs();
+      } else if (logFlushTimer === null) {
+        logFlushTimer = setTimeout(flushLogs, LOG_BATCH_DELAY_MS);
+      }
     });
   },
 